@@ -1,7 +1,6 @@
 # /ava_unified_platform/routers/pre_annotation.py
 
 import os
-import pickle
 import zipfile
 import tempfile
 import shutil
@@ -13,6 +12,7 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from processing_pipeline.services.proposals_to_cvat import process_clip
+from processing_pipeline.services.proposals_store import load_proposals
 
 router = APIRouter(
     prefix="/pre-annotation",
@@ -37,15 +37,15 @@ def cleanup_temp_dir(path: str):
 @router.post("/process-clips", summary="Generate CVAT packages from proposals")
 async def process_clips_endpoint(
     background_tasks: BackgroundTasks,
-    pickle_file: UploadFile = File(..., description="The dense_proposals.pkl file."),
+    pickle_file: UploadFile = File(..., description="The .proposals file (or a legacy dense_proposals.pkl)."),
     frames_zip: UploadFile = File(..., description="A ZIP file containing all frame images.")
 ):
     """
-    Upload a `dense_proposals.pkl` and a `frames.zip` folder to generate CVAT-ready packages.
+    Upload a `.proposals` file (or a legacy `dense_proposals.pkl`) and a `frames.zip` folder to generate CVAT-ready packages.
     This endpoint processes the files and returns a single downloadable ZIP file containing all generated XMLs and clip ZIPs.
     """
     work_dir = tempfile.mkdtemp()
-    pickle_path = os.path.join(work_dir, "dense_proposals.pkl")
+    proposals_path = os.path.join(work_dir, "dense.proposals")
     frame_dir = os.path.join(work_dir, "frames")
     output_zip_dir = os.path.join(work_dir, "output_zips")
     output_xml_dir = os.path.join(work_dir, "output_xmls")
@@ -55,7 +55,7 @@ async def process_clips_endpoint(
     os.makedirs(output_xml_dir, exist_ok=True)
 
     # Save uploaded files
-    with open(pickle_path, "wb") as f:
+    with open(proposals_path, "wb") as f:
         shutil.copyfileobj(pickle_file.file, f)
 
     frames_zip_path = os.path.join(work_dir, "frames.zip")
@@ -65,10 +65,9 @@ async def process_clips_endpoint(
         zip_ref.extractall(frame_dir)
 
     try:
-        with open(pickle_path, 'rb') as f:
-            proposals_data = pickle.load(f)
+        proposals_data = load_proposals(proposals_path)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read pickle file: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to read proposals file: {e}")
 
 
     for video_id, frames_data in proposals_data.items():
@@ -76,8 +75,9 @@ async def process_clips_endpoint(
 
     final_zip_path = os.path.join(work_dir, "cvat_packages.zip")
     with zipfile.ZipFile(final_zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        # Clip ZIPs only hold JPEGs, which do not deflate; they are stored as they are.
         for file in Path(output_zip_dir).rglob("*.zip"):
-            zf.write(file, arcname=f"clips/{file.name}")
+            zf.write(file, arcname=f"clips/{file.name}", compress_type=zipfile.ZIP_STORED)
         for file in Path(output_xml_dir).rglob("*.xml"):
             zf.write(file, arcname=f"xmls/{file.name}")
 
@@ -1,6 +1,5 @@
 # api.py
 import os
-import pickle
 import zipfile
 import tempfile
 from pathlib import Path
@@ -11,6 +10,8 @@ import shutil
 
 # Correctly import the function from your processing script
 from processing_pipeline.services.proposals_to_cvat import process_clip
+from processing_pipeline.services.proposals_store import load_proposals
+from processing_pipeline.services.image_dims import ImageDimsIndex
 
 app = FastAPI(title="CVAT Pre-Annotation Service")
 
@@ -61,11 +62,13 @@ def cleanup_temp_dir(path: str):
 @app.post("/process_clips/")
 async def process_clips(pickle_file: UploadFile = File(...), frames_zip: UploadFile = File(...)):
     """
-    Upload a dense_proposals.pkl and a frames.zip folder to generate CVAT-ready packages.
+    Upload a dense proposals file and a frames.zip folder to generate CVAT-ready packages.
+    `pickle_file` is a .proposals file; a legacy dense_proposals.pkl is still accepted, but only if it holds
+    plain dicts, lists and numbers (see services/proposals_store.py).
     """
     # Create a temporary working directory
     work_dir = tempfile.mkdtemp()
-    pickle_path = os.path.join(work_dir, "dense_proposals.pkl")
+    proposals_path = os.path.join(work_dir, "dense.proposals")
     frame_dir = os.path.join(work_dir, "frames")
 
     # ✨ FIX: Create two separate output directories
@@ -76,7 +79,7 @@ async def process_clips(pickle_file: UploadFile = File(...), frames_zip: UploadF
     os.makedirs(output_xml_dir, exist_ok=True)
 
     # Save uploaded files
-    with open(pickle_path, "wb") as f:
+    with open(proposals_path, "wb") as f:
         f.write(await pickle_file.read())
 
     frames_zip_path = os.path.join(work_dir, "frames.zip")
@@ -85,24 +88,26 @@ async def process_clips(pickle_file: UploadFile = File(...), frames_zip: UploadF
     with zipfile.ZipFile(frames_zip_path, "r") as zip_ref:
         zip_ref.extractall(frame_dir)
 
-    # Load pickle
+    # Load proposals (memory-mapped; each clip's boxes are read when the clip is processed)
     try:
-        with open(pickle_path, 'rb') as f:
-            proposals_data = pickle.load(f)
+        proposals_data = load_proposals(proposals_path)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read pickle file: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to read proposals file: {e}")
+
+    # Frame sizes from the zip's image_dims.json if it has one, otherwise from each clip's first frame header
+    image_dims = ImageDimsIndex.load(frame_dir)
 
     # Process each clip
     for video_id, frames_data in proposals_data.items():
         # ✨ FIX: Call process_clip with the correct arguments
-        process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_dir, attributes_dict)
+        process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_dir, attributes_dict, image_dims)
 
     # Package all output files into a single ZIP for download
     final_zip_path = os.path.join(work_dir, "cvat_packages.zip")
     with zipfile.ZipFile(final_zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        # Add the generated clip ZIPs
+        # Add the generated clip ZIPs (stored as they are: they only hold JPEGs, which do not deflate)
         for file in Path(output_zip_dir).rglob("*.zip"):
-            zf.write(file, arcname=file.name)
+            zf.write(file, arcname=file.name, compress_type=zipfile.ZIP_STORED)
         # Add the generated XML files
         for file in Path(output_xml_dir).rglob("*.xml"):
             zf.write(file, arcname=file.name)
@@ -5,15 +5,15 @@ import requests
 st.set_page_config(page_title="CVAT Pre-annotation Tool", layout="centered")
 
 st.title("CVAT Pre-annotation Tool 📦")
-st.write("Upload a dense_proposals.pkl and frames.zip folder to generate CVAT ZIP archives.")
+st.write("Upload a dense proposals file (.proposals, or a legacy dense_proposals.pkl) and frames.zip folder to generate CVAT ZIP archives.")
 
 # Upload files
-pickle_file = st.file_uploader("Upload dense_proposals.pkl", type="pkl")
+pickle_file = st.file_uploader("Upload dense proposals", type=["proposals", "pkl"])
 frames_zip_file = st.file_uploader("Upload frames.zip", type="zip")
 
 if st.button("Generate CVAT ZIP"):
     if not pickle_file or not frames_zip_file:
-        st.error("Please upload both pickle and frames zip files.")
+        st.error("Please upload both proposals and frames zip files.")
     else:
         st.info("Processing... This may take a few minutes depending on the number of frames.")
 
@@ -1,5 +1,6 @@
+# Run from processing_pipeline/, like app.py and admin_app.py:  python proposals_to_cvat.py --help
+
 import os
-import pickle
 import argparse
 import zipfile
 import cv2
@@ -10,6 +11,8 @@ from xml.dom import minidom
 import re
 import logging
 
+from services.proposals_store import load_proposals
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -147,9 +150,9 @@ def process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_di
     with open(xml_path, 'w', encoding='utf-8') as f:
         f.write(xml_content)
 
-    # Create the ZIP file with only frames
+    # Create the ZIP file with only frames (stored: JPEGs do not deflate, compressing them only costs CPU)
     zip_path = os.path.join(output_zip_dir, f"{video_id}.zip")
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zf:
         for frame_name in sorted_frame_names:
             frame_file_path = os.path.join(clip_frame_path, frame_name)
             if os.path.exists(frame_file_path):
@@ -159,7 +162,8 @@ def process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_di
 
 def main():
     parser = argparse.ArgumentParser(description="Create separate ZIP and XML files from a dense proposal file.")
-    parser.add_argument('--pickle_path', type=str, required=True, help="Path to the dense_proposals.pkl file.")
+    parser.add_argument('--proposals_path', '--pickle_path', type=str, required=True,
+                        help="Path to the .proposals file (or a legacy dense_proposals.pkl).")
     parser.add_argument('--frame_dir', type=str, required=True, help="Root directory containing frame subdirectories.")
     parser.add_argument('--output_zip_dir', type=str, required=True, help="Directory to save the final ZIP files.")
     parser.add_argument('--output_xml_dir', type=str, required=True, help="Directory to save the final XML files.")
@@ -169,10 +173,9 @@ def main():
     os.makedirs(args.output_xml_dir, exist_ok=True)
 
     try:
-        with open(args.pickle_path, 'rb') as f:
-            proposals_data = pickle.load(f)
+        proposals_data = load_proposals(args.proposals_path)
     except FileNotFoundError:
-        logger.error(f"Pickle file not found at {args.pickle_path}")
+        logger.error(f"Proposals file not found at {args.proposals_path}")
         return
 
     attributes_dict = {
@@ -4,12 +4,12 @@ import logging
 from typing import Dict, Any
 import json
 import os
-import cv2
 from tqdm import tqdm
 from pathlib import Path  
 
 # 🔹 Import shared config with alias
 from services.shared_config import ATTRIBUTE_DEFINITIONS as aname  
+from services.image_dims import ImageDimsIndex
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -33,6 +33,8 @@ class DatasetGenerator:
         self.conn = None
         self.action_id_map = calculate_action_mapping()
         self.image_dims_cache = {}
+        # Frame sizes from frame_dir/image_dims.json, or from the frame headers for frames it does not list
+        self.image_dims = ImageDimsIndex.load(frame_dir)
 
     def _ensure_connection(self):
         """Ensure there is an active DB connection."""
@@ -64,8 +66,7 @@ class DatasetGenerator:
 
         try:
             first_frame = sorted([f for f in os.listdir(clip_path) if f.endswith('.jpg')])[0]
-            img = cv2.imread(os.path.join(clip_path, first_frame))
-            height, width, _ = img.shape
+            width, height = self.image_dims.get(os.path.join(actual_clip_name, first_frame))
             self.image_dims_cache[task_name] = (width, height)
             return width, height
         except Exception as e:
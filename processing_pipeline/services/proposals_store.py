@@ -0,0 +1,179 @@
+# services/proposals_store.py
+# Generated by `python -m tools.sync_shared_modules` from
+# proposal_generation_pipeline/proposal_generation_pipeline/tools/proposals_store.py; edit that file instead.
+
+# Columnar store for the dense proposals ({clip_id: {frame_name: [[x1, y1, x2, y2, score, track_id], ...]}}),
+# replacing dense_proposals.pkl. Layout of a .proposals file:
+#
+#   MAGIC | rows (ROW_DTYPE, 48 bytes each) | JSON index | index length (uint64) | MAGIC
+#
+# The JSON index lists one [clip_id, frame_name, first_row, num_rows] segment per appended frame. Rows are
+# appended as frames come in (ProposalsWriter) and the index is written on close; ProposalsReader memory-maps
+# the rows, so opening a file only reads its index and a clip's boxes are only read when that clip is used.
+# Unlike pickle, reading a file cannot execute code, so uploaded proposals are safe to open.
+#
+# Legacy dense_proposals.pkl files are still read by load_proposals() (with an unpickler that only accepts
+# plain containers and numbers) and can be converted with:
+#   python -m processing_pipeline.services.proposals_store --pickle_path dense_proposals.pkl \
+#       --output_path dense.proposals
+
+import os
+import json
+import pickle
+import struct
+import logging
+import argparse
+from collections.abc import Mapping
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AVAPROP1"
+ROW_DTYPE = np.dtype([("x1", "<f8"), ("y1", "<f8"), ("x2", "<f8"), ("y2", "<f8"), ("score", "<f8"),
+                      ("track_id", "<i8")])
+PROPOSALS_SUFFIX = ".proposals"
+_TRAILER = struct.Struct("<Q8s")
+
+
+class ProposalsWriter:
+    """Append-only writer; the file is only readable once close() has written the index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._segments = []
+        self.num_rows = 0
+
+    def append(self, clip_id: str, frame_name: str, rows):
+        """Appends the `[x1, y1, x2, y2, score, track_id]` rows of one frame."""
+        rows = list(rows)
+        if any(len(row) != len(ROW_DTYPE) for row in rows):
+            raise ValueError(f"Proposals of {frame_name} must be [x1, y1, x2, y2, score, track_id] rows.")
+        block = np.array([tuple(row) for row in rows], dtype=ROW_DTYPE)
+        self._file.write(block.tobytes())
+        self._segments.append([clip_id, frame_name, self.num_rows, len(block)])
+        self.num_rows += len(block)
+
+    def append_clip(self, clip_id: str, frames: dict):
+        for frame_name, rows in frames.items():
+            self.append(clip_id, frame_name, rows)
+
+    def close(self):
+        if self._file.closed:
+            return
+        index = json.dumps({"num_rows": self.num_rows, "segments": self._segments}).encode("utf-8")
+        self._file.write(index)
+        self._file.write(_TRAILER.pack(len(index), MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProposalsReader(Mapping):
+    """
+    Read-only `{clip_id: {frame_name: [[x1, y1, x2, y2, score, track_id], ...]}}` view of a .proposals file, so
+    it can stand in for the unpickled dict. `rows(clip_id)` gives a clip's boxes as a structured array without
+    building lists. The last clip looked up is kept, since consumers tend to ask for one clip frame by frame.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if size < len(MAGIC) + _TRAILER.size or f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a proposals file.")
+            f.seek(size - _TRAILER.size)
+            index_size, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is incomplete (its writer was not closed).")
+            f.seek(size - _TRAILER.size - index_size)
+            index = json.loads(f.read(index_size))
+
+        self.num_rows = index["num_rows"]
+        self._rows = (np.memmap(path, dtype=ROW_DTYPE, mode="r", offset=len(MAGIC), shape=(self.num_rows,))
+                      if self.num_rows else np.zeros(0, dtype=ROW_DTYPE))
+        self._clips = {}
+        for clip_id, frame_name, start, count in index["segments"]:
+            self._clips.setdefault(clip_id, []).append((frame_name, start, count))
+        self._cached = (None, None)
+
+    def __getitem__(self, clip_id):
+        if self._cached[0] == clip_id:
+            return self._cached[1]
+        frames = {}
+        for frame_name, start, count in self._clips[clip_id]:
+            frames.setdefault(frame_name, []).extend(
+                list(row) for row in self._rows[start:start + count].tolist())
+        self._cached = (clip_id, frames)
+        return frames
+
+    def __iter__(self):
+        return iter(self._clips)
+
+    def __len__(self):
+        return len(self._clips)
+
+    def frame_names(self, clip_id):
+        return list(dict.fromkeys(frame_name for frame_name, _, _ in self._clips[clip_id]))
+
+    def rows(self, clip_id) -> np.ndarray:
+        """All boxes of a clip, in append order, as a ROW_DTYPE array."""
+        segments = [self._rows[start:start + count] for _, start, count in self._clips[clip_id]]
+        return np.concatenate(segments) if segments else np.zeros(0, dtype=ROW_DTYPE)
+
+
+def write_proposals(path: str, proposals: dict) -> int:
+    """Writes a `{clip_id: {frame_name: rows}}` dict; returns the number of rows."""
+    with ProposalsWriter(path) as writer:
+        for clip_id, frames in proposals.items():
+            writer.append_clip(clip_id, frames)
+    return writer.num_rows
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    # dicts, lists, tuples, strings and numbers need no globals; defaultdict(list) is the only class the
+    # proposal scripts ever pickled. Anything else (and so any code) is refused.
+    ALLOWED = {("collections", "defaultdict"), ("builtins", "list"), ("builtins", "dict")}
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a proposals pickle.")
+
+
+def read_legacy_pickle(path: str) -> dict:
+    with open(path, "rb") as f:
+        return _PlainUnpickler(f).load()
+
+
+def is_proposals_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_proposals(path: str):
+    """A ProposalsReader for a .proposals file, or the dict of a legacy dense_proposals.pkl."""
+    if is_proposals_file(path):
+        return ProposalsReader(path)
+    return read_legacy_pickle(path)
+
+
+def import_legacy_pickle(pickle_path: str, output_path: str) -> int:
+    num_rows = write_proposals(output_path, read_legacy_pickle(pickle_path))
+    logger.info(f"💾 Converted {pickle_path} to {output_path} ({num_rows} proposals).")
+    return num_rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Convert a legacy dense_proposals.pkl to a .proposals file.")
+    parser.add_argument("--pickle_path", required=True)
+    parser.add_argument("--output_path", default=None, help="Defaults to the pickle path with a .proposals suffix.")
+    args = parser.parse_args()
+    import_legacy_pickle(args.pickle_path, args.output_path or os.path.splitext(args.pickle_path)[0] + PROPOSALS_SUFFIX)
@@ -1,84 +1,86 @@
+# Run from the repository root:  python -m processing_pipeline.services.proposals_to_cvat --help
+
+import io
 import os
-import pickle
 import argparse
 import zipfile
-import cv2
 from tqdm import tqdm
 from collections import defaultdict
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
 import re
 import logging
 
+from processing_pipeline.services.cvat_xml import XmlStreamWriter
+from processing_pipeline.services.image_dims import image_size, ImageDimsIndex
+from processing_pipeline.services.proposals_store import load_proposals
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
 def get_image_dimensions(frame_path):
-    """Reads an image file and returns its width and height."""
-    try:
-        img = cv2.imread(frame_path)
-        if img is not None:
-            height, width, _ = img.shape
-            return width, height
-    except Exception as e:
-        logger.warning(f"Could not read image {frame_path}: {e}")
-    return None, None
+    """Returns the width and height of an image file, read from its header."""
+    size = image_size(frame_path)
+    if size is None:
+        logger.warning(f"Could not read image {frame_path}")
+        return None, None
+    return size
 
 
-def prettify_xml(elem):
-    """Return a pretty-printed XML string for the Element."""
-    rough_string = ET.tostring(elem, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
+def _attribute_options(attr_data):
+    """The selectable values of an attribute ("unknown" and blanks dropped) and its default, the first of them."""
+    valid_options = [opt.strip() for opt in attr_data['options'].values()
+                     if opt and opt.strip() and opt.lower() != 'unknown']
+    if not valid_options:
+        valid_options = ['not_specified']  # Fallback
+    return valid_options, valid_options[0]
 
 
-def generate_cvat_xml(frames_data, image_width, image_height, attributes_dict, clip_id):
+def write_cvat_xml(file, frames_data, image_width, image_height, attributes_dict, clip_id):
     """
-    Generates a robust CVAT XML 1.1 file, using correct frame indexing and filling track gaps.
+    Streams a robust CVAT XML 1.1 file to `file`, using correct frame indexing and filling track gaps.
     """
-    annotations = ET.Element('annotations')
-    ET.SubElement(annotations, 'version').text = '1.1'
-
-    meta = ET.SubElement(annotations, 'meta')
-    task = ET.SubElement(meta, 'task')
-    ET.SubElement(task, 'id').text = '0'
-    ET.SubElement(task, 'name').text = clip_id
-    ET.SubElement(task, 'size').text = str(len(frames_data))
-    ET.SubElement(task, 'mode').text = 'interpolation'
-    ET.SubElement(task, 'overlap').text = '0'
-
-    original_size = ET.SubElement(task, 'original_size')
-    ET.SubElement(original_size, 'width').text = str(image_width)
-    ET.SubElement(original_size, 'height').text = str(image_height)
-
-    labels = ET.SubElement(task, 'labels')
-    person_label = ET.SubElement(labels, 'label')
-    ET.SubElement(person_label, 'name').text = 'person'
-    ET.SubElement(person_label, 'color').text = '#ff0000'
-    attributes_xml = ET.SubElement(person_label, 'attributes')
+    xml = XmlStreamWriter(file)
+    xml.start('annotations')
+    xml.element('version', text='1.1')
+
+    xml.start('meta')
+    xml.start('task')
+    xml.element('id', text='0')
+    xml.element('name', text=clip_id)
+    xml.element('size', text=str(len(frames_data)))
+    xml.element('mode', text='interpolation')
+    xml.element('overlap', text='0')
+
+    xml.start('original_size')
+    xml.element('width', text=str(image_width))
+    xml.element('height', text=str(image_height))
+    xml.end()
+
+    xml.start('labels')
+    xml.start('label')
+    xml.element('name', text='person')
+    xml.element('color', text='#ff0000')
+    xml.start('attributes')
 
     # Create attributes without any "unknown" values in the header
+    attribute_options = []
     for attr_key, attr_data in attributes_dict.items():
-        attribute = ET.SubElement(attributes_xml, 'attribute')
-        ET.SubElement(attribute, 'name').text = attr_data['aname']
-        ET.SubElement(attribute, 'mutable').text = 'true'
-        ET.SubElement(attribute, 'input_type').text = 'select'
-        
-        all_options = list(attr_data['options'].values())
-        valid_options = []
-        for opt in all_options:
-            if opt and opt.strip() and opt.lower() != 'unknown':
-                valid_options.append(opt.strip())
-        
-        if not valid_options:
-            valid_options = ['not_specified']  # Fallback
-            
-        default_value = valid_options[0]
-        ET.SubElement(attribute, 'default_value').text = default_value
-        ET.SubElement(attribute, 'values').text = '\n'.join(valid_options)
-        
+        valid_options, default_value = _attribute_options(attr_data)
+        attribute_options.append((attr_data['aname'], valid_options, default_value))
+        xml.start('attribute')
+        xml.element('name', text=attr_data['aname'])
+        xml.element('mutable', text='true')
+        xml.element('input_type', text='select')
+        xml.element('default_value', text=default_value)
+        xml.element('values', text='\n'.join(valid_options))
+        xml.end()
+
         logger.info(f"Created attribute {attr_data['aname']}: default='{default_value}', options={valid_options}")
+    xml.end()  # attributes
+    xml.end()  # label
+    xml.end()  # labels
+    xml.end()  # task
+    xml.end()  # meta
 
     # Create a mapping from filename to a zero-based index
     sorted_frame_names = sorted(frames_data.keys(), key=lambda f: int(re.search(r'_(\d+)\.jpg$', f).group(1)))
@@ -98,9 +100,10 @@ def generate_cvat_xml(frames_data, image_width, image_height, attributes_dict, c
             tracks_data[track_id][frame_idx] = (bbox, attrs)
 
     for track_id, detections_by_frame in tracks_data.items():
-        track_xml = ET.SubElement(annotations, 'track', {'id': str(track_id), 'label': 'person'})
+        xml.start('track', {'id': str(track_id), 'label': 'person'})
 
         if not detections_by_frame:
+            xml.end()
             continue
 
         min_frame = min(detections_by_frame.keys())
@@ -126,15 +129,10 @@ def generate_cvat_xml(frames_data, image_width, image_height, attributes_dict, c
                 'xbr': str(x2), 'ybr': str(y2),
                 'outside': is_outside, 'occluded': '0', 'keyframe': is_keyframe
             }
-            box_xml = ET.SubElement(track_xml, 'box', box_attributes)
+            xml.start('box', box_attributes)
 
             # **CRITICAL FIX**: Validate and assign the correct attribute value for the box
-            for idx, (attr_key, attr_data) in enumerate(attributes_dict.items()):
-                # Get valid options and a default value for the current attribute
-                all_options = list(attr_data['options'].values())
-                valid_options = [opt.strip() for opt in all_options if opt and opt.strip() and opt.lower() != 'unknown']
-                default_value = valid_options[0] if valid_options else 'not_specified'
-                
+            for idx, (aname, valid_options, default_value) in enumerate(attribute_options):
                 # Get the value from the source data for this specific box
                 try:
                     source_value = attrs[idx]
@@ -144,15 +142,26 @@ def generate_cvat_xml(frames_data, image_width, image_height, attributes_dict, c
                 # Assign a valid value. If the source value is not in the valid options, use the default.
                 final_value = source_value if source_value in valid_options else default_value
                 
-                attr_element = ET.SubElement(box_xml, 'attribute', {'name': attr_data['aname']})
-                attr_element.text = final_value
+                xml.element('attribute', {'name': aname}, final_value)
+            xml.end()  # box
+        xml.end()  # track
+    xml.close()
 
-    return prettify_xml(annotations)
 
+def generate_cvat_xml(frames_data, image_width, image_height, attributes_dict, clip_id):
+    """
+    Generates a robust CVAT XML 1.1 file as a string (see write_cvat_xml).
+    """
+    buffer = io.StringIO()
+    write_cvat_xml(buffer, frames_data, image_width, image_height, attributes_dict, clip_id)
+    return buffer.getvalue()
 
-def process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_dir, attributes_dict):
+
+def process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_dir, attributes_dict,
+                 image_dims=None):
     """
     Generates a ZIP file with only frames and a separate XML file.
+    `image_dims` is the ImageDimsIndex of `frame_dir`; without one, the first frame's header is read.
     """
     clip_frame_path = os.path.join(frame_dir, video_id)
     if not os.path.isdir(clip_frame_path):
@@ -169,21 +178,22 @@ def process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_di
         logger.warning(f"No frames found in data for clip '{video_id}', skipping.")
         return False
 
-    width, height = get_image_dimensions(os.path.join(clip_frame_path, sorted_frame_names[0]))
+    if image_dims is not None:
+        width, height = image_dims.get(os.path.join(video_id, sorted_frame_names[0])) or (None, None)
+    else:
+        width, height = get_image_dimensions(os.path.join(clip_frame_path, sorted_frame_names[0]))
     if not width or not height:
         logger.error(f"Could not determine image dimensions for clip '{video_id}', skipping.")
         return False
 
-    xml_content = generate_cvat_xml(frames_data, width, height, attributes_dict, video_id)
-
-    # Save XML to its dedicated directory
+    # Stream the XML to its dedicated directory
     xml_path = os.path.join(output_xml_dir, f"{video_id}_annotations.xml")
     with open(xml_path, 'w', encoding='utf-8') as f:
-        f.write(xml_content)
+        write_cvat_xml(f, frames_data, width, height, attributes_dict, video_id)
 
-    # Create the ZIP file with only frames
+    # Create the ZIP file with only frames (stored: JPEGs do not deflate, compressing them only costs CPU)
     zip_path = os.path.join(output_zip_dir, f"{video_id}.zip")
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zf:
         for frame_name in sorted_frame_names:
             frame_file_path = os.path.join(clip_frame_path, frame_name)
             if os.path.exists(frame_file_path):
@@ -193,7 +203,8 @@ def process_clip(video_id, frames_data, frame_dir, output_zip_dir, output_xml_di
 
 def main():
     parser = argparse.ArgumentParser(description="Create separate ZIP and XML files from a dense proposal file.")
-    parser.add_argument('--pickle_path', type=str, required=True, help="Path to the dense_proposals.pkl file.")
+    parser.add_argument('--proposals_path', '--pickle_path', type=str, required=True,
+                        help="Path to the .proposals file (or a legacy dense_proposals.pkl).")
     parser.add_argument('--frame_dir', type=str, required=True, help="Root directory containing frame subdirectories.")
     parser.add_argument('--output_zip_dir', type=str, required=True, help="Directory to save the final ZIP files.")
     parser.add_argument('--output_xml_dir', type=str, required=True, help="Directory to save the final XML files.")
@@ -203,10 +214,9 @@ def main():
     os.makedirs(args.output_xml_dir, exist_ok=True)
 
     try:
-        with open(args.pickle_path, 'rb') as f:
-            proposals_data = pickle.load(f)
+        proposals_data = load_proposals(args.proposals_path)
     except FileNotFoundError:
-        logger.error(f"Pickle file not found at {args.pickle_path}")
+        logger.error(f"Proposals file not found at {args.proposals_path}")
         return
 
     # COMPLETELY CLEAN ATTRIBUTES - NO "unknown" ANYWHERE
@@ -294,10 +304,11 @@ def main():
         has_unknown = any(opt.lower() == 'unknown' for opt in options)
         logger.info(f"{attr_data['aname']}: {options} | Has 'unknown': {has_unknown}")
     
+    image_dims = ImageDimsIndex.load(args.frame_dir)
     success_count = 0
     for video_id, frames_data in tqdm(proposals_data.items(), desc="Processing clips"):
         if process_clip(video_id, frames_data, args.frame_dir, args.output_zip_dir, args.output_xml_dir,
-                         attributes_dict):
+                         attributes_dict, image_dims):
             success_count += 1
 
     print(f"\n🎉 Processing complete. Successfully created {success_count} ZIP and XML files.")
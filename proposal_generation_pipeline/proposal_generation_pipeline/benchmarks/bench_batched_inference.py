@@ -0,0 +1,72 @@
+# benchmarks/bench_batched_inference.py
+
+# Measures RF-DETR throughput of KeyframeSelector's micro-batched detection path for batch sizes 1-32.
+# Run from the pipeline root:  python -m benchmarks.bench_batched_inference --video path/to/clip.mp4
+
+import time
+import argparse
+import logging
+
+import cv2
+import numpy as np
+from rfdetr import RFDETRMedium
+
+from tools.keyframe_selector import KeyframeSelector
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_frames(video_path, num_frames, size=(1280, 720)):
+    """Reads `num_frames` RGB frames from a video, or makes random frames when no video is given."""
+    if not video_path:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8) for _ in range(num_frames)]
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"Could not read any frame from {video_path}")
+    # Loop short videos so every batch size sees the same number of frames.
+    return [frames[i % len(frames)] for i in range(num_frames)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched RF-DETR inference on CPU.")
+    parser.add_argument("--video", default=None, help="Optional clip to sample frames from (random frames otherwise).")
+    parser.add_argument("--num_frames", type=int, default=64, help="Frames pushed through the detector per run.")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.num_frames)
+    model = RFDETRMedium(device=args.device)
+    selector = KeyframeSelector(detection_model=model, device=args.device)
+
+    # Warm-up so lazy initialisation is not billed to the first batch size.
+    selector.batch_size = 1
+    selector._predict_batched(frames[:2])
+
+    results = []
+    for batch_size in args.batch_sizes:
+        selector.batch_size = batch_size
+        start = time.perf_counter()
+        selector._predict_batched(frames)
+        elapsed = time.perf_counter() - start
+        results.append((batch_size, len(frames) / elapsed))
+        logger.info(f"batch_size={batch_size:3d}: {len(frames) / elapsed:7.2f} frames/sec")
+
+    baseline = results[0][1]
+    print("\nbatch_size  frames/sec  speedup")
+    for batch_size, fps in results:
+        print(f"{batch_size:10d}  {fps:10.2f}  {fps / baseline:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/bench_cvat_xml.py
+
+# Time and peak memory of Stage 7 (tools.proposals_to_cvat.generate_xml_for_batch) on a synthetic batch,
+# against the previous ElementTree + minidom implementation, and a byte-for-byte check of the two outputs.
+# Run from the pipeline root:  python -m benchmarks.bench_cvat_xml --num_boxes 100000
+
+import os
+import time
+import argparse
+import logging
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+import cv2
+import numpy as np
+
+import tools.proposals_to_cvat as proposals_to_cvat
+from tools.proposals_store import load_proposals, write_proposals
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def reference_xml_for_batch(batch_name, proposals_path, keyframes_dir, output_xml_path):
+    """The tree-building implementation generate_xml_for_batch replaced, kept as the output reference."""
+    proposals_data = load_proposals(proposals_path)
+    attributes_dict = {
+        'work_activity': dict(aname='work_activity', default='idle', options=['idle', 'welding', 'cutting', 'lifting']),
+        'ppe_helmet': dict(aname='ppe_helmet', default='no_helmet', options=['no_helmet', 'helmet_worn']),
+    }
+    annotations = ET.Element('annotations')
+    ET.SubElement(annotations, 'version').text = '1.1'
+    meta = ET.SubElement(annotations, 'meta')
+    task = ET.SubElement(meta, 'task')
+    ET.SubElement(task, 'name').text = batch_name
+    ET.SubElement(task, 'mode').text = 'annotation'
+    labels_xml = ET.SubElement(task, 'labels')
+    person_label = ET.SubElement(labels_xml, 'label')
+    ET.SubElement(person_label, 'name').text = 'person'
+    ET.SubElement(person_label, 'color').text = '#ff0000'
+    attributes_xml = ET.SubElement(person_label, 'attributes')
+    for attr_data in attributes_dict.values():
+        attribute = ET.SubElement(attributes_xml, 'attribute')
+        ET.SubElement(attribute, 'name').text = attr_data['aname']
+        ET.SubElement(attribute, 'mutable').text = 'true'
+        ET.SubElement(attribute, 'input_type').text = 'select'
+        ET.SubElement(attribute, 'default_value').text = attr_data['default']
+        ET.SubElement(attribute, 'values').text = '\n'.join(attr_data['options'])
+
+    image_id = 0
+    all_keyframes = sorted(frame_name for clip_id in proposals_data for frame_name in proposals_data[clip_id])
+    for frame_name in all_keyframes:
+        frame_path = os.path.join(keyframes_dir, frame_name)
+        if not os.path.exists(frame_path):
+            continue
+        height, width, _ = cv2.imread(frame_path).shape
+        clip_id = '_'.join(frame_name.split('_')[:-2])
+        image_xml = ET.SubElement(annotations, 'image', {
+            'id': str(image_id), 'name': frame_name, 'width': str(width), 'height': str(height)})
+        for det in proposals_data.get(clip_id, {}).get(frame_name, []):
+            bbox = det[0:4]
+            box_xml = ET.SubElement(image_xml, 'box', {
+                'label': 'person', 'occluded': '0',
+                'xtl': str(bbox[0]), 'ytl': str(bbox[1]), 'xbr': str(bbox[2]), 'ybr': str(bbox[3])})
+            for attr_data in attributes_dict.values():
+                ET.SubElement(box_xml, 'attribute', {'name': attr_data['aname']}).text = attr_data['default']
+        image_id += 1
+
+    reparsed = minidom.parseString(ET.tostring(annotations, 'utf-8'))
+    with open(output_xml_path, 'w', encoding='utf-8') as f:
+        f.write(reparsed.toprettyxml(indent="  "))
+
+
+def make_batch(work_dir, num_boxes, boxes_per_frame, seed=0):
+    """A .proposals file with `num_boxes` boxes over one keyframe per clip, and tiny keyframe JPEGs for it."""
+    rng = np.random.default_rng(seed)
+    keyframes_dir = os.path.join(work_dir, "keyframes")
+    os.makedirs(keyframes_dir)
+    jpeg = cv2.imencode(".jpg", np.zeros((36, 64, 3), np.uint8))[1].tobytes()
+    proposals = {}
+    for clip in range(-(-num_boxes // boxes_per_frame)):
+        clip_id = f"{clip // 4}_clip_{clip % 4:03d}"
+        frame_name = f"{clip_id}_frame_{int(rng.integers(0, 450)):04d}.jpg"
+        count = min(boxes_per_frame, num_boxes - clip * boxes_per_frame)
+        xy = rng.uniform(0, 1200, (count, 2))
+        wh = rng.uniform(20, 200, (count, 2))
+        proposals[clip_id] = {frame_name: [[*map(float, np.concatenate([p, p + s])), 1.0, i + 1]
+                                           for i, (p, s) in enumerate(zip(xy, wh))]}
+        with open(os.path.join(keyframes_dir, frame_name), "wb") as f:
+            f.write(jpeg)
+    proposals_path = os.path.join(work_dir, "dense.proposals")
+    write_proposals(proposals_path, proposals)
+    return proposals_path, keyframes_dir
+
+
+def measure(func, *args):
+    """Wall time of one run, and the peak traced memory of a second one (tracemalloc slows Python down)."""
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming CVAT XML generation.")
+    parser.add_argument("--num_boxes", type=int, default=100000)
+    parser.add_argument("--boxes_per_frame", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        proposals_path, keyframes_dir = make_batch(work_dir, args.num_boxes, args.boxes_per_frame)
+        logger.info(f"🧪 Batch of {args.num_boxes} boxes over {len(os.listdir(keyframes_dir))} keyframes ready.")
+        results = {}
+        for name, func in (("reference", reference_xml_for_batch),
+                           ("streaming", proposals_to_cvat.generate_xml_for_batch)):
+            output_xml = os.path.join(work_dir, f"{name}.xml")
+            results[name] = (*measure(func, "bench", proposals_path, keyframes_dir, output_xml), output_xml)
+
+        with open(results["reference"][2], "rb") as a, open(results["streaming"][2], "rb") as b:
+            identical = a.read() == b.read()
+        xml_mb = os.path.getsize(results["streaming"][2]) / 1e6
+
+    print(f"\n{args.num_boxes} boxes, XML {xml_mb:.1f} MB, byte-identical: {identical}")
+    print("implementation   seconds   peak_mb")
+    for name, (elapsed, peak, _) in results.items():
+        print(f"{name:14s}  {elapsed:8.2f}  {peak / 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_keyframe_memory.py
+
+# Measures the peak RSS and time of KeyframeSelector.select_best_keyframe for growing candidate windows.
+# Every window size runs in a fresh process, so ru_maxrss is not inherited from an earlier, larger run.
+# Run from the pipeline root:  python -m benchmarks.bench_keyframe_memory --clips_dir path/to/clips
+
+import time
+import argparse
+import logging
+import resource
+import multiprocessing
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(job):
+    clip_paths, window_secs, batch_size, device = job
+    from rfdetr import RFDETRMedium
+    from tools.keyframe_selector import KeyframeSelector
+
+    selector = KeyframeSelector(detection_model=RFDETRMedium(device=device), device=device, batch_size=batch_size)
+    # Warm up on the smallest window so model initialisation is part of the baseline, not of the window.
+    selector.select_best_keyframe(clip_paths[0], center_window_secs=0.5)
+    baseline = _peak_rss_mb()
+
+    start = time.perf_counter()
+    for clip_path in clip_paths:
+        selector.select_best_keyframe(clip_path, center_window_secs=window_secs)
+    elapsed = time.perf_counter() - start
+    return window_secs, baseline, _peak_rss_mb(), elapsed / len(clip_paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyframe selection memory for growing windows.")
+    parser.add_argument("--clips_dir", required=True, help="Folder with clipped .mp4 videos.")
+    parser.add_argument("--max_clips", type=int, default=5)
+    parser.add_argument("--window_secs", type=float, nargs="+", default=[2.0, 4.0, 8.0, 15.0])
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    clip_paths = [str(p) for p in sorted(Path(args.clips_dir).glob("*.mp4"))[:args.max_clips]]
+    if not clip_paths:
+        raise SystemExit(f"No .mp4 clips found in {args.clips_dir}")
+
+    ctx = multiprocessing.get_context("spawn")
+    report = []
+    for window_secs in args.window_secs:
+        with ctx.Pool(processes=1) as pool:
+            report.append(pool.apply(_run, ((clip_paths, window_secs, args.batch_size, args.device),)))
+        logger.info(f"window={window_secs:g}s done.")
+
+    print("\nwindow_secs  baseline_MB  peak_rss_MB  selection_MB  s/clip")
+    for window_secs, baseline, peak, per_clip in report:
+        print(f"{window_secs:11g}  {baseline:11.1f}  {peak:11.1f}  {peak - baseline:12.1f}  {per_clip:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_keyframe_zip.py
+
+# Stage 4/5 keyframe output: serial cv2.imwrite followed by a ZIP_DEFLATED pass over the folder (the previous
+# implementation) against tools.jpeg_zip.JpegZipWriter, which encodes in threads and stores the JPEGs in the
+# ZIP as they are written. Also checks that both produce the same JPEG bytes.
+# Run from the pipeline root:  python -m benchmarks.bench_keyframe_zip --num_frames 200
+
+import os
+import time
+import zipfile
+import argparse
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+from tools.jpeg_zip import JpegZipWriter, DEFAULT_JPEG_QUALITY
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def make_frames(num_frames, size=(1280, 720), seed=0):
+    """Camera-like frames: a smooth gradient with noise and a few rectangles, so JPEG sizes are realistic."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    xs, ys = np.meshgrid(np.linspace(40, 200, width), np.linspace(60, 180, height))
+    background = np.dstack([xs, ys, np.full((height, width), 120.0)]).astype(np.uint8)
+    frames = []
+    for _ in range(num_frames):
+        frame = cv2.add(background, rng.integers(0, 12, background.shape, dtype=np.uint8))
+        for _ in range(8):
+            x, y = int(rng.integers(0, width - 60)), int(rng.integers(0, height - 160))
+            cv2.rectangle(frame, (x, y), (x + 50, y + 150), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+        frames.append(frame)
+    return frames
+
+
+def write_reference(frames, keyframes_dir, zip_path, quality):
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(keyframes_dir, f"frame_{i:04d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name in sorted(os.listdir(keyframes_dir)):
+            zf.write(os.path.join(keyframes_dir, name), arcname=name)
+
+
+def write_pooled(frames, keyframes_dir, zip_path, quality, workers=None):
+    with JpegZipWriter(zip_path, keyframes_dir, quality, workers) as writer:
+        for i, frame in enumerate(frames):
+            writer.add_frame(f"frame_{i:04d}.jpg", frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threaded keyframe encoding with a stored ZIP.")
+    parser.add_argument("--num_frames", type=int, default=200)
+    parser.add_argument("--quality", type=int, default=DEFAULT_JPEG_QUALITY)
+    parser.add_argument("--workers", type=int, default=None, help="Encoder threads (default: one per core).")
+    args = parser.parse_args()
+
+    frames = make_frames(args.num_frames)
+    logger.info(f"🖼️ {len(frames)} frames of 1280x720 ready; {os.cpu_count()} core(s).")
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, func in (("imwrite+deflate", write_reference), ("pooled+stored", write_pooled)):
+            keyframes_dir = os.path.join(work_dir, name)
+            os.makedirs(keyframes_dir)
+            zip_path = os.path.join(work_dir, f"{name}.zip")
+            start = time.perf_counter()
+            func(frames, keyframes_dir, zip_path, args.quality)
+            results[name] = (time.perf_counter() - start, os.path.getsize(zip_path) / 1e6)
+        with zipfile.ZipFile(os.path.join(work_dir, "imwrite+deflate.zip")) as a, \
+                zipfile.ZipFile(os.path.join(work_dir, "pooled+stored.zip")) as b:
+            identical = (sorted(a.namelist()) == sorted(b.namelist())
+                         and all(a.read(name) == b.read(name) for name in a.namelist()))
+
+    print(f"\n{args.num_frames} frames, identical JPEGs: {identical}")
+    print("implementation     seconds   zip_mb")
+    for name, (elapsed, zip_mb) in results.items():
+        print(f"{name:16s}  {elapsed:8.2f}  {zip_mb:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
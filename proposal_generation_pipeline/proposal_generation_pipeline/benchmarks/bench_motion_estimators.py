@@ -0,0 +1,109 @@
+# benchmarks/bench_motion_estimators.py
+
+# Times every motion estimator on the candidate windows of real clips and reports how well each one
+# agrees with the original full-resolution Farneback scores.
+# Run from the pipeline root:  python -m benchmarks.bench_motion_estimators --clips_dir path/to/clips
+
+import time
+import argparse
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+from scipy.stats import spearmanr
+from rfdetr import RFDETRMedium
+
+from tools.frame_reader import read_window
+from tools.keyframe_selector import KeyframeSelector
+from tools.motion_estimators import MOTION_ESTIMATORS, build_motion_estimator
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class _ReplayDetector:
+    """Hands back pre-computed detections in call order, so selections are not billed for inference."""
+
+    def __init__(self, detections):
+        self._detections = detections
+        self._cursor = 0
+
+    def predict(self, images, threshold=0.5):
+        count = len(images) if isinstance(images, list) else 1
+        dets = self._detections[self._cursor:self._cursor + count]
+        self._cursor += count
+        return dets if isinstance(images, list) else dets[0]
+
+
+def load_clip(selector, clip_path, center_window_secs=4.0, candidate_stride=3):
+    """Reads the selector's candidate window and runs the real detector once on it."""
+    cap = cv2.VideoCapture(str(clip_path))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    indices, _ = KeyframeSelector.plan_candidates(total_frames, fps, center_window_secs, candidate_stride)
+    candidates = list(read_window(cap, int(indices[0]), int(indices[-1]) + 1, candidate_stride)) if indices.size else []
+    cap.release()
+    detections = selector._predict_batched([cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for _, f in candidates])
+    return candidates, total_frames, detections
+
+
+def motion_scores(estimator, candidates, detections, person_class_id=1):
+    """Per-candidate motion scores, computed exactly as KeyframeSelector does."""
+    scores, prev_gray = [], None
+    for (_, frame), dets in zip(candidates, detections):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        score = 0
+        person_mask = dets.class_id == person_class_id
+        if prev_gray is not None and person_mask.any():
+            score = estimator.score(prev_gray, gray, dets.xyxy[person_mask].astype(int))
+        scores.append(score)
+        prev_gray = gray
+    return np.asarray(scores, dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark motion estimators against full-resolution Farneback.")
+    parser.add_argument("--clips_dir", required=True, help="Folder with clipped .mp4 videos.")
+    parser.add_argument("--max_clips", type=int, default=20)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    clip_paths = sorted(Path(args.clips_dir).glob("*.mp4"))[:args.max_clips]
+    selector = KeyframeSelector(detection_model=RFDETRMedium(device=args.device), device=args.device)
+    clips = [(p, *load_clip(selector, p)) for p in clip_paths]
+    clips = [c for c in clips if c[1]]
+    logger.info(f"Loaded candidate windows for {len(clips)} clips.")
+
+    reference = {}
+    report = []
+    for name in MOTION_ESTIMATORS:
+        estimator = build_motion_estimator(name)
+        elapsed, pairs, rhos, same_keyframe = 0.0, 0, [], 0
+        for clip_path, candidates, total_frames, detections in clips:
+            start = time.perf_counter()
+            scores = motion_scores(estimator, candidates, detections, selector.person_class_id)
+            elapsed += time.perf_counter() - start
+            pairs += max(0, len(candidates) - 1)
+
+            selector.model = _ReplayDetector(detections)
+            selector.motion_estimator = estimator
+            best_idx = selector.select_from_frames(candidates, total_frames, clip_path.name)[1]
+
+            if name == "farneback":
+                reference[clip_path] = (scores, best_idx)
+            ref_scores, ref_best = reference[clip_path]
+            if np.ptp(scores) > 0 and np.ptp(ref_scores) > 0:
+                rhos.append(spearmanr(ref_scores, scores).correlation)
+            same_keyframe += int(best_idx == ref_best)
+
+        report.append((name, 1000 * elapsed / max(1, pairs), np.mean(rhos) if rhos else float("nan"),
+                       same_keyframe / max(1, len(clips))))
+
+    print("\nestimator        ms/pair  spearman_vs_farneback  same_keyframe")
+    for name, ms, rho, agree in report:
+        print(f"{name:15s}  {ms:7.2f}  {rho:21.3f}  {agree:13.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# benchmarks/bench_onnx_parity.py
+
+# Parity and speed of ONNX exports of RF-DETR (tools/detector_backends.py) against the PyTorch model on a
+# sample of keyframes: boxes of the same class are matched by IoU (Hungarian), and the report gives the share
+# of PyTorch boxes the export reproduces, their IoU and confidence differences, and per-frame latency.
+# Run from the pipeline root:
+#   python -m benchmarks.bench_onnx_parity --keyframes_dir outputs/<batch>/keyframes \
+#       --onnx_paths models/rfdetr_medium/inference_model.onnx models/rfdetr_medium/inference_model.int8.onnx
+
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tools.byte_tracker import ious
+from tools.detector_backends import OnnxDetector
+from tools.detector_registry import get_detector
+from benchmarks.bench_batched_inference import load_frames
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_keyframes(keyframes_dir, num_images):
+    """Up to `num_images` RGB keyframes, evenly spaced over the sorted JPEGs of `keyframes_dir`."""
+    paths = sorted(Path(keyframes_dir).glob("*.jpg"))
+    if not paths:
+        raise RuntimeError(f"No .jpg keyframes in {keyframes_dir}")
+    step = max(1, len(paths) // num_images)
+    return [cv2.cvtColor(cv2.imread(str(p)), cv2.COLOR_BGR2RGB) for p in paths[::step][:num_images]]
+
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """Pairs of (reference, candidate) indices with the same class and IoU >= iou_threshold, and their IoUs."""
+    ref_boxes = np.asarray(reference.xyxy, dtype=float).reshape(-1, 4)
+    cand_boxes = np.asarray(candidate.xyxy, dtype=float).reshape(-1, 4)
+    overlap = ious(ref_boxes, cand_boxes)
+    overlap[np.asarray(reference.class_id)[:, None] != np.asarray(candidate.class_id)[None, :]] = 0.0
+    rows, cols = linear_sum_assignment(-overlap) if overlap.size else (np.zeros(0, int), np.zeros(0, int))
+    keep = overlap[rows, cols] >= iou_threshold
+    return rows[keep], cols[keep], overlap[rows[keep], cols[keep]]
+
+
+class ParityAccumulator:
+    def __init__(self, iou_threshold=0.5):
+        self.iou_threshold = iou_threshold
+        self.reference_boxes = 0
+        self.candidate_boxes = 0
+        self.matches = 0
+        self.frames = 0
+        self.frames_in_agreement = 0
+        self.matched_ious = []
+        self.confidence_diffs = []
+
+    def update(self, reference, candidate):
+        rows, cols, matched_ious = match_detections(reference, candidate, self.iou_threshold)
+        num_ref, num_cand = len(reference.xyxy), len(candidate.xyxy)
+        self.reference_boxes += num_ref
+        self.candidate_boxes += num_cand
+        self.matches += len(rows)
+        self.frames += 1
+        # A frame agrees when every box of either model has its counterpart in the other.
+        self.frames_in_agreement += int(len(rows) == num_ref == num_cand)
+        self.matched_ious.extend(matched_ious.tolist())
+        self.confidence_diffs.extend(np.abs(np.asarray(reference.confidence)[rows]
+                                            - np.asarray(candidate.confidence)[cols]).tolist())
+
+    def summary(self):
+        recall = self.matches / self.reference_boxes if self.reference_boxes else None
+        precision = self.matches / self.candidate_boxes if self.candidate_boxes else None
+        f1 = 2 * recall * precision / (recall + precision) if recall and precision else None
+        return {
+            "reference_boxes": self.reference_boxes, "candidate_boxes": self.candidate_boxes,
+            "matched": self.matches, "recall": recall, "precision": precision, "f1": f1,
+            "frame_agreement": self.frames_in_agreement / self.frames if self.frames else None,
+            "mean_iou": float(np.mean(self.matched_ious)) if self.matched_ious else None,
+            "mean_abs_confidence_diff": float(np.mean(self.confidence_diffs)) if self.confidence_diffs else None,
+            "max_abs_confidence_diff": float(np.max(self.confidence_diffs)) if self.confidence_diffs else None,
+        }
+
+
+def timed_predictions(model, frames, threshold, warmup=2):
+    """Detections of every frame (one at a time, as KeyframeSelector's fallback and PersonTracker run) and the
+    per-frame latencies in ms."""
+    for frame in frames[:warmup]:
+        model.predict(frame, threshold=threshold)
+    detections, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(model.predict(frame, threshold=threshold))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return detections, np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ONNX exports of RF-DETR with the PyTorch model.")
+    parser.add_argument("--onnx_paths", nargs="+", required=True, help="Exported models (e.g. fp32 and int8).")
+    parser.add_argument("--keyframes_dir", default=None, help="Folder of keyframe JPEGs to sample from.")
+    parser.add_argument("--video", default=None, help="Sample frames from this clip instead of keyframes.")
+    parser.add_argument("--num_images", type=int, default=50)
+    parser.add_argument("--model", default="RFDETRMedium", help="PyTorch reference model.")
+    parser.add_argument("--device", default="cpu", help="Device of the PyTorch reference.")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--iou_threshold", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime intra-op threads.")
+    parser.add_argument("--output", default=None, help="Optional result JSON.")
+    args = parser.parse_args()
+
+    frames = (load_keyframes(args.keyframes_dir, args.num_images) if args.keyframes_dir
+              else load_frames(args.video, args.num_images))
+    logger.info(f"🖼️ {len(frames)} frames sampled.")
+
+    reference, reference_ms = timed_predictions(get_detector(args.model, args.device, args.threshold), frames,
+                                                args.threshold)
+    results = {"frames": len(frames), "reference": {"model": args.model, "device": args.device,
+                                                    "p50_ms": float(np.median(reference_ms))}, "onnx": {}}
+    for onnx_path in args.onnx_paths:
+        detections, onnx_ms = timed_predictions(OnnxDetector(onnx_path, num_threads=args.threads), frames,
+                                                args.threshold)
+        parity = ParityAccumulator(args.iou_threshold)
+        for ref, dets in zip(reference, detections):
+            parity.update(ref, dets)
+        results["onnx"][onnx_path] = {"p50_ms": float(np.median(onnx_ms)),
+                                      "speedup": float(np.median(reference_ms) / np.median(onnx_ms)),
+                                      **parity.summary()}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Results saved to {args.output}")
+
+    print(f"\nreference {args.model} ({args.device}): {results['reference']['p50_ms']:.1f} ms/frame")
+    print("model                                     p50_ms  speedup  recall  precision  frame_agree  mean_iou  "
+          "conf_diff")
+    for onnx_path, r in results["onnx"].items():
+        print(f"{Path(onnx_path).name:40s}  {r['p50_ms']:6.1f}  {r['speedup']:6.2f}x  {r['recall'] or 0:6.3f}  "
+              f"{r['precision'] or 0:9.3f}  {r['frame_agreement'] or 0:11.3f}  {r['mean_iou'] or 0:8.3f}  "
+              f"{r['mean_abs_confidence_diff'] or 0:9.4f}")
+
+
+if __name__ == "__main__":
+    main()
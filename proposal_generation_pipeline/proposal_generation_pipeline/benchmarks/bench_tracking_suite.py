@@ -0,0 +1,182 @@
+# benchmarks/bench_tracking_suite.py
+
+# Throughput and correctness of PersonTracker.track_clip() and KeyframeSelector on synthetic CCTV sequences
+# (benchmarks/synthetic_cctv.py), with MockDetector in place of RF-DETR. Reports frames/sec, per-stage latency
+# percentiles, MOTA and ID switches per crowd size and saves everything to JSON, so runs can be compared
+# over time (--baseline prints the differences to an earlier result file).
+# Run from the pipeline root:  python -m benchmarks.bench_tracking_suite [--baseline outputs/benchmarks/old.json]
+
+import os
+import json
+import time
+import argparse
+import logging
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from tools.byte_tracker import BYTETracker
+from tools.person_tracker import PersonTracker
+from tools.keyframe_selector import KeyframeSelector
+from benchmarks.synthetic_cctv import MockDetector, generate_sequence, mock_rfdetr
+from benchmarks.tracking_metrics import MotAccumulator, StageTimer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def timed_tracker(timer: StageTimer):
+    """Times BYTETracker.update (detector frames) and predict (skipped frames) as stage "track"."""
+    original = {name: getattr(BYTETracker, name) for name in ("update", "predict")}
+    for name, func in original.items():
+        setattr(BYTETracker, name, timer.wrap("track", func))
+    try:
+        yield
+    finally:
+        for name, func in original.items():
+            setattr(BYTETracker, name, func)
+
+
+def _split_ground_truth(gt, min_visibility):
+    visible = gt[:, 5] >= min_visibility
+    return gt[visible, 0].astype(int).tolist(), gt[visible, 1:5], gt[~visible, 1:5]
+
+
+def run_tracker_benchmark(sequence, detect_every=1, min_visibility=0.5):
+    """Streams one sequence through PersonTracker.track_clip() and scores the tracks against the ground truth."""
+    timer = StageTimer()
+    detector = MockDetector(class_id=0)
+    detector.predict = timer.wrap("detect", detector.predict)
+    with mock_rfdetr(detector):
+        tracker = PersonTracker(video_id="synthetic")
+
+    accumulator = MotAccumulator()
+    stream = tracker.track_clip(sequence.video_path, detect_every=detect_every)
+    start = time.perf_counter()
+    with timed_tracker(timer):
+        while True:
+            busy = timer.total("detect") + timer.total("track")
+            frame_start = time.perf_counter()
+            item = next(stream, None)
+            if item is None:
+                break
+            frame_secs = time.perf_counter() - frame_start
+            timer.add("frame", frame_secs)
+            # Whatever the frame took besides detection and tracking is decoding (and colour conversion).
+            timer.add("decode", frame_secs - (timer.total("detect") + timer.total("track") - busy))
+
+            frame_idx, _, tracks = item
+            gt_ids, gt_boxes, ignored = _split_ground_truth(sequence.ground_truth[frame_idx], min_visibility)
+            accumulator.update(gt_ids, gt_boxes, [t["track_id"] for t in tracks], [t["bbox"] for t in tracks],
+                               ignored)
+    elapsed = time.perf_counter() - start
+
+    frames = len(timer.samples["frame"])
+    return {"frames": frames, "frames_per_sec": frames / elapsed if elapsed else None,
+            "latency": timer.summary(), "mot": accumulator.summary()}
+
+
+def run_keyframe_benchmark(sequence, keyframes_per_clip=1, min_visibility=0.5):
+    """Selects keyframes from one sequence and checks how many visible people their detections cover."""
+    timer = StageTimer()
+    detector = MockDetector(class_id=1)
+    detector.predict = timer.wrap("detect", detector.predict)
+    selector = KeyframeSelector(detection_model=detector, device="cpu")
+
+    with timer.stage("clip"):
+        keyframes = selector.select_clip_keyframes(sequence.video_path, keyframes_per_clip)
+
+    recalls = []
+    for _, frame_idx, detections in keyframes:
+        gt_ids, gt_boxes, ignored = _split_ground_truth(sequence.ground_truth[frame_idx], min_visibility)
+        accumulator = MotAccumulator()
+        accumulator.update(gt_ids, gt_boxes, [d["track_id"] for d in detections], [d["bbox"] for d in detections],
+                           ignored)
+        recalls.append(accumulator.summary()["recall"])
+    recalls = [r for r in recalls if r is not None]
+    clip_secs = timer.total("clip")
+    return {"keyframes": [int(frame_idx) for _, frame_idx, _ in keyframes],
+            "clip_secs": clip_secs, "detector_calls": len(timer.samples["detect"]),
+            "latency": timer.summary(), "keyframe_recall": float(np.mean(recalls)) if recalls else None}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, baseline=None):
+    """One line per crowd size; with a baseline, the change to the same crowd size in it."""
+    print("\npeople  tracker_fps  frame_p50_ms  frame_p99_ms    MOTA  id_sw  keyframe_s  kf_recall")
+    for key, run in results["scenarios"].items():
+        tracker, keyframes = run["tracker"], run["keyframes"]
+        frame = tracker["latency"]["frame"]
+        line = (f"{key:>6}  {tracker['frames_per_sec']:11.1f}  {frame['p50_ms']:12.2f}  {frame['p99_ms']:12.2f}  "
+                f"{tracker['mot']['mota']:6.3f}  {tracker['mot']['id_switches']:5d}  "
+                f"{keyframes['clip_secs']:10.2f}  {keyframes['keyframe_recall'] or 0:9.3f}")
+        old = (baseline or {}).get("scenarios", {}).get(key)
+        if old:
+            fps_change = tracker["frames_per_sec"] / old["tracker"]["frames_per_sec"] - 1
+            line += (f"   vs baseline: fps {fps_change:+.1%}, MOTA {tracker['mot']['mota'] - old['tracker']['mot']['mota']:+.3f}, "
+                     f"id_sw {tracker['mot']['id_switches'] - old['tracker']['mot']['id_switches']:+d}")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PersonTracker and KeyframeSelector on synthetic CCTV.")
+    parser.add_argument("--num_people", type=int, nargs="+", default=[4, 12, 24], help="Crowd sizes to run.")
+    parser.add_argument("--num_frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--detect_every", type=int, default=1, help="PersonTracker.track_clip() detector stride.")
+    parser.add_argument("--keyframes_per_clip", type=int, default=1)
+    parser.add_argument("--min_visibility", type=float, default=0.5,
+                        help="People less visible than this are not expected to be tracked.")
+    parser.add_argument("--output", default=None,
+                        help="Result JSON (default outputs/benchmarks/tracking_suite_<timestamp>.json).")
+    parser.add_argument("--baseline", default=None, help="Earlier result JSON to compare against.")
+    parser.add_argument("--keep_videos", default=None, help="Keep the generated sequences in this folder.")
+    args = parser.parse_args()
+
+    created = datetime.now()
+    results = {"created": created.isoformat(timespec="seconds"), "git_commit": _git_commit(),
+               "config": vars(args), "scenarios": {}}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_dir = args.keep_videos or tmp_dir
+        os.makedirs(video_dir, exist_ok=True)
+        for num_people in args.num_people:
+            video_path = os.path.join(video_dir, f"synthetic_{num_people}p_seed{args.seed}.mp4")
+            sequence = generate_sequence(video_path, num_people, args.num_frames, (args.width, args.height),
+                                         args.fps, args.seed)
+            logger.info(f"🎬 {num_people} people: {sequence.num_frames} frames generated.")
+            results["scenarios"][str(num_people)] = {
+                "tracker": run_tracker_benchmark(sequence, args.detect_every, args.min_visibility),
+                "keyframes": run_keyframe_benchmark(sequence, args.keyframes_per_clip, args.min_visibility),
+            }
+
+    output = args.output or os.path.join("outputs", "benchmarks",
+                                         f"tracking_suite_{created.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"💾 Results saved to {output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
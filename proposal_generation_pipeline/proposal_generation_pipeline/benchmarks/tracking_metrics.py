@@ -0,0 +1,127 @@
+# benchmarks/tracking_metrics.py
+
+# Correctness and latency metrics for the benchmark suite: CLEAR-MOT counts (MOTA, MOTP, ID switches) of
+# tracker output against ground truth, and per-stage latency percentiles.
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tools.byte_tracker import ious
+
+
+class MotAccumulator:
+    """
+    Accumulates CLEAR-MOT counts frame by frame. A ground-truth person keeps its previous match while the
+    IoU stays above the threshold; the others are assigned by Hungarian matching on IoU. A person matched to
+    a different track ID than the last time they were matched counts as an ID switch.
+    """
+
+    def __init__(self, iou_threshold=0.5):
+        self.iou_threshold = iou_threshold
+        self.num_gt = 0
+        self.matches = 0
+        self.false_positives = 0
+        self.false_negatives = 0
+        self.id_switches = 0
+        self.iou_sum = 0.0
+        self._last_match = {}  # ground-truth id -> track id it was last matched to
+
+    def update(self, gt_ids, gt_boxes, track_ids, track_boxes, ignored_boxes=None):
+        """
+        One frame. Boxes are (N, 4) x1, y1, x2, y2 arrays. Tracks that only cover an `ignored_boxes` person
+        (e.g. one that is mostly occluded) count neither as matches nor as false positives.
+        """
+        gt_boxes = np.asarray(gt_boxes, dtype=float).reshape(-1, 4)
+        track_boxes = np.asarray(track_boxes, dtype=float).reshape(-1, 4)
+        overlap = ious(gt_boxes, track_boxes)
+        matched = {}  # gt row -> track row
+
+        # Keep last frame's correspondences that still hold.
+        track_rows = {tid: j for j, tid in enumerate(track_ids)}
+        for i, gid in enumerate(gt_ids):
+            j = track_rows.get(self._last_match.get(gid))
+            if j is not None and j not in matched.values() and overlap[i, j] >= self.iou_threshold:
+                matched[i] = j
+
+        free_gt = [i for i in range(len(gt_ids)) if i not in matched]
+        free_tracks = [j for j in range(len(track_ids)) if j not in matched.values()]
+        if free_gt and free_tracks:
+            sub = overlap[np.ix_(free_gt, free_tracks)]
+            for r, c in zip(*linear_sum_assignment(-sub)):
+                if sub[r, c] >= self.iou_threshold:
+                    matched[free_gt[r]] = free_tracks[c]
+
+        for i, j in matched.items():
+            gid, tid = gt_ids[i], track_ids[j]
+            if gid in self._last_match and self._last_match[gid] != tid:
+                self.id_switches += 1
+            self._last_match[gid] = tid
+            self.iou_sum += overlap[i, j]
+
+        unmatched_tracks = [j for j in range(len(track_ids)) if j not in matched.values()]
+        if ignored_boxes is not None and len(ignored_boxes) and unmatched_tracks:
+            covered = ious(np.asarray(ignored_boxes, dtype=float).reshape(-1, 4), track_boxes[unmatched_tracks])
+            unmatched_tracks = [j for j, hit in zip(unmatched_tracks, covered.max(axis=0)) if hit < self.iou_threshold]
+
+        self.num_gt += len(gt_ids)
+        self.matches += len(matched)
+        self.false_negatives += len(gt_ids) - len(matched)
+        self.false_positives += len(unmatched_tracks)
+
+    def summary(self):
+        errors = self.false_negatives + self.false_positives + self.id_switches
+        return {
+            "mota": 1.0 - errors / self.num_gt if self.num_gt else None,
+            "motp_iou": self.iou_sum / self.matches if self.matches else None,
+            "id_switches": self.id_switches,
+            "false_positives": self.false_positives,
+            "false_negatives": self.false_negatives,
+            "num_gt": self.num_gt,
+            "recall": self.matches / self.num_gt if self.num_gt else None,
+            "precision": self.matches / (self.matches + self.false_positives) if self.matches else None,
+        }
+
+
+def latency_percentiles(samples_secs):
+    """Count, mean and p50/p90/p99/max of latency samples given in seconds, reported in milliseconds."""
+    if not samples_secs:
+        return {"count": 0}
+    ms = 1000 * np.asarray(samples_secs)
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"count": len(ms), "mean_ms": float(ms.mean()), "p50_ms": float(p50), "p90_ms": float(p90),
+            "p99_ms": float(p99), "max_ms": float(ms.max())}
+
+
+class StageTimer:
+    """Collects latency samples per named stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage, secs):
+        self.samples[stage].append(secs)
+
+    def total(self, stage):
+        return sum(self.samples.get(stage, ()))
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, name, func):
+        """Returns `func` with every call timed as stage `name`."""
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def summary(self):
+        return {name: latency_percentiles(samples) for name, samples in self.samples.items()}
@@ -1,29 +1,129 @@
 import os
+import time
+import contextlib
 import shutil
-import zipfile
+from collections import deque
 from pathlib import Path
 import argparse
 from tqdm import tqdm
 import logging
 import json
 import torch
-import cv2
 
 # Import all necessary functions from your tool scripts
-from tools.rename_resize import process_videos as rename_resize_videos
-from tools.clip_video import clip_video
+from tools.rename_resize import resize_video
+from tools.clip_video import plan_clips, write_clips as write_clip_files
+from tools.stream_ingest import iter_video_keyframes
 from tools.keyframe_selector import KeyframeSelector
-from rfdetr import RFDETRMedium
-from tools.create_proposals_from_tracks import generate_proposals_from_tracks
+from tools.detector_backends import detector_id
+from tools.motion_estimators import build_motion_estimator
+from tools.keyframe_workers import select_keyframes_parallel, StreamingVideoPool
+from tools.stage_cache import StageCache
+from tools.feature_store import FeatureStore
+from tools.zip_ingest import ZipVideoSource
+from tools.create_proposals_from_tracks import generate_proposals_from_detections
 from tools.proposals_to_cvat import generate_xml_for_batch
+from tools.image_dims import ImageDimsIndex, image_size
+from tools.jpeg_zip import JpegZipWriter, DEFAULT_JPEG_QUALITY
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+TARGET_SIZE = (1280, 720)
+CLIP_DURATION = 15
+DETECTION_MODEL_NAME = "RFDETRMedium"
+# Size the stage cache is evicted down to after every run, unless the caller sets another cap.
+DEFAULT_CACHE_MAX_GB = 20.0
 
-def run_pipeline(zip_file_path: str, output_dir: str, batch_name: str):
+
+def _record_keyframes(keyframes, clip_stem: str, source_video: str, clip_detections: list, manifest_data: dict):
+    """
+    `keyframes` is a list of `(keyframe_name, source_frame, detections, (width, height))`; all of them become
+    one entry of `clip_detections`, in the format of a per-clip keyframe JSON, which Stage 6 aggregates in
+    memory. The sizes go to the manifest, and from there to the batch's image size index (Stage 5).
+    """
+    clip_detections.append([
+        {"video_id": clip_stem, "frame": keyframe_name, "track_id": d["track_id"], "bbox": d["bbox"]}
+        for keyframe_name, _, detections, _ in keyframes for d in detections])
+    for keyframe_name, best_frame_idx, _, (width, height) in keyframes:
+        manifest_data[keyframe_name] = {"source_video": source_video, "source_frame": int(best_frame_idx),
+                                        "width": int(width), "height": int(height)}
+
+
+def save_keyframe_results(results, clip_stem: str, source_video: str, keyframe_writer: JpegZipWriter,
+                          clip_detections: list, manifest_data: dict, cache: StageCache = None,
+                          cache_key: str = None):
+    """
+    Queues the keyframe JPEGs of the selector results of one clip (a list, best first) on `keyframe_writer`,
+    records the per-clip detections and records them in the manifest. With a cache, the results (including
+    "no keyframe") are also stored under `cache_key`, once their JPEGs have been written.
+    """
+    keyframes, files = [], {}
+    for j, (frame_img, frame_idx, detections) in enumerate(results):
+        keyframe_name = f"{clip_stem}_frame_{frame_idx:04d}.jpg"
+        keyframe_writer.add_frame(keyframe_name, frame_img)
+        keyframes.append((keyframe_name, frame_idx, detections, (frame_img.shape[1], frame_img.shape[0])))
+        files[f"keyframe_{j}.jpg"] = keyframe_writer.directory / keyframe_name
+    if keyframes:
+        _record_keyframes(keyframes, clip_stem, source_video, clip_detections, manifest_data)
+    if cache is not None:
+        metadata = {"keyframes": [{"source_frame": int(idx), "detections": dets} for _, idx, dets, _ in keyframes]}
+        keyframe_writer.call_when_written(lambda: cache.store("keyframe", cache_key, files=files, metadata=metadata))
+
+
+def restore_keyframe_results(entry: Path, clip_stem: str, source_video: str, keyframe_writer: JpegZipWriter,
+                             clip_detections: list, manifest_data: dict):
+    """Re-materialises a cached Stage 4 result under this run's clip name."""
+    keyframes = []
+    for j, keyframe in enumerate(StageCache.read_metadata(entry)["keyframes"]):
+        keyframe_name = f"{clip_stem}_frame_{keyframe['source_frame']:04d}.jpg"
+        cached_path = entry / f"keyframe_{j}.jpg"
+        keyframe_writer.add_jpeg(keyframe_name, cached_path.read_bytes())
+        keyframes.append((keyframe_name, keyframe["source_frame"], keyframe["detections"],
+                          image_size(str(cached_path))))
+    if keyframes:
+        _record_keyframes(keyframes, clip_stem, source_video, clip_detections, manifest_data)
+
+
+def run_pipeline(zip_file_path: str, output_dir: str, batch_name: str, streaming: bool = False,
+                 write_clips: bool = False, detect_batch_size: int = 8, workers: int = 1,
+                 cache_dir: str = None, resume: bool = False, cache_max_gb: float = DEFAULT_CACHE_MAX_GB,
+                 feature_store_dir: str = None, keyframes_per_clip: int = 1, min_gap_secs: float = 3.0,
+                 detector_address: str = None, detector_model: str = DETECTION_MODEL_NAME,
+                 jpeg_quality: int = DEFAULT_JPEG_QUALITY):
     """
     Runs the full, integrated AVA-Kinetics preprocessing pipeline.
+
+    Raw videos are read from the ZIP one member at a time (extracted to a scratch file that is deleted
+    once the video has been resized or streamed), so the upload is never duplicated on disk.
+
+    With `streaming`, Stages 2-4 are fused: every raw video is decoded once and its keyframe candidates are
+    resized and scored in memory. Otherwise clips are virtual (frame ranges of the resized video) and keyframes
+    are read straight from the resized video. In both modes clip files are only written with `write_clips`.
+
+    With `workers` > 1, keyframe selection runs in a process pool (one RF-DETR per worker); outputs are
+    still written in clip order.
+
+    With `cache_dir`, the resized videos, clips and keyframe results are stored in a content-addressed
+    stage cache. `resume` reuses them: a video whose clips all have cached keyframes is not decoded at all.
+    At the end of the run, least-recently-used entries are evicted down to `cache_max_gb` (None: no cap), so a
+    deployment that keeps processing new uploads does not fill its disk with their intermediates.
+
+    With `feature_store_dir`, per-candidate detections and motion of every clip are kept in a FeatureStore, so
+    re-running selection with different weights or windows skips inference for frames already scored
+    (not used in streaming mode, where clips have no file to hash).
+
+    With `keyframes_per_clip` > 1, every clip is scored in full and up to that many keyframes, at least
+    `min_gap_secs` apart, are kept per clip (KeyframeSelector.select_keyframes).
+
+    With `detector_address`, detection goes to the shared detection server there (tools/detection_server.py),
+    which batches the frames of every process using it, instead of an RF-DETR loaded by this run.
+
+    `detector_model` is RFDETRMedium or an ONNX export of it (tools/detector_backends.py), which runs on
+    ONNX Runtime's CPU provider; its file name is part of the cache keys and feature-store paths.
+
+    Keyframes are JPEG-encoded at `jpeg_quality` by a pool of threads and stored in `{batch_name}_keyframes.zip`
+    as they are written (tools/jpeg_zip.py), so Stage 5 does not read them back to package them.
     """
     base_output_path = Path(output_dir)
     work_dir = base_output_path / "temp_processing"
@@ -32,76 +132,228 @@ def run_pipeline(zip_file_path: str, output_dir: str, batch_name: str):
     raw_video_dir = work_dir / "0_raw_videos"
     resized_dir = work_dir / "1_resized_videos"
     clipped_dir = work_dir / "2_clipped_videos"
-    json_dir = work_dir / "3_tracking_json"
 
     batch_dir = base_output_path / batch_name
     keyframes_dir = batch_dir / "keyframes"
 
-    for d in [work_dir, raw_video_dir, resized_dir, clipped_dir, json_dir,
+    for d in [work_dir, raw_video_dir, resized_dir, clipped_dir,
               batch_dir, keyframes_dir, base_output_path]:
         d.mkdir(parents=True, exist_ok=True)
     logger.info("✅ Directory structure created successfully.")
 
     manifest_data = {}
+    # Per-clip detections of every keyframe, handed from Stage 4 to Stage 6 without a JSON round trip.
+    clip_detections = []
+    cache = StageCache(cache_dir, read=resume) if cache_dir else None
 
     # Initialize models once
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"Using device: {device}")
-    detection_model = RFDETRMedium(device=device)
-    keyframe_selector = KeyframeSelector(detection_model=detection_model, device=device, person_class_id=1)
+    keyframe_selector = None
+    feature_store = FeatureStore(feature_store_dir) if feature_store_dir else None
+    if workers <= 1:
+        keyframe_selector = KeyframeSelector(device=device, person_class_id=1,
+                                             batch_size=detect_batch_size,
+                                             feature_store=feature_store,
+                                             model_id=detector_model,
+                                             detector_address=detector_address)
+    else:
+        logger.info(f"Keyframe selection will use {workers} worker processes.")
+
+    # Everything that changes a stage's output is part of its cache key.
+    clip_params = {"target_size": TARGET_SIZE, "clip_duration": CLIP_DURATION}
+    selection_params = {**clip_params, **KeyframeSelector.default_selection_params(), "model": detector_id(detector_model),
+                        "motion_estimator": build_motion_estimator("farneback").cache_id, "threshold": 0.5,
+                        "mode": "streaming" if streaming else "virtual_clips",
+                        "keyframes_per_clip": keyframes_per_clip, "min_gap_secs": min_gap_secs,
+                        "jpeg_quality": jpeg_quality}
+
+    def keyframe_key(digest, clip_idx):
+        return StageCache.key("keyframe", digest, {**selection_params, "clip_index": clip_idx})
+
+    def restore_video(idx, digest):
+        """Restores every keyframe of a video from the cache; False if any of them is missing."""
+        plan_entry = cache.lookup("clip_plan", StageCache.key("clip_plan", digest, clip_params))
+        if plan_entry is None:
+            return False
+        num_clips = StageCache.read_metadata(plan_entry)["num_clips"]
+        entries = [cache.lookup("keyframe", keyframe_key(digest, i)) for i in range(num_clips)]
+        if any(entry is None for entry in entries):
+            return False
+        for i, entry in enumerate(entries):
+            clip_stem = f"{idx}_clip_{i:03d}"
+            restore_keyframe_results(entry, clip_stem, f"{clip_stem}.mp4", keyframe_writer, clip_detections,
+                                     manifest_data)
+        return True
+
+    run_start = time.perf_counter()
+    first_keyframe_logged = False
 
+    def log_first_keyframe():
+        nonlocal first_keyframe_logged
+        if not first_keyframe_logged and manifest_data:
+            first_keyframe_logged = True
+            logger.info(f"⏱️ First keyframe ready {time.perf_counter() - run_start:.2f}s after start.")
+
+    source = None
+    keyframe_writer = JpegZipWriter(base_output_path / f"{batch_name}_keyframes.zip", keyframes_dir, jpeg_quality)
     try:
-        # --- Stage 1-3: Unzip, Resize, Clip ---
-        logger.info("[Stage 1/7] Unzipping Master File...")
-        with zipfile.ZipFile(zip_file_path, 'r') as zf:
-            zf.extractall(raw_video_dir)
-
-        logger.info("[Stage 2/7] Renaming & Resizing...")
-        rename_resize_videos(str(raw_video_dir), str(resized_dir))
-
-        logger.info("[Stage 3/7] Clipping Videos...")
-        clip_video(str(resized_dir), str(clipped_dir))
-
-        # --- Stage 4: Intelligent Keyframe Selection ---
-        logger.info("[Stage 4/7] Selecting Keyframes & Generating Proposals...")
-        all_clips_to_process = list(Path(clipped_dir).rglob("*.mp4"))
-        for clip_path in tqdm(all_clips_to_process, desc="  -> Selecting keyframes"):
-            # (The logic for this stage remains the same)
-            clip_stem = clip_path.stem
-            result = keyframe_selector.select_best_keyframe(str(clip_path))
-            if result is None: continue
-            best_frame_img, best_frame_idx, detections = result
-            keyframe_name = f"{clip_stem}_frame_{best_frame_idx:04d}.jpg"
-            cv2.imwrite(str(keyframes_dir / keyframe_name), best_frame_img)
-            json_output_path = json_dir / f"{clip_stem}.json"
-            formatted_detections = [
-                {"video_id": clip_stem, "frame": keyframe_name, "track_id": d["track_id"], "bbox": d["bbox"]} for d in
-                detections]
-            with open(json_output_path, "w") as f:
-                json.dump(formatted_detections, f, indent=2)
-            manifest_data[keyframe_name] = {"source_video": clip_path.name, "source_frame": int(best_frame_idx)}
+        # --- Stage 1: Read the master ZIP member by member (no extractall) ---
+        logger.info("[Stage 1/7] Opening Master File...")
+        # One extra member is extracted ahead so the next video is ready when a worker frees up.
+        source = ZipVideoSource(zip_file_path, str(raw_video_dir), max_pending=max(2, workers + 1))
+        digests = {}
+        pending_videos = []  # (idx, raw video path) of videos that need processing
+
+        def pending_members():
+            """Yields members that the cache cannot restore; restored ones are released straight away."""
+            for member in source:
+                digests[member.idx] = member.digest
+                if cache is not None and cache.read and restore_video(member.idx, member.digest):
+                    logger.info(f"♻️ Restored all keyframes of {member.name} from the stage cache.")
+                    log_first_keyframe()
+                    source.release(member)
+                    continue
+                pending_videos.append((member.idx, member.path))
+                yield member
+
+        if streaming:
+            # --- Stage 2-4 (streaming): Resize, Clip and Select Keyframes in a single decode ---
+            logger.info("[Stage 2-4/7] Streaming resize, clipping & keyframe selection...")
+            clips_output_dir = str(clipped_dir) if write_clips else None
+            progress = tqdm(total=len(source), desc="  -> Streaming videos")
+
+            def finish_video(member, clip_results):
+                num_clips = 0
+                for clip_idx, (clip_stem, results) in enumerate(clip_results):
+                    num_clips += 1
+                    cache_key = keyframe_key(member.digest, clip_idx) if cache else None
+                    save_keyframe_results(results, clip_stem, f"{clip_stem}.mp4", keyframe_writer, clip_detections,
+                                          manifest_data, cache, cache_key)
+                    log_first_keyframe()
+                source.release(member)
+                if cache is not None:
+                    cache.store("clip_plan", StageCache.key("clip_plan", member.digest, clip_params),
+                                metadata={"num_clips": num_clips})
+                progress.update()
+
+            # Everything below runs on this thread: cache restores (in pending_members), submissions and result
+            # handling. Workers only receive plain job tuples.
+            video_pool = (StreamingVideoPool(workers, device, detect_batch_size=detect_batch_size,
+                                             detector_address=detector_address, detector_model=detector_model)
+                          if keyframe_selector is None else contextlib.nullcontext())
+            with video_pool, progress:
+                in_flight = deque()  # (member, pool handle) of submitted videos, oldest first
+                for member in pending_members():
+                    job = (member.path, str(member.idx), clips_output_dir, keyframes_per_clip, min_gap_secs)
+                    if keyframe_selector is not None:
+                        finish_video(member, iter_video_keyframes(keyframe_selector, *job))
+                        continue
+                    in_flight.append((member, video_pool.submit(job)))
+                    # Each in-flight member holds one of the source's extraction slots, and only finishing it frees
+                    # the slot; waiting for the oldest one before asking for the next member keeps a slot free.
+                    while len(in_flight) >= source.max_pending:
+                        member, handle = in_flight.popleft()
+                        finish_video(member, handle.get())
+                while in_flight:
+                    member, handle = in_flight.popleft()
+                    finish_video(member, handle.get())
+            source.report()
+        else:
+            logger.info("[Stage 2/7] Renaming & Resizing...")
+            for member in tqdm(pending_members(), total=len(source), desc="  -> Resizing videos"):
+                idx = member.idx
+                resized_path = resized_dir / f"{idx}.mp4"
+                resize_key = StageCache.key("resize", digests[idx], {"target_size": TARGET_SIZE}) if cache else None
+                entry = cache.lookup("resize", resize_key) if cache else None
+                if entry is not None:
+                    shutil.copyfile(entry / "video.mp4", resized_path)
+                elif not resize_video(member.path, str(resized_path), TARGET_SIZE):
+                    logger.warning(f"Failed to open {member.name}")
+                elif cache is not None:
+                    cache.store("resize", resize_key, files={"video.mp4": resized_path})
+                source.release(member)
+            source.report()
+
+            logger.info("[Stage 3/7] Planning Clips...")
+            clips_to_process = []  # (ClipDescriptor, video idx, clip idx)
+            for idx, _ in pending_videos:
+                resized_path = resized_dir / f"{idx}.mp4"
+                if not resized_path.exists():
+                    continue
+                # Clips are frame ranges of the resized video; they are only re-encoded for delivery.
+                clips = plan_clips(str(resized_path), CLIP_DURATION)
+                if write_clips:
+                    clips_key = StageCache.key("clips", digests[idx], clip_params) if cache else None
+                    entry = cache.lookup("clips", clips_key) if cache else None
+                    if entry is not None:
+                        for i, clip in enumerate(clips):
+                            shutil.copyfile(entry / f"clip_{i:03d}.mp4", clipped_dir / f"{clip.name}.mp4")
+                    else:
+                        clip_paths = write_clip_files(clips, str(clipped_dir))
+                        if cache is not None:
+                            files = {f"clip_{i:03d}.mp4": p for i, p in enumerate(clip_paths)}
+                            cache.store("clips", clips_key, files=files, metadata={"num_clips": len(clip_paths)})
+                if cache is not None:
+                    cache.store("clip_plan", StageCache.key("clip_plan", digests[idx], clip_params),
+                                metadata={"num_clips": len(clips)})
+                clips_to_process.extend((clip, idx, i) for i, clip in enumerate(clips))
+
+            # --- Stage 4: Intelligent Keyframe Selection ---
+            logger.info("[Stage 4/7] Selecting Keyframes & Generating Proposals...")
+            clips_to_select = []
+            for clip, idx, clip_idx in clips_to_process:
+                entry = cache.lookup("keyframe", keyframe_key(digests[idx], clip_idx)) if cache else None
+                if entry is not None:
+                    restore_keyframe_results(entry, clip.name, f"{clip.name}.mp4", keyframe_writer, clip_detections,
+                                            manifest_data)
+                else:
+                    clips_to_select.append((clip, idx, clip_idx))
+
+            all_clips_to_process = [clip for clip, _, _ in clips_to_select]
+            if keyframe_selector is None:
+                clip_results = select_keyframes_parallel(all_clips_to_process, workers, device,
+                                                         detect_batch_size=detect_batch_size,
+                                                         feature_store_dir=feature_store_dir,
+                                                         keyframes_per_clip=keyframes_per_clip,
+                                                         min_gap_secs=min_gap_secs,
+                                                         detector_address=detector_address,
+                                                         detector_model=detector_model)
+            else:
+                clip_results = ((clip, keyframe_selector.select_clip_keyframes(clip, keyframes_per_clip, min_gap_secs))
+                                for clip in all_clips_to_process)
+            for (clip, idx, clip_idx), (_, results) in tqdm(zip(clips_to_select, clip_results),
+                                                            total=len(clips_to_select),
+                                                            desc="  -> Selecting keyframes"):
+                cache_key = keyframe_key(digests[idx], clip_idx) if cache else None
+                save_keyframe_results(results, clip.name, f"{clip.name}.mp4", keyframe_writer, clip_detections,
+                                      manifest_data, cache, cache_key)
+                log_first_keyframe()
 
         # --- Stage 5: Create Manifest and Package Keyframes ---
         logger.info("[Stage 5/7] Creating Manifest and Packaging Keyframes...")
         manifest_path = batch_dir / "manifest.json"
         with open(manifest_path, 'w') as f:
-            json.dump(manifest_data, f, indent=2)
-        batch_zip_path = base_output_path / f"{batch_name}_keyframes.zip"
-        with zipfile.ZipFile(batch_zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for frame_file in keyframes_dir.glob("*.jpg"): zf.write(frame_file, arcname=frame_file.name)
+            # Sorted so fresh, resumed and parallel runs all write the same manifest.
+            json.dump(dict(sorted(manifest_data.items())), f, indent=2)
+        # Stage 7 (and anything else converting this batch) reads keyframe sizes from here, not from the JPEGs.
+        ImageDimsIndex(keyframes_dir, {name: (entry["width"], entry["height"])
+                                       for name, entry in manifest_data.items()}).save()
+        # Every keyframe is already in the ZIP; this writes the last ones and finalizes it.
+        keyframe_writer.close()
         logger.info(f"✓ Keyframes and manifest created for batch '{batch_name}'.")
 
         # --- NEW STAGE 6: Aggregate Proposals ---
         logger.info("[Stage 6/7] Aggregating proposals...")
-        proposals_pkl_path = work_dir / "proposals.pkl"
-        generate_proposals_from_tracks(str(json_dir), str(proposals_pkl_path))
+        proposals_path = work_dir / "dense.proposals"
+        generate_proposals_from_detections(clip_detections, str(proposals_path))
 
         # --- NEW STAGE 7: Generate Final CVAT XML ---
         logger.info("[Stage 7/7] Generating final CVAT XML...")
         final_xml_path = base_output_path / f"{batch_name}_annotations.xml"
         generate_xml_for_batch(
             batch_name=batch_name,
-            pickle_path=str(proposals_pkl_path),
+            proposals_path=str(proposals_path),
             keyframes_dir=str(keyframes_dir),
             output_xml_path=str(final_xml_path)
         )
@@ -109,6 +361,11 @@ def run_pipeline(zip_file_path: str, output_dir: str, batch_name: str):
         logger.info(f"\n🎉🎉🎉 Pipeline complete! Final outputs are in: {base_output_path}")
 
     finally:
+        keyframe_writer.close()
+        if source is not None:
+            source.close()
+        if cache is not None and cache_max_gb is not None:
+            cache.evict(int(cache_max_gb * 1e9))
         if work_dir.exists():
             logger.info(f"Cleaning up temporary directory: {work_dir}")
             shutil.rmtree(work_dir)
@@ -119,10 +376,46 @@ if __name__ == "__main__":
     PROJECT_ROOT = Path(__file__).resolve().parent
     parser.add_argument("--zip_file_name", required=True, help="Name of the master ZIP file with raw videos.")
     parser.add_argument("--batch_name", required=True, help="A unique name for this processing batch.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Decode each raw video once and select keyframes in memory (no intermediate videos).")
+    parser.add_argument("--write_clips", action="store_true",
+                        help="Also write the 15-second clip files for delivery (clips are virtual otherwise).")
+    parser.add_argument("--detect_batch_size", type=int, default=8,
+                        help="Candidate frames per detector forward pass during keyframe selection.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for keyframe selection (each loads its own RF-DETR).")
+    parser.add_argument("--cache_dir", default=str(PROJECT_ROOT / "outputs" / ".stage_cache"),
+                        help="Persistent stage cache for resized videos, clips and keyframe results.")
+    parser.add_argument("--no_cache", action="store_true", help="Do not read or write the stage cache.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse cached stage outputs from earlier (possibly crashed) runs.")
+    parser.add_argument("--cache_max_gb", type=float, default=DEFAULT_CACHE_MAX_GB,
+                        help="Evict least-recently-used cache entries down to this size after the run.")
+    parser.add_argument("--feature_store_dir", default=str(PROJECT_ROOT / "outputs" / ".feature_store"),
+                        help="Per-clip detections and motion kept for fast keyframe re-selection.")
+    parser.add_argument("--no_feature_store", action="store_true", help="Do not read or write the feature store.")
+    parser.add_argument("--keyframes_per_clip", type=int, default=1,
+                        help="Keyframes kept per clip; above 1 the whole clip is scored with temporal NMS.")
+    parser.add_argument("--min_gap_secs", type=float, default=3.0,
+                        help="Minimum spacing between keyframes of the same clip (with --keyframes_per_clip > 1).")
+    parser.add_argument("--detector_address", default=None,
+                        help="Detect through the shared detection server at this address (tools/detection_server.py) "
+                             "instead of loading RF-DETR in this run.")
+    parser.add_argument("--detector_model", default=DETECTION_MODEL_NAME,
+                        help="RFDETRMedium, or an ONNX export of it to run on the CPU (tools/detector_backends.py).")
+    parser.add_argument("--jpeg_quality", type=int, default=DEFAULT_JPEG_QUALITY,
+                        help="JPEG quality (0-100) of the keyframes.")
     args = parser.parse_args()
     input_zip = PROJECT_ROOT / "uploads" / args.zip_file_name
     output_path = PROJECT_ROOT / "outputs"
     if not input_zip.exists():
         logger.error(f"Input file not found: {input_zip}")
     else:
-        run_pipeline(str(input_zip), str(output_path), args.batch_name)
\ No newline at end of file
+        run_pipeline(str(input_zip), str(output_path), args.batch_name, streaming=args.streaming,
+                     write_clips=args.write_clips, detect_batch_size=args.detect_batch_size,
+                     workers=args.workers, cache_dir=None if args.no_cache else args.cache_dir,
+                     resume=args.resume, cache_max_gb=args.cache_max_gb,
+                     feature_store_dir=None if args.no_feature_store else args.feature_store_dir,
+                     keyframes_per_clip=args.keyframes_per_clip, min_gap_secs=args.min_gap_secs,
+                     detector_address=args.detector_address, detector_model=args.detector_model,
+                     jpeg_quality=args.jpeg_quality)
\ No newline at end of file
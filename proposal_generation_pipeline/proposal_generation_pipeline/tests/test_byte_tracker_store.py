@@ -0,0 +1,21 @@
+# tests/test_byte_tracker_store.py
+
+# BYTETracker keeps the Kalman state of its tracks in one TrackStore; a row must be given back as soon as its
+# track leaves both tracked_stracks and lost_stracks (removed, or dropped as a duplicate), or a long clip grows
+# the store without bound. The seeded crowd of benchmarks.bench_byte_tracker drops duplicates within 300 frames.
+# Run from the pipeline root:  python -m pytest tests
+
+from argparse import Namespace
+
+from benchmarks.bench_byte_tracker import synthetic_sequence
+from tools.byte_tracker import BYTETracker, STrack
+
+
+def test_store_only_holds_live_tracks():
+    STrack._count = 0
+    tracker = BYTETracker(Namespace(track_thresh=0.5, track_buffer=30, match_thresh=0.8, mot20=False), frame_rate=30)
+    for frame_idx, dets in enumerate(synthetic_sequence(num_people=40, num_frames=300)):
+        tracker.update(dets.copy(), (720, 1280), (720, 1280))
+        # A lost track removed on this frame stays in lost_stracks until the next one, already detached.
+        live = sum(t._store is tracker.track_store for t in tracker.tracked_stracks + tracker.lost_stracks)
+        assert len(tracker.track_store) == live, f"frame {frame_idx}: {len(tracker.track_store)} rows, {live} tracks"
@@ -0,0 +1,8 @@
+# tools/__init__.py
+
+# Stages and command-line tools of the proposal pipeline. The modules import one another relatively
+# (`from .stage_cache import StageCache`), so every command-line tool runs as a module from the pipeline root:
+#   python -m tools.<name> --help
+#
+# proposals_store, cvat_xml and image_dims are also used by processing_pipeline/services, which holds generated
+# copies of them; after editing one, regenerate the copies with  python -m tools.sync_shared_modules
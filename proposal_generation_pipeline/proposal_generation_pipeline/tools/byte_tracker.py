@@ -138,11 +138,11 @@ class KalmanFilter:
             1e-5 * np.ones_like(mean[:, 3]),
             self._std_weight_velocity * mean[:, 3]]
         sqr = np.square(np.r_[std_pos, std_vel]).T
-        motion_cov = [np.diag(s) for s in sqr]
-        motion_cov = np.asarray(motion_cov)
+        # Stacked diagonal matrices, written in place instead of one np.diag per track.
+        motion_cov = np.zeros((len(mean), 8, 8))
+        motion_cov[:, np.arange(8), np.arange(8)] = sqr
         mean = np.dot(mean, self._motion_mat.T)
-        left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
-        covariance = np.dot(left, self._motion_mat.T) + motion_cov
+        covariance = self._motion_mat @ covariance @ self._motion_mat.T + motion_cov
         return mean, covariance
 
     def update(self, mean, covariance, measurement):
@@ -158,24 +158,86 @@ class KalmanFilter:
             kalman_gain, projected_cov, kalman_gain.T))
         return new_mean, new_covariance
 
+    def multi_project(self, mean, covariance):
+        """project() for (N, 8) means and (N, 8, 8) covariances."""
+        std = np.stack([
+            self._std_weight_position * mean[:, 3],
+            self._std_weight_position * mean[:, 3],
+            1e-1 * np.ones_like(mean[:, 3]),
+            self._std_weight_position * mean[:, 3]], axis=1)
+        innovation_cov = np.zeros((len(mean), 4, 4))
+        innovation_cov[:, np.arange(4), np.arange(4)] = np.square(std)
+        mean = np.dot(mean, self._update_mat.T)
+        covariance = self._update_mat @ covariance @ self._update_mat.T
+        return mean, covariance + innovation_cov
+
+    def multi_update(self, mean, covariance, measurement):
+        """update() for N tracks at once; the gains come from one stacked np.linalg.solve."""
+        projected_mean, projected_cov = self.multi_project(mean, covariance)
+        # K = P H^T S^-1, i.e. K^T = solve(S, (P H^T)^T) with S symmetric.
+        cross_cov = covariance @ self._update_mat.T
+        kalman_gain = np.linalg.solve(projected_cov, cross_cov.transpose((0, 2, 1))).transpose((0, 2, 1))
+        innovation = measurement - projected_mean
+        new_mean = mean + np.einsum('nji,ni->nj', kalman_gain, innovation)
+        new_covariance = covariance - kalman_gain @ projected_cov @ kalman_gain.transpose((0, 2, 1))
+        return new_mean, new_covariance
+
+
+class TrackStore:
+    """
+    Struct-of-arrays Kalman state: the means (N x 8) and covariances (N x 8 x 8) of a tracker's live tracks
+    in two contiguous arrays, so predict and update can run on all of them at once. STracks only keep
+    their row; rows are recycled once a track is removed.
+    """
+
+    def __init__(self, capacity=64):
+        self.mean = np.zeros((capacity, 8))
+        self.covariance = np.zeros((capacity, 8, 8))
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.mean) - len(self._free)
+
+    def allocate(self):
+        if not self._free:
+            capacity = len(self.mean)
+            self.mean = np.concatenate([self.mean, np.zeros_like(self.mean)])
+            self.covariance = np.concatenate([self.covariance, np.zeros_like(self.covariance)])
+            self._free = list(range(2 * capacity - 1, capacity - 1, -1))
+        return self._free.pop()
+
+    def release(self, row):
+        self._free.append(row)
+
 
 # ##################################################################################
 # From matching.py
 # ##################################################################################
 
+def _stack_tlbrs(tracks):
+    """Stacks tracks (or tlbr arrays) into an (N, 4) float array."""
+    if len(tracks) == 0:
+        return np.zeros((0, 4), dtype=float)
+    if isinstance(tracks[0], np.ndarray):
+        return np.asarray(tracks, dtype=float).reshape(-1, 4)
+    return np.asarray([track.tlbr for track in tracks], dtype=float)
+
+
+def ious(atlbrs, btlbrs):
+    """Pairwise IoU of two (N, 4) / (M, 4) tlbr arrays, broadcast to an (N, M) matrix."""
+    a = atlbrs[:, None, :]
+    b = btlbrs[None, :, :]
+    inter_w = np.maximum(0, np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]))
+    inter_h = np.maximum(0, np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]))
+    inter_area = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    # FIX: Added epsilon to prevent division by zero
+    return inter_area / ((area_a + area_b - inter_area) + 1e-6)
+
+
 def iou_distance(atracks, btracks):
-    if (len(atracks) > 0 and isinstance(atracks[0], np.ndarray)) or (
-            len(btracks) > 0 and isinstance(btracks[0], np.ndarray)):
-        atlbrs = atracks
-        btlbrs = btracks
-    else:
-        atlbrs = [track.tlbr for track in atracks]
-        btlbrs = [track.tlbr for track in btracks]
-    _ious = np.zeros((len(atlbrs), len(btlbrs)))
-    for i, tlbr_a in enumerate(atlbrs):
-        for j, tlbr_b in enumerate(btlbrs):
-            _ious[i, j] = 1 - iou(tlbr_a, tlbr_b)
-    return _ious
+    return 1 - ious(_stack_tlbrs(atracks), _stack_tlbrs(btracks))
 
 
 def iou(boxA, boxB):
@@ -195,8 +257,8 @@ def fuse_score(cost_matrix, detections):
         return cost_matrix
     iou_sim = 1 - cost_matrix
     det_scores = np.array([det.score for det in detections])
-    det_scores = np.expand_dims(det_scores, axis=0).repeat(cost_matrix.shape[0], axis=0)
-    fuse_sim = iou_sim * det_scores
+    # Broadcasts the detection scores over the track rows.
+    fuse_sim = iou_sim * det_scores[None, :]
     fuse_cost = 1 - fuse_sim
     return fuse_cost
 
@@ -204,21 +266,17 @@ def fuse_score(cost_matrix, detections):
 def linear_assignment(cost_matrix, thresh):
     if cost_matrix.size == 0:
         return np.empty((0, 2), dtype=int), tuple(range(cost_matrix.shape[0])), tuple(range(cost_matrix.shape[1]))
-    matches, unmatched_a, unmatched_b = [], [], []
     row_ind, col_ind = linear_sum_assignment(cost_matrix)
-    for r, c in zip(row_ind, col_ind):
-        if cost_matrix[r, c] < thresh:
-            matches.append((r, c))
-        else:
-            unmatched_a.append(r)
-            unmatched_b.append(c)
-    for r in range(cost_matrix.shape[0]):
-        if r not in row_ind:
-            unmatched_a.append(r)
-    for c in range(cost_matrix.shape[1]):
-        if c not in col_ind:
-            unmatched_b.append(c)
-    return np.asarray(matches, dtype=int), unmatched_a, unmatched_b
+    matched = cost_matrix[row_ind, col_ind] < thresh
+    matches = np.stack([row_ind[matched], col_ind[matched]], axis=1).astype(int)
+    row_free = np.ones(cost_matrix.shape[0], dtype=bool)
+    row_free[row_ind] = False
+    col_free = np.ones(cost_matrix.shape[1], dtype=bool)
+    col_free[col_ind] = False
+    # Same order as before: rejected assignments first, then rows/columns that were never assigned.
+    unmatched_a = row_ind[~matched].tolist() + np.flatnonzero(row_free).tolist()
+    unmatched_b = col_ind[~matched].tolist() + np.flatnonzero(col_free).tolist()
+    return matches, unmatched_a, unmatched_b
 
 
 # ##################################################################################
@@ -234,33 +292,84 @@ class STrack(BaseTrack):
         # FIX: Replaced deprecated np.float with float
         self._tlwh = np.asarray(tlwh, dtype=float)
         self.kalman_filter = None
-        self.mean, self.covariance = None, None
+        # Kalman state lives in row `_row` of a TrackStore once the track is activated.
+        self._store, self._row = None, None
         self.is_activated = False
         self.score = score
         self.tracklet_len = 0
 
+    @property
+    def mean(self):
+        return None if self._store is None else self._store.mean[self._row]
+
+    @mean.setter
+    def mean(self, value):
+        self._store.mean[self._row] = value
+
+    @property
+    def covariance(self):
+        return None if self._store is None else self._store.covariance[self._row]
+
+    @covariance.setter
+    def covariance(self, value):
+        self._store.covariance[self._row] = value
+
     def predict(self):
         mean_state = self.mean.copy()
         if self.state != TrackState.Tracked:
             mean_state[7] = 0
         self.mean, self.covariance = self.kalman_filter.predict(mean_state, self.covariance)
 
+    @staticmethod
+    def _group_rows(stracks):
+        """Groups tracks by TrackStore: {store: (positions in `stracks`, rows in the store)}."""
+        groups = {}
+        for i, st in enumerate(stracks):
+            positions, rows = groups.setdefault(st._store, ([], []))
+            positions.append(i)
+            rows.append(st._row)
+        return groups
+
     @staticmethod
     def multi_predict(stracks):
-        if len(stracks) > 0:
-            multi_mean = np.asarray([st.mean.copy() for st in stracks])
-            multi_covariance = np.asarray([st.covariance for st in stracks])
-            for i, st in enumerate(stracks):
-                if st.state != TrackState.Tracked:
+        for store, (positions, rows) in STrack._group_rows(stracks).items():
+            multi_mean = store.mean[rows]
+            for i, pos in enumerate(positions):
+                if stracks[pos].state != TrackState.Tracked:
                     multi_mean[i][7] = 0
-            multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(multi_mean, multi_covariance)
-            for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-                stracks[i].mean = mean
-                stracks[i].covariance = cov
+            store.mean[rows], store.covariance[rows] = STrack.shared_kalman.multi_predict(
+                multi_mean, store.covariance[rows])
 
-    def activate(self, kalman_filter, frame_id):
+    @staticmethod
+    def multi_update(stracks, detections, frame_id):
+        """
+        Batched update()/re_activate(new_id=False) of the tracks matched to `detections` in one association
+        round. Returns the tracks that were Tracked (activated) and the ones that were found again (refind).
+        """
+        activated, refind = [], []
+        measurements = np.asarray([STrack.tlwh_to_xyah(det.tlwh) for det in detections]).reshape(-1, 4)
+        for store, (positions, rows) in STrack._group_rows(stracks).items():
+            store.mean[rows], store.covariance[rows] = STrack.shared_kalman.multi_update(
+                store.mean[rows], store.covariance[rows], measurements[positions])
+        for track, det in zip(stracks, detections):
+            if track.state == TrackState.Tracked:
+                track.tracklet_len += 1
+                activated.append(track)
+            else:
+                track.tracklet_len = 0
+                refind.append(track)
+            track.frame_id = frame_id
+            track.state = TrackState.Tracked
+            track.is_activated = True
+            track.score = det.score
+        return activated, refind
+
+    def activate(self, kalman_filter, frame_id, store=None):
         self.kalman_filter = kalman_filter
         self.track_id = self.next_id()
+        # A track activated without a tracker's store gets a one-row store of its own.
+        self._store = store if store is not None else TrackStore(capacity=1)
+        self._row = self._store.allocate()
         self.mean, self.covariance = self.kalman_filter.initiate(self.tlwh_to_xyah(self._tlwh))
         self.tracklet_len = 0
         self.state = TrackState.Tracked
@@ -270,6 +379,20 @@ class STrack(BaseTrack):
         self.frame_id = frame_id
         self.start_frame = frame_id
 
+    def mark_removed(self):
+        """Removed tracks are kept in BYTETracker.removed_stracks; they detach from the shared store."""
+        super().mark_removed()
+        self.detach()
+
+    def detach(self):
+        """Moves the Kalman state into a one-row store of its own and gives the shared row back."""
+        if self._store is not None and len(self._store.mean) > 1:
+            detached = TrackStore(capacity=1)
+            row = detached.allocate()
+            detached.mean[row], detached.covariance[row] = self.mean, self.covariance
+            self._store.release(self._row)
+            self._store, self._row = detached, row
+
     def re_activate(self, new_track, frame_id, new_id=False):
         self.mean, self.covariance = self.kalman_filter.update(
             self.mean, self.covariance, self.tlwh_to_xyah(new_track.tlwh))
@@ -338,9 +461,11 @@ class BYTETracker(object):
         self.buffer_size = int(frame_rate / 30.0 * args.track_buffer)
         self.max_time_lost = self.buffer_size
         self.kalman_filter = KalmanFilter()
+        self.track_store = TrackStore()
 
     def update(self, output_results, img_info, img_size):
         self.frame_id += 1
+        previous_stracks = self.tracked_stracks + self.lost_stracks
         activated_starcks = []
         refind_stracks = []
         lost_stracks = []
@@ -383,28 +508,18 @@ class BYTETracker(object):
             dists = fuse_score(dists, detections)
 
         matches, u_track, u_detection = linear_assignment(dists, thresh=self.args.match_thresh)
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
-            if track.state == TrackState.Tracked:
-                track.update(detections[idet], self.frame_id)
-                activated_starcks.append(track)
-            else:
-                track.re_activate(det, self.frame_id, new_id=False)
-                refind_stracks.append(track)
+        activated, refind = STrack.multi_update([strack_pool[i] for i, _ in matches],
+                                                [detections[j] for _, j in matches], self.frame_id)
+        activated_starcks.extend(activated)
+        refind_stracks.extend(refind)
 
         r_tracked_stracks = [strack_pool[i] for i in u_track if strack_pool[i].state == TrackState.Tracked]
         dists = iou_distance(r_tracked_stracks, detections_second)
         matches, u_track, u_detection_second = linear_assignment(dists, thresh=0.5)
-        for itracked, idet in matches:
-            track = r_tracked_stracks[itracked]
-            det = detections_second[idet]
-            if track.state == TrackState.Tracked:
-                track.update(det, self.frame_id)
-                activated_starcks.append(track)
-            else:
-                track.re_activate(det, self.frame_id, new_id=False)
-                refind_stracks.append(track)
+        activated, refind = STrack.multi_update([r_tracked_stracks[i] for i, _ in matches],
+                                                [detections_second[j] for _, j in matches], self.frame_id)
+        activated_starcks.extend(activated)
+        refind_stracks.extend(refind)
 
         for it in u_track:
             track = r_tracked_stracks[it]
@@ -417,9 +532,10 @@ class BYTETracker(object):
         if not self.args.mot20:
             dists = fuse_score(dists, detections)
         matches, u_unconfirmed, u_detection = linear_assignment(dists, thresh=0.7)
-        for itracked, idet in matches:
-            unconfirmed[itracked].update(detections[idet], self.frame_id)
-            activated_starcks.append(unconfirmed[itracked])
+        # Unconfirmed tracks are always in the Tracked state, so they all come back as activated.
+        activated, _ = STrack.multi_update([unconfirmed[i] for i, _ in matches],
+                                           [detections[j] for _, j in matches], self.frame_id)
+        activated_starcks.extend(activated)
         for it in u_unconfirmed:
             track = unconfirmed[it]
             track.mark_removed()
@@ -429,7 +545,7 @@ class BYTETracker(object):
             track = detections[inew]
             if track.score < self.det_thresh:
                 continue
-            track.activate(self.kalman_filter, self.frame_id)
+            track.activate(self.kalman_filter, self.frame_id, self.track_store)
             activated_starcks.append(track)
 
         for track in self.lost_stracks:
@@ -443,11 +559,31 @@ class BYTETracker(object):
         self.lost_stracks = sub_stracks(self.lost_stracks, self.tracked_stracks)
         self.lost_stracks.extend(lost_stracks)
         self.lost_stracks = sub_stracks(self.lost_stracks, self.removed_stracks)
+        # Tracks removed on earlier frames have now been subtracted from lost_stracks and never come back, so
+        # only recent ones are kept; a tracker run over a whole clip does not grow with every track it has seen.
+        self.removed_stracks = [t for t in self.removed_stracks
+                                if self.frame_id - t.end_frame <= 2 * self.max_time_lost]
         self.removed_stracks.extend(removed_stracks)
         self.tracked_stracks, self.lost_stracks = remove_duplicate_stracks(self.tracked_stracks, self.lost_stracks)
+        # Tracks dropped as duplicates (or otherwise left out of both lists) are never matched again; their
+        # rows go back to the store so it only holds the live tracks.
+        live = {id(t) for t in self.tracked_stracks} | {id(t) for t in self.lost_stracks}
+        for track in previous_stracks + activated_starcks:
+            if id(track) not in live and track._store is self.track_store:
+                track.detach()
 
         return [track for track in self.tracked_stracks if track.is_activated]
 
+    def predict(self):
+        """
+        Advances the tracker by one frame without detections (frames the detector skips): the Kalman filter
+        moves the tracked and lost tracks, nothing is matched, lost or removed. Returns the active tracks.
+        """
+        self.frame_id += 1
+        tracked_stracks = [track for track in self.tracked_stracks if track.is_activated]
+        STrack.multi_predict(joint_stracks(tracked_stracks, self.lost_stracks))
+        return tracked_stracks
+
 
 def joint_stracks(tlista, tlistb):
     exists = {}
@@ -477,14 +613,14 @@ def sub_stracks(tlista, tlistb):
 def remove_duplicate_stracks(stracksa, stracksb):
     pdist = iou_distance(stracksa, stracksb)
     pairs = np.where(pdist < 0.15)
-    dupa, dupb = list(), list()
+    dupa, dupb = set(), set()
     for p, q in zip(*pairs):
         timep = stracksa[p].frame_id - stracksa[p].start_frame
         timeq = stracksb[q].frame_id - stracksb[q].start_frame
         if timep > timeq:
-            dupb.append(q)
+            dupb.add(q)
         else:
-            dupa.append(p)
-    resa = [t for i, t in enumerate(stracksa) if not i in dupa]
-    resb = [t for i, t in enumerate(stracksb) if not i in dupb]
-    return resa, resb
\ No newline at end of file
+            dupa.add(p)
+    resa = [t for i, t in enumerate(stracksa) if i not in dupa]
+    resb = [t for i, t in enumerate(stracksb) if i not in dupb]
+    return resa, resb
@@ -7,43 +7,90 @@ import cv2
 import argparse
 from pathlib import Path
 
+def plan_clip_ranges(total_frames, fps, clip_duration=15):
+    """
+    Returns the (start_frame, num_frames) of every clip that clip_video() cuts from a video,
+    so in-memory consumers can reproduce the same clip boundaries without writing files.
+    """
+    duration = total_frames / fps
+    num_clips = int(duration // clip_duration)
+    return [(int(i * clip_duration * fps), int(clip_duration * fps)) for i in range(num_clips)]
+
+class ClipDescriptor:
+    """
+    A virtual clip: a frame range [start_frame, end_frame) of a (resized) source video. Accepted in place of a
+    clip path by KeyframeSelector, PersonTracker and extract_frames, so clips only need to be re-encoded
+    when the files themselves are delivered.
+    """
+
+    def __init__(self, source_path: str, start_frame: int, end_frame: int, fps: float, name: str):
+        self.source_path = source_path
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.fps = fps
+        self.name = name  # `{basename}_clip_{i:03d}`, the stem the clip file would have.
+
+    @property
+    def num_frames(self):
+        return self.end_frame - self.start_frame
+
+    def __repr__(self):
+        return f"ClipDescriptor({self.name}: {self.source_path} [{self.start_frame}, {self.end_frame}) @ {self.fps}fps)"
+
+
+def plan_clips(video_path, clip_duration=15):
+    """Returns the ClipDescriptors of every clip clip_video() would cut from `video_path`."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Failed to open: {video_path}")
+        return []
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    basename = Path(video_path).stem
+    return [ClipDescriptor(video_path, start_frame, start_frame + num_frames, fps, f"{basename}_clip_{i:03d}")
+            for i, (start_frame, num_frames) in enumerate(plan_clip_ranges(total_frames, fps, clip_duration))]
+
+
+def write_clips(clips, output_path):
+    """Re-encodes ClipDescriptors of one source video as `{name}.mp4` files and returns their paths."""
+    if not clips:
+        return []
+    cap = cv2.VideoCapture(clips[0].source_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+
+    clip_paths = []
+    for clip in clips:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, clip.start_frame)
+        out_path = os.path.join(output_path, f"{clip.name}.mp4")
+        out = cv2.VideoWriter(out_path, fourcc, clip.fps, (width, height))
+
+        for _ in range(clip.num_frames):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        out.release()
+        clip_paths.append(out_path)
+    cap.release()
+    return clip_paths
+
+
+def clip_single_video(video_path, output_path, clip_duration=15):
+    """Cuts one video into `{basename}_clip_{i:03d}.mp4` files and returns their paths."""
+    clips = plan_clips(video_path, clip_duration)
+    print(f"Clipping {os.path.basename(video_path)} into {len(clips)} clips...")
+    return write_clips(clips, output_path)
+
 def clip_video(input_path, output_path, clip_duration=15):
     os.makedirs(output_path, exist_ok=True)
     video_files = [f for f in os.listdir(input_path) if f.endswith(('.mp4', '.avi', '.mov'))]
 
     for video_file in video_files:
-        video_path = os.path.join(input_path, video_file)
-        cap = cv2.VideoCapture(video_path)
-
-        if not cap.isOpened():
-            print(f"Failed to open: {video_path}")
-            continue
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
-        basename = Path(video_file).stem
-
-        num_clips = int(duration // clip_duration)
-        print(f"Clipping {video_file} into {num_clips} clips...")
-
-        for i in range(num_clips):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, int(i * clip_duration * fps))
-            out_filename = f"{basename}_clip_{i:03d}.mp4"
-            out_path = os.path.join(output_path, out_filename)
-
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            out = cv2.VideoWriter(out_path, fourcc, fps, (width, height))
-
-            for _ in range(int(clip_duration * fps)):
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                out.write(frame)
-            out.release()
-        cap.release()
+        clip_single_video(os.path.join(input_path, video_file), output_path, clip_duration)
 
     print(" All videos clipped successfully.")
 
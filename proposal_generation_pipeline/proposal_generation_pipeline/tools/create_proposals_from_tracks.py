@@ -1,70 +1,126 @@
+# Run from the pipeline root:
+#   python -m tools.create_proposals_from_tracks --tracking_dir <keyframe_jsons> --output_path dense.proposals
+
 import os
 import json
-import pickle
 import argparse
-from collections import defaultdict
+import multiprocessing
 from tqdm import tqdm
 import logging
 
+from .proposals_store import ProposalsWriter
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Below this many files per worker, starting a pool costs more than the parsing it saves.
+MIN_FILES_PER_WORKER = 256
+
+
+def _frame_proposals(tracked_detections):
+    """
+    Groups the detections of one clip (the dicts of a keyframe JSON) by (video_id, frame); returns a list of
+    `(video_id, frame_name, [[x1, y1, x2, y2, score, track_id], ...])`.
+    """
+    frames = {}
+    for det in tracked_detections:
+        video_id = det.get('video_id')
+        frame_name = det.get('frame')
+        bbox = det.get('bbox')
+        track_id = det.get('track_id')
+
+        if not all([video_id, frame_name, bbox, track_id]):
+            continue
+
+        # The format [x1, y1, x2, y2, score, track_id] is kept for compatibility
+        proposal_entry = [bbox[0], bbox[1], bbox[2], bbox[3], 1.0, track_id]
+        frames.setdefault((video_id, frame_name), []).append(proposal_entry)
+    return [(video_id, frame_name, rows) for (video_id, frame_name), rows in frames.items()]
+
+
+def _parse_tracking_file(file_path):
+    """Pool worker: the grouped proposals of one JSON file, or None if it cannot be read."""
+    try:
+        with open(file_path, 'rb') as f:
+            return _frame_proposals(_json_loads(f.read()))
+    except (ValueError, OSError):
+        return None
+
+
+def _write_proposals(per_clip_proposals, output_path):
+    """Appends every `_frame_proposals` list to a new proposals file as it arrives; returns the row count."""
+    with ProposalsWriter(output_path) as writer:
+        for frame_proposals in per_clip_proposals:
+            for video_id, frame_name, rows in frame_proposals:
+                writer.append(video_id, frame_name, rows)
+    if writer.num_rows == 0:
+        os.remove(output_path)
+        logger.error("❌ No detections were processed. Check your JSON files.")
+        return 0
+    logger.info(f"💾 Successfully aggregated {writer.num_rows} proposals to: {output_path}")
+    return writer.num_rows
+
 
-def generate_proposals_from_tracks(tracking_dir, output_path):
+def generate_proposals_from_detections(clip_detections, output_path):
     """
-    MODIFIED: Aggregates single-keyframe JSON files into a single proposals PKL file.
-    The structure will be {clip_id: {keyframe_name: [detections]}}.
+    Stage 4 -> 6 handoff without files: `clip_detections` yields, per clip, the same detection dicts its
+    keyframe JSON would hold. Returns the number of proposals written.
+    """
+    return _write_proposals((_frame_proposals(detections) for detections in clip_detections), output_path)
+
+
+def generate_proposals_from_tracks(tracking_dir, output_path, workers=None):
+    """
+    MODIFIED: Aggregates per-clip keyframe JSON files into a single columnar proposals file
+    (tools/proposals_store.py).
+    A clip's JSON may hold the detections of several keyframes (orchestrator --keyframes_per_clip);
+    each keyframe becomes its own entry. The structure will be {clip_id: {keyframe_name: [detections]}}.
+    Files are parsed in a pool of `workers` processes (default: one per core) with orjson when it is
+    installed, and appended to the output in file-name order as they are parsed.
     """
     if not os.path.isdir(tracking_dir):
         logger.error(f"❌ Tracking directory not found at '{tracking_dir}'")
         return
 
-    json_files = [f for f in os.listdir(tracking_dir) if f.endswith('.json')]
+    json_files = sorted(f for f in os.listdir(tracking_dir) if f.endswith('.json'))
     if not json_files:
         logger.error(f"❌ No tracking .json files found in '{tracking_dir}'")
         return
 
     logger.info(f"🔍 Found {len(json_files)} keyframe JSON files to process.")
-    results_dict = defaultdict(lambda: defaultdict(list))
-
-    for json_file in tqdm(json_files, desc="Processing keyframe detections"):
-        file_path = os.path.join(tracking_dir, json_file)
+    file_paths = [os.path.join(tracking_dir, json_file) for json_file in json_files]
+    workers = min(workers or os.cpu_count() or 1, len(file_paths) // MIN_FILES_PER_WORKER)
 
-        try:
-            with open(file_path, 'r') as f:
-                tracked_detections = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            logger.warning(f"⚠️ Skipping corrupted or empty JSON file: {json_file}")
-            continue
-
-        for det in tracked_detections:
-            video_id = det.get('video_id')
-            frame_name = det.get('frame')
-            bbox = det.get('bbox')
-            track_id = det.get('track_id')
+    def parsed_files():
+        if workers > 1:
+            # 'spawn' keeps the parent's CUDA and thread pools out of the children, as in keyframe_workers.
+            with multiprocessing.get_context("spawn").Pool(processes=workers) as pool:
+                chunksize = max(1, len(file_paths) // (workers * 16))
+                yield from pool.imap(_parse_tracking_file, file_paths, chunksize=chunksize)
+        else:
+            yield from map(_parse_tracking_file, file_paths)
 
-            if not all([video_id, frame_name, bbox, track_id]):
+    def valid_files():
+        for json_file, frame_proposals in tqdm(zip(json_files, parsed_files()), total=len(json_files),
+                                               desc="Processing keyframe detections"):
+            if frame_proposals is None:
+                logger.warning(f"⚠️ Skipping corrupted or empty JSON file: {json_file}")
                 continue
+            yield frame_proposals
 
-            # The format [x1, y1, x2, y2, score, track_id] is kept for compatibility
-            proposal_entry = [bbox[0], bbox[1], bbox[2], bbox[3], 1.0, track_id]
-            results_dict[video_id][frame_name].append(proposal_entry)
-
-    if not results_dict:
-        logger.error("❌ No detections were processed. Check your JSON files.")
-        return
-
-    # Convert defaultdicts to regular dicts for pickling
-    final_dict = {vid: dict(frames) for vid, frames in results_dict.items()}
-
-    with open(output_path, "wb") as pkl_file:
-        pickle.dump(final_dict, pkl_file)
-    logger.info(f"💾 Successfully aggregated proposals to: {output_path}")
+    return _write_proposals(valid_files(), output_path)
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Aggregate keyframe JSONs to a dense proposals PKL file.")
+    parser = argparse.ArgumentParser(description="Aggregate keyframe JSONs to a dense proposals file.")
     parser.add_argument('--tracking_dir', required=True, help="Directory containing keyframe JSON files.")
-    parser.add_argument('--output_path', required=True, help="Path to save the final dense_proposals.pkl file.")
+    parser.add_argument('--output_path', required=True, help="Path to save the final .proposals file.")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: one per core).")
     args = parser.parse_args()
-    generate_proposals_from_tracks(args.tracking_dir, args.output_path)
\ No newline at end of file
+    generate_proposals_from_tracks(args.tracking_dir, args.output_path, args.workers)
@@ -0,0 +1,60 @@
+# tools/cvat_xml.py
+
+# Incremental XML writer for CVAT annotation files. Elements go straight to the output file as they are
+# produced, laid out exactly as ElementTree + minidom.toprettyxml(indent="  ") laid them out before: the same
+# declaration, one element per line, text-only elements on a single line and childless elements
+# self-closed. So the files are byte-identical to the old ones, while neither a tree nor a second parsed
+# copy of the document is ever held in memory.
+
+
+def _escape(value) -> str:
+    # The characters minidom escapes, in text and attribute values alike.
+    return (str(value).replace("&", "&amp;").replace("<", "&lt;")
+            .replace("\"", "&quot;").replace(">", "&gt;"))
+
+
+def _attributes(attrs) -> str:
+    return "".join(f' {name}="{_escape(value)}"' for name, value in (attrs or {}).items())
+
+
+class XmlStreamWriter:
+    """
+    Writes nested elements to a text file: start()/end() for elements with children, element() for leaves.
+    `indent=None` writes everything on one line. An opening tag stays open until its first child arrives, so
+    an element that ends up without children is written as `<tag/>`.
+    """
+
+    def __init__(self, file, indent: str = "  "):
+        self.file = file
+        self.indent = indent or ""
+        self.newline = "\n" if indent is not None else ""
+        self._open = []  # [tag, has_children] per open element
+        file.write(f'<?xml version="1.0" ?>{self.newline}')
+
+    def _prefix(self):
+        if self._open and not self._open[-1][1]:
+            self.file.write(">" + self.newline)
+            self._open[-1][1] = True
+        return self.indent * len(self._open)
+
+    def start(self, tag: str, attrs: dict = None):
+        self.file.write(f"{self._prefix()}<{tag}{_attributes(attrs)}")
+        self._open.append([tag, False])
+
+    def end(self):
+        tag, has_children = self._open.pop()
+        if has_children:
+            self.file.write(f"{self.indent * len(self._open)}</{tag}>{self.newline}")
+        else:
+            self.file.write("/>" + self.newline)
+
+    def element(self, tag: str, attrs: dict = None, text=None):
+        prefix = self._prefix()
+        if text is None or text == "":
+            self.file.write(f"{prefix}<{tag}{_attributes(attrs)}/>{self.newline}")
+        else:
+            self.file.write(f"{prefix}<{tag}{_attributes(attrs)}>{_escape(text)}</{tag}>{self.newline}")
+
+    def close(self):
+        while self._open:
+            self.end()
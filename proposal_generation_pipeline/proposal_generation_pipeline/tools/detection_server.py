@@ -0,0 +1,297 @@
+# tools/detection_server.py
+
+# Local RF-DETR service shared by several pipeline processes: one process holds the model and serves
+# detection requests on a Unix socket (or localhost TCP port). Clients put their frames in a shared-memory
+# block and only send its name and layout over the socket; the server reads the frames in place, gathers
+# the frames of all clients into micro-batches (up to --max_batch_size frames, or whatever has arrived when
+# --max_latency_ms has passed since the first one) and answers each client with its own detections.
+#
+# Start:  python -m tools.detection_server --address /tmp/rfdetr.sock
+# Use:    KeyframeSelector(detector_address=...), PersonTracker(..., detector_address=...) or the
+#         orchestrator's --detector_address.
+
+import os
+import time
+import queue
+import logging
+import argparse
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .detector_registry import get_detector
+from .feature_store import StoredDetections
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def parse_address(address: str):
+    """`host:port` is a TCP address, anything else a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "localhost", int(port)
+    return address
+
+
+def default_authkey():
+    """Optional shared secret for server and clients, from $DETECTION_SERVER_AUTHKEY."""
+    return os.environ.get("DETECTION_SERVER_AUTHKEY", "").encode() or None
+
+
+def _attach(name: str) -> SharedMemory:
+    shm = SharedMemory(name=name)
+    # Before Python 3.13 attaching registers the block with this process' resource tracker, which would
+    # unlink the client's memory when the server exits; the client owns it.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _to_arrays(dets):
+    if not hasattr(dets, "xyxy") or dets.xyxy is None:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32)
+    return (np.asarray(dets.xyxy).reshape(-1, 4), np.asarray(dets.confidence).reshape(-1),
+            np.asarray(dets.class_id).reshape(-1))
+
+
+class _FrameRequest:
+    def __init__(self, frame: np.ndarray, threshold: float):
+        self.frame = frame
+        self.threshold = threshold
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class DetectionServer:
+    """
+    Serves one detection model to local clients with dynamic micro-batching. With `optimize=True` the model is
+    traced for `max_batch_size` frames (optimize_for_inference), so smaller batches are padded to that size.
+    """
+
+    def __init__(self, address: str, model_name: str = "RFDETRMedium", device: str = None, threshold: float = 0.5,
+                 max_batch_size: int = 8, max_latency_ms: float = 10.0, optimize: bool = False):
+        self.address = address
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max_latency_ms / 1000.0
+        self.optimize = optimize
+        self.model = get_detector(model_name, device, threshold, optimize=optimize,
+                                  batch_size=self.max_batch_size if optimize else 1)
+        self._requests = queue.Queue()
+        self._listener = None
+        self._stopped = threading.Event()
+        self.batches = 0
+        self.frames = 0
+
+    # --- Batching ---
+
+    def _next_batch(self):
+        first = self._requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self._requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run_batch(self, batch):
+        frames = [r.frame for r in batch]
+        if self.optimize:
+            frames += [frames[-1]] * (self.max_batch_size - len(frames))
+        try:
+            dets = self.model.predict(frames if len(frames) > 1 else frames[0], threshold=batch[0].threshold)
+            dets = dets if isinstance(dets, list) else [dets]
+            for request, d in zip(batch, dets):
+                request.result = _to_arrays(d)
+        except Exception as e:
+            logger.error(f"❌ Detection batch failed: {e}")
+            for request in batch:
+                request.error = str(e)
+        # Drop the views into the clients' shared memory before they are told to go on (and may close it).
+        del frames
+        for request in batch:
+            request.frame = None
+            request.done.set()
+        self.batches += 1
+        self.frames += len(batch)
+
+    def _batch_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # A batch is run with one threshold; requests with another one form their own batch.
+            by_threshold = {}
+            for request in batch:
+                by_threshold.setdefault(request.threshold, []).append(request)
+            for group in by_threshold.values():
+                self._run_batch(group)
+
+    # --- Clients ---
+
+    def _serve_client(self, conn):
+        shm = None
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    return
+                if message[0] == "stats":
+                    conn.send(("ok", {"batches": self.batches, "frames": self.frames}))
+                    continue
+                _, shm_name, layout, threshold = message
+                if shm is None or shm.name != shm_name.lstrip("/"):
+                    if shm is not None:
+                        shm.close()
+                    shm = _attach(shm_name)
+                requests = [_FrameRequest(np.ndarray(shape, np.uint8, buffer=shm.buf, offset=offset), threshold)
+                            for offset, shape in layout]
+                for request in requests:
+                    self._requests.put(request)
+                for request in requests:
+                    request.done.wait()
+                errors = [r.error for r in requests if r.error]
+                conn.send(("error", errors[0]) if errors else ("ok", [r.result for r in requests]))
+                # The frame views must be gone before the shared memory can be closed.
+                del requests
+        finally:
+            if shm is not None:
+                shm.close()
+            conn.close()
+
+    def serve_forever(self):
+        address = parse_address(self.address)
+        authkey = default_authkey()
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            # Bound under a restrictive umask, so the socket is owner-only from the moment it exists.
+            old_umask = os.umask(0o077)
+            try:
+                self._listener = Listener(address, authkey=authkey)
+            finally:
+                os.umask(old_umask)
+        else:
+            if authkey is None:
+                logger.warning("⚠️ Serving TCP without $DETECTION_SERVER_AUTHKEY: anyone who can reach the port can "
+                               "make the server read shared memory by name. Set it for server and clients, or use "
+                               "a Unix socket.")
+            self._listener = Listener(address, authkey=authkey)
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        logger.info(f"🚀 Detection server listening on {self.address} "
+                    f"(max batch {self.max_batch_size}, max latency {self.max_latency * 1000:g} ms).")
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._requests.put(None)
+        if self._listener is not None:
+            self._listener.close()
+        mean_batch = self.frames / self.batches if self.batches else 0
+        logger.info(f"Detection server stopped: {self.frames} frames in {self.batches} batches "
+                    f"(mean batch {mean_batch:.1f}).")
+
+
+class RemoteDetector:
+    """
+    Client with RFDETRMedium's predict() interface. Frames go through a shared-memory block owned by the client
+    (grown when a request does not fit); detections come back with `xyxy`, `confidence` and `class_id`.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._conn = Client(parse_address(address), authkey=default_authkey())
+        self._shm = None
+        self._lock = threading.Lock()
+
+    def optimize_for_inference(self, *args, **kwargs):
+        """The server decides how its model is optimized."""
+
+    def _buffer(self, nbytes):
+        if self._shm is None or self._shm.size < nbytes:
+            size = max(nbytes, 2 * self._shm.size if self._shm is not None else 0)
+            self._release_buffer()
+            self._shm = SharedMemory(create=True, size=size)
+        return self._shm
+
+    def _release_buffer(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def predict(self, images, threshold=0.5):
+        frames = [np.ascontiguousarray(image, dtype=np.uint8)
+                  for image in (images if isinstance(images, list) else [images])]
+        layout, offset = [], 0
+        for frame in frames:
+            layout.append((offset, frame.shape))
+            offset += frame.nbytes
+
+        with self._lock:
+            shm = self._buffer(offset)
+            for (start, shape), frame in zip(layout, frames):
+                np.ndarray(shape, np.uint8, buffer=shm.buf, offset=start)[...] = frame
+            self._conn.send(("predict", shm.name, layout, float(threshold)))
+            status, payload = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Detection server at {self.address} failed: {payload}")
+
+        detections = [StoredDetections(*arrays) for arrays in payload]
+        return detections if isinstance(images, list) else detections[0]
+
+    def stats(self):
+        with self._lock:
+            self._conn.send(("stats",))
+            return self._conn.recv()[1]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            self._release_buffer()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve RF-DETR to local pipeline processes with micro-batching.")
+    parser.add_argument("--address", default="/tmp/rfdetr.sock", help="Unix socket path or host:port.")
+    parser.add_argument("--model", default="RFDETRMedium")
+    parser.add_argument("--device", default=None, help="Defaults to cuda when available.")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--max_batch_size", type=int, default=8)
+    parser.add_argument("--max_latency_ms", type=float, default=10.0,
+                        help="Longest a frame waits for others to fill its batch.")
+    parser.add_argument("--optimize", action="store_true",
+                        help="optimize_for_inference() for max_batch_size frames (smaller batches are padded).")
+    args = parser.parse_args()
+
+    server = DetectionServer(args.address, args.model, args.device, args.threshold, args.max_batch_size,
+                             args.max_latency_ms, args.optimize)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
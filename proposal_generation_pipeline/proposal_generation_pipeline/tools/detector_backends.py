@@ -0,0 +1,172 @@
+# tools/detector_backends.py
+
+# Detector backends. Everything that consumes detections (KeyframeSelector, PersonTracker, the detection
+# server) only needs `predict(images, threshold)` returning objects with `xyxy`, `confidence` and `class_id`,
+# as rfdetr.RFDETRMedium does on PyTorch. OnnxDetector implements the same interface on ONNX Runtime's CPU
+# provider, for deployments without a GPU:
+#
+#   python -m tools.detector_backends export --output_dir models/rfdetr_medium
+#   python -m tools.detector_backends quantize --onnx_path models/rfdetr_medium/inference_model.onnx
+#
+# and then `--detector_model models/rfdetr_medium/inference_model.int8.onnx` in the orchestrator.
+# onnxruntime (and onnx for quantization) are only imported when an ONNX model is used.
+
+import os
+import logging
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .feature_store import StoredDetections
+from .stage_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+# RF-DETR's input normalization (ImageNet statistics) and the number of (query, class) pairs it keeps.
+IMAGE_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGE_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+NUM_SELECT = 300
+
+
+def is_onnx_model(model_name: str) -> bool:
+    return str(model_name).endswith(".onnx")
+
+
+def detector_id(model_name: str) -> str:
+    """
+    Name of a model in feature-store paths and cache keys. ONNX models are named after their file and its
+    content, since every rfdetr export is called inference_model.onnx.
+    """
+    if not is_onnx_model(model_name):
+        return model_name
+    return f"onnx_{Path(model_name).stem}_{file_digest(model_name)[:16]}"
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("ONNX models need onnxruntime: pip install onnxruntime") from e
+    return onnxruntime
+
+
+class OnnxDetector:
+    """
+    RF-DETR exported to ONNX (export_onnx()), run with ONNX Runtime on the CPU. Pre- and post-processing follow
+    RFDETR.predict(): frames are resized to the model resolution and normalized, and the top NUM_SELECT
+    (query, class) pairs by sigmoid score become detections in pixel xyxy coordinates.
+    """
+
+    def __init__(self, onnx_path: str, num_threads: int = None, num_select: int = NUM_SELECT,
+                 resolution: int = None):
+        ort = _import_onnxruntime()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        # One graph at a time; parallelism comes from the intra-op threads.
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.onnx_path = str(onnx_path)
+        self.num_select = num_select
+        # Feature-store namespace: detections of an int8 model are not interchangeable with fp32 ones.
+        self.feature_store_id = detector_id(onnx_path)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        # An export with dynamic height/width has a symbolic dimension here; it then needs `resolution`.
+        self.resolution = model_input.shape[2] if isinstance(model_input.shape[2], int) else resolution
+        if not self.resolution:
+            raise ValueError(f"{onnx_path} has a dynamic input size ({model_input.shape}); "
+                             f"pass the resolution it was trained for.")
+        self.output_names = [output.name for output in self.session.get_outputs()]
+
+    def optimize_for_inference(self, *args, **kwargs):
+        """ONNX Runtime optimizes the graph when the session is created."""
+
+    def _preprocess(self, frame_rgb: np.ndarray) -> np.ndarray:
+        h, w = frame_rgb.shape[:2]
+        # INTER_AREA approximates the antialiased bilinear resize torchvision uses when shrinking.
+        interpolation = cv2.INTER_AREA if h > self.resolution or w > self.resolution else cv2.INTER_LINEAR
+        resized = cv2.resize(frame_rgb, (self.resolution, self.resolution), interpolation=interpolation)
+        normalized = (resized.astype(np.float32) / 255.0 - IMAGE_MEAN) / IMAGE_STD
+        return normalized.transpose(2, 0, 1)
+
+    def _postprocess(self, boxes: np.ndarray, logits: np.ndarray, size, threshold: float) -> StoredDetections:
+        num_classes = logits.shape[-1]
+        scores = 1.0 / (1.0 + np.exp(-logits.reshape(-1)))
+        top = np.argpartition(-scores, min(self.num_select, scores.size) - 1)[:self.num_select]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[scores[top] > threshold]
+
+        cx, cy, bw, bh = boxes[top // num_classes].T
+        h, w = size
+        xyxy = np.stack([(cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h], axis=1)
+        return StoredDetections(xyxy.astype(np.float32), scores[top].astype(np.float32),
+                                (top % num_classes).astype(np.int64))
+
+    def _run(self, frames):
+        batch = np.stack([self._preprocess(frame) for frame in frames])
+        boxes, logits = self.session.run(self.output_names, {self.input_name: batch})
+        return boxes, logits
+
+    def predict(self, images, threshold=0.5):
+        frames = images if isinstance(images, list) else [images]
+        # A model exported with a fixed batch size runs in chunks of it (the last one padded).
+        chunk = self.batch_size or len(frames)
+        detections = []
+        for start in range(0, len(frames), chunk):
+            part = frames[start:start + chunk]
+            boxes, logits = self._run(part + [part[-1]] * (chunk - len(part)))
+            detections.extend(self._postprocess(boxes[i], logits[i], frame.shape[:2], threshold)
+                              for i, frame in enumerate(part))
+        return detections if isinstance(images, list) else detections[0]
+
+
+def export_onnx(output_dir: str, model_name: str = "RFDETRMedium", batch_size: int = 1, opset_version: int = 17) -> str:
+    """Exports the RF-DETR checkpoint to `<output_dir>/inference_model.onnx` (rfdetr's own exporter)."""
+    from .detector_registry import MODEL_FACTORIES
+    model = MODEL_FACTORIES[model_name](device="cpu")
+    model.export(output_dir=output_dir, batch_size=batch_size, opset_version=opset_version)
+    onnx_path = os.path.join(output_dir, "inference_model.onnx")
+    logger.info(f"📦 Exported {model_name} to {onnx_path}")
+    return onnx_path
+
+
+def quantize_int8(onnx_path: str, output_path: str = None) -> str:
+    """
+    Dynamic int8 quantization of the weights of the MatMul/Gemm layers (the transformer part of RF-DETR);
+    convolutions stay in float, which ONNX Runtime's CPU provider runs faster than their dynamic-int8 form.
+    """
+    _import_onnxruntime()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    output_path = output_path or str(Path(onnx_path).with_suffix(".int8.onnx"))
+    quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul", "Gemm"])
+    logger.info(f"📦 Quantized {onnx_path} -> {output_path} "
+                f"({os.path.getsize(onnx_path) / 1e6:.0f} MB -> {os.path.getsize(output_path) / 1e6:.0f} MB)")
+    return output_path
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Export RF-DETR to ONNX and quantize it for CPU inference.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Export the RF-DETR checkpoint to ONNX.")
+    export_parser.add_argument("--output_dir", required=True)
+    export_parser.add_argument("--model", default="RFDETRMedium")
+    export_parser.add_argument("--batch_size", type=int, default=1)
+    export_parser.add_argument("--quantize", action="store_true", help="Also write the int8 model.")
+    quantize_parser = commands.add_parser("quantize", help="Dynamic int8 quantization of an exported model.")
+    quantize_parser.add_argument("--onnx_path", required=True)
+    quantize_parser.add_argument("--output_path", default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        exported = export_onnx(args.output_dir, args.model, args.batch_size)
+        if args.quantize:
+            quantize_int8(exported)
+    else:
+        quantize_int8(args.onnx_path, args.output_path)
@@ -0,0 +1,120 @@
+# tools/detector_registry.py
+
+# Process-wide registry of loaded detection models. PersonTracker and KeyframeSelector ask it for a model
+# instead of building their own, so a process loads (and optimizes) each model configuration once, however
+# many videos or selectors use it. Models are keyed by (model name, device, threshold, optimized) and can be
+# evicted explicitly or by capping the number kept (least recently used first). Instead of a local model, a
+# client of a shared detection server (tools/detection_server.py) can be handed out, and a model name ending
+# in .onnx loads that file on ONNX Runtime's CPU provider (tools/detector_backends.py).
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import torch
+from rfdetr import RFDETRMedium
+
+from .detector_backends import OnnxDetector, is_onnx_model
+
+logger = logging.getLogger(__name__)
+
+# Model name -> factory called as `factory(device=device)`.
+MODEL_FACTORIES = {"RFDETRMedium": RFDETRMedium}
+
+_models = OrderedDict()
+_lock = threading.RLock()
+_max_models = None
+
+
+def default_device():
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def register_detector(model_name: str, factory):
+    """Makes `model_name` loadable through get_detector()."""
+    MODEL_FACTORIES[model_name] = factory
+
+
+def set_max_detectors(max_models=None):
+    """Keeps at most `max_models` models loaded, evicting the least recently used; None means no limit."""
+    global _max_models
+    with _lock:
+        _max_models = max_models
+        _evict_to_limit()
+
+
+def get_detector(model_name: str = "RFDETRMedium", device: str = None, threshold: float = 0.5,
+                 optimize: bool = False, batch_size: int = 1, address: str = None, num_threads: int = None):
+    """
+    Returns the process' instance of a detection model, loading it on first use. `optimize=True` returns a
+    separate instance on which optimize_for_inference() has been called for `batch_size` frames (a traced
+    model, as PersonTracker uses with batch size 1), since that instance only runs batches of that size.
+    With `address`, returns a RemoteDetector connected to the detection server there instead.
+
+    A `.onnx` model name is an exported model (tools/detector_backends.py), always run on the CPU with
+    `num_threads` intra-op threads (default: torch's thread count, which the keyframe workers set per worker).
+    """
+    if address:
+        key = (model_name, address, float(threshold), False)
+    elif is_onnx_model(model_name):
+        key = (model_name, "cpu", float(threshold), False)
+    else:
+        device = device or default_device()
+        key = (model_name, device, float(threshold), batch_size if optimize else False)
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+
+        start = time.perf_counter()
+        if address:
+            from .detection_server import RemoteDetector
+            model = RemoteDetector(address)
+            logger.info(f"🔌 Connected to the detection server at {address}.")
+        elif is_onnx_model(model_name):
+            num_threads = num_threads or torch.get_num_threads()
+            model = OnnxDetector(model_name, num_threads=num_threads)
+            logger.info(f"🧠 Loaded {model_name} on ONNX Runtime (CPU, {num_threads} threads) "
+                        f"in {time.perf_counter() - start:.1f}s; it is shared by every user in this process.")
+        else:
+            model = MODEL_FACTORIES[model_name](device=device)
+            if optimize:
+                model.optimize_for_inference(**({"batch_size": batch_size} if batch_size != 1 else {}))
+            logger.info(f"🧠 Loaded {model_name} on {device}{' (optimized)' if optimize else ''} "
+                        f"in {time.perf_counter() - start:.1f}s; it is shared by every user in this process.")
+        _models[key] = model
+        _evict_to_limit()
+        return model
+
+
+def evict_detector(model_name: str = None, device: str = None) -> int:
+    """Drops the loaded models matching `model_name`/`device` (all of them by default); returns how many."""
+    with _lock:
+        keys = [key for key in _models
+                if (model_name is None or key[0] == model_name) and (device is None or key[1] == device)]
+        for key in keys:
+            _close(_models.pop(key))
+    if keys and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return len(keys)
+
+
+def loaded_detectors():
+    """Keys of the loaded models, least recently used first."""
+    with _lock:
+        return list(_models)
+
+
+def _evict_to_limit():
+    while _max_models is not None and len(_models) > max(0, _max_models):
+        key, model = _models.popitem(last=False)
+        _close(model)
+        logger.info(f"♻️ Evicted {key[0]} on {key[1]} from the detector registry.")
+
+
+def _close(model):
+    # Remote detectors hold a connection and a shared-memory block; local models are just dropped.
+    if hasattr(model, "close"):
+        model.close()
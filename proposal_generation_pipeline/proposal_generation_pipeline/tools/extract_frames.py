@@ -4,25 +4,35 @@ import argparse
 from pathlib import Path
 
 def extract_frames(input_dir, output_dir, fps=1):
+    """
+    Extracts frames at `fps` from every video in `input_dir`. `input_dir` may also be a list of
+    ClipDescriptors (tools/clip_video.py), in which case the frames are read straight from each clip's
+    frame range in its source video and saved under the clip's name.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    video_files = sorted([f for f in os.listdir(input_dir) if f.endswith(('.mp4', '.avi'))])
-    
-    if not video_files:
+    if isinstance(input_dir, (list, tuple)):
+        # (basename, path, first frame, frame count or None for the whole file)
+        videos = [(clip.name, clip.source_path, clip.start_frame, clip.num_frames) for clip in input_dir]
+    else:
+        video_files = sorted([f for f in os.listdir(input_dir) if f.endswith(('.mp4', '.avi'))])
+        videos = [(Path(f).stem, os.path.join(input_dir, f), 0, None) for f in video_files]
+
+    if not videos:
         print(f"⚠️ Warning: No video files found in '{input_dir}'. Skipping frame extraction.")
         return
 
-    for video_file in video_files:
-        video_path = os.path.join(input_dir, video_file)
-        basename = Path(video_file).stem
+    for basename, video_path, start_frame, num_frames in videos:
         video_output_dir = os.path.join(output_dir, basename)
         os.makedirs(video_output_dir, exist_ok=True)
         
-        print(f"Extracting frames for {video_file}...")
+        print(f"Extracting frames for {basename}...")
 
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             print(f"❌ Failed to open video file: {video_path}")
             continue
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
 
         video_fps = cap.get(cv2.CAP_PROP_FPS)
         frame_interval = int(video_fps // fps) if video_fps // fps > 0 else 1
@@ -30,7 +40,7 @@ def extract_frames(input_dir, output_dir, fps=1):
         frame_count = 0
         saved_frame_idx = 0
 
-        while True:
+        while num_frames is None or frame_count < num_frames:
             ret, frame = cap.read()
             if not ret:
                 break
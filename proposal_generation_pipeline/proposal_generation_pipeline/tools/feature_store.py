@@ -0,0 +1,135 @@
+# tools/feature_store.py
+
+# Persistent per-clip features for keyframe selection: detector output and per-box motion of every
+# candidate frame that has been scored once. With it, retuning the score weights or the candidate window
+# only re-ranks stored numbers instead of re-running RF-DETR and optical flow.
+#
+# Layout: <store_dir>/<model_id>/thr<threshold>/<clip_hash>.npz, one file per (clip content, model, threshold)
+# holding flat arrays indexed by the clip-relative frame index.
+
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .clip_video import ClipDescriptor
+from .stage_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+
+class StoredDetections:
+    """Detections read back from the store, with the attributes KeyframeSelector uses from RF-DETR output."""
+
+    def __init__(self, xyxy: np.ndarray, confidence: np.ndarray, class_id: np.ndarray):
+        self.xyxy = xyxy
+        self.confidence = confidence
+        self.class_id = class_id
+
+
+class ClipFeatures:
+    """
+    Features of one clip for one (model, threshold): detections per frame index and, per motion estimator,
+    the person-box motion of a frame relative to the previous candidate it was scored against.
+    """
+
+    def __init__(self):
+        self._detections: Dict[int, StoredDetections] = {}
+        self._motion: Dict[str, Dict[Tuple[int, int], np.ndarray]] = {}
+        self.dirty = False
+
+    def detections(self, frame_idx: int) -> Optional[StoredDetections]:
+        return self._detections.get(int(frame_idx))
+
+    def add_detections(self, frame_idx: int, dets):
+        # Boxes and confidences keep the detector's dtype so stored and fresh results are identical.
+        self._detections[int(frame_idx)] = StoredDetections(
+            np.asarray(dets.xyxy).reshape(-1, 4),
+            np.asarray(dets.confidence).reshape(-1),
+            np.asarray(dets.class_id, dtype=np.int32).reshape(-1))
+        self.dirty = True
+
+    def box_motion(self, estimator_id: str, frame_idx: int, prev_idx: int) -> Optional[np.ndarray]:
+        return self._motion.get(estimator_id, {}).get((int(frame_idx), int(prev_idx)))
+
+    def add_box_motion(self, estimator_id: str, frame_idx: int, prev_idx: int, values: np.ndarray):
+        self._motion.setdefault(estimator_id, {})[(int(frame_idx), int(prev_idx))] = np.asarray(values, np.float64)
+        self.dirty = True
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        frames = sorted(self._detections)
+        dets = [self._detections[f] for f in frames]
+        arrays = {
+            "frames": np.array(frames, dtype=np.int32),
+            "box_offsets": np.cumsum([0] + [len(d.confidence) for d in dets]).astype(np.int64),
+            "boxes": np.concatenate([d.xyxy for d in dets]) if dets else np.zeros((0, 4), np.float32),
+            "confidences": np.concatenate([d.confidence for d in dets]) if dets else np.zeros(0, np.float32),
+            "class_ids": np.concatenate([d.class_id for d in dets]) if dets else np.zeros(0, np.int32),
+        }
+        estimators = sorted(self._motion)
+        arrays["motion_estimators"] = np.array(json.dumps(estimators))
+        for i, estimator_id in enumerate(estimators):
+            pairs = sorted(self._motion[estimator_id])
+            values = [self._motion[estimator_id][p] for p in pairs]
+            arrays[f"motion{i}_pairs"] = np.array(pairs, dtype=np.int32).reshape(-1, 2)
+            arrays[f"motion{i}_offsets"] = np.cumsum([0] + [len(v) for v in values]).astype(np.int64)
+            arrays[f"motion{i}_values"] = np.concatenate(values) if values else np.zeros(0)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "ClipFeatures":
+        features = cls()
+        offsets = arrays["box_offsets"]
+        boxes, confidences, class_ids = arrays["boxes"], arrays["confidences"], arrays["class_ids"]
+        for i, frame_idx in enumerate(arrays["frames"].tolist()):
+            lo, hi = offsets[i], offsets[i + 1]
+            features._detections[frame_idx] = StoredDetections(boxes[lo:hi], confidences[lo:hi], class_ids[lo:hi])
+        for i, estimator_id in enumerate(json.loads(str(arrays["motion_estimators"]))):
+            pairs, offsets, values = (arrays[f"motion{i}_{name}"] for name in ("pairs", "offsets", "values"))
+            features._motion[estimator_id] = {
+                (int(f), int(p)): values[offsets[j]:offsets[j + 1]] for j, (f, p) in enumerate(pairs)}
+        return features
+
+
+class FeatureStore:
+    def __init__(self, store_dir: str):
+        self.root = Path(store_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def clip_hash(video) -> str:
+        """Content hash of a clip file, or of a ClipDescriptor's source video plus its frame range."""
+        if isinstance(video, ClipDescriptor):
+            payload = f"{file_digest(video.source_path)}:{video.start_frame}:{video.end_frame}"
+            return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return file_digest(video)
+
+    def _path(self, clip_hash: str, model_id: str, threshold: float) -> Path:
+        return self.root / model_id / f"thr{threshold:g}" / f"{clip_hash}.npz"
+
+    def load(self, clip_hash: str, model_id: str, threshold: float) -> ClipFeatures:
+        """Returns the stored features of a clip, or empty features if there are none (or they are unreadable)."""
+        path = self._path(clip_hash, model_id, threshold)
+        if not path.exists():
+            return ClipFeatures()
+        try:
+            with np.load(path) as arrays:
+                return ClipFeatures.from_arrays(arrays)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable feature file {path}: {e}")
+            return ClipFeatures()
+
+    def save(self, clip_hash: str, model_id: str, threshold: float, features: ClipFeatures):
+        """Writes the features if anything was added since they were loaded."""
+        if not features.dirty:
+            return
+        path = self._path(clip_hash, model_id, threshold)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.tmp{os.getpid()}.npz")
+        np.savez(tmp_path, **features.to_arrays())
+        os.replace(tmp_path, path)
+        features.dirty = False
@@ -0,0 +1,64 @@
+# tools/frame_reader.py
+
+import os
+import cv2
+
+from .clip_video import ClipDescriptor
+
+
+def clip_name(video):
+    """Stem of a clip path, or the name of a ClipDescriptor."""
+    if isinstance(video, ClipDescriptor):
+        return video.name
+    return os.path.splitext(os.path.basename(video))[0]
+
+
+def clip_file_name(video):
+    """File name of a clip path, or the `{name}.mp4` a ClipDescriptor would be written as."""
+    if isinstance(video, ClipDescriptor):
+        return f"{video.name}.mp4"
+    return os.path.basename(video)
+
+
+def open_clip(video):
+    """
+    Opens a clip file path or a ClipDescriptor. Returns `(cap, start_frame, total_frames, fps)`, where frame
+    indices inside the clip run from 0 to total_frames and map to source frame `start_frame + idx`;
+    `cap` is None if the video cannot be opened.
+    """
+    if isinstance(video, ClipDescriptor):
+        cap = cv2.VideoCapture(video.source_path)
+        if not cap.isOpened():
+            return None, 0, 0, 0
+        return cap, video.start_frame, video.num_frames, video.fps
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        return None, 0, 0, 0
+    return cap, 0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS)
+
+
+def read_clip_window(cap, clip_start, start_frame, end_frame, stride=1):
+    """read_window() for clip-relative indices of a clip starting at source frame `clip_start`."""
+    for frame_idx, frame in read_window(cap, clip_start + start_frame, clip_start + end_frame, stride):
+        yield frame_idx - clip_start, frame
+
+
+def read_window(cap, start_frame, end_frame, stride=1):
+    """
+    Yields `(frame_idx, frame)` for frames start_frame, start_frame + stride, ... < end_frame.
+
+    Seeks only once, to `start_frame`, and then walks forward: skipped frames are only grabbed
+    (demuxed/decoded without the colour conversion and copy of retrieve()), so a window costs a single
+    sequential decode instead of one seek back to the previous keyframe per candidate.
+    """
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    for frame_idx in range(start_frame, end_frame):
+        if not cap.grab():
+            break
+        if (frame_idx - start_frame) % stride:
+            continue
+        ret, frame = cap.retrieve()
+        if ret:
+            yield frame_idx, frame
@@ -0,0 +1,204 @@
+# tools/image_dims.py
+
+# Image sizes without decoding: the width and height of a JPEG come from its SOF segment (plus the EXIF
+# orientation, which cv2.imread applies) and those of a PNG from its IHDR chunk, so a lookup reads a few
+# hundred bytes instead of decoding megapixels. A directory's sizes are kept in an index file inside it,
+#
+#   <directory>/image_dims.json   {relative_path: [width, height]}
+#
+# which the orchestrator writes when it saves the keyframes and the CVAT/AVA converters read. Build one for
+# an existing folder of frames with:
+#   python -m tools.image_dims --directory outputs/<batch>/keyframes
+
+import os
+import json
+import struct
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DIMS_INDEX_NAME = "image_dims.json"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers; C4 (DHT), C8 (JPG) and CC (DAC) share the range but are not frames.
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field.
+_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD9)}
+
+
+def _exif_orientation(segment: bytes):
+    # The Orientation tag (0x0112) of IFD0 in an APP1 "Exif" segment, or None.
+    if segment[:6] != b"Exif\x00\x00" or len(segment) < 14:
+        return None
+    tiff = segment[6:]
+    endian = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if endian is None:
+        return None
+    ifd = struct.unpack(endian + "I", tiff[4:8])[0]
+    if ifd + 2 > len(tiff):
+        return None
+    for i in range(struct.unpack(endian + "H", tiff[ifd:ifd + 2])[0]):
+        entry = tiff[ifd + 2 + 12 * i:ifd + 14 + 12 * i]
+        if len(entry) < 12:
+            return None
+        if struct.unpack(endian + "H", entry[:2])[0] == 0x0112:
+            return struct.unpack(endian + "H", entry[8:10])[0]
+    return None
+
+
+def _jpeg_size(f):
+    orientation = None
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in _STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):  # end of image or start of scan before any frame header
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0] - 2
+        if marker in _SOF_MARKERS:
+            header = f.read(5)
+            if len(header) < 5:
+                return None
+            height, width = struct.unpack(">HH", header[1:5])
+            # Orientations 5-8 turn the image by 90 degrees.
+            return (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+        if marker == 0xE1 and orientation is None:
+            orientation = _exif_orientation(f.read(length))
+        else:
+            f.seek(length, os.SEEK_CUR)
+
+
+def _decoded_size(path):
+    # Anything the header parsers do not understand is decoded, as before.
+    import cv2
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    return img.shape[1], img.shape[0]
+
+
+def image_size(path: str):
+    """`(width, height)` of a JPEG or PNG from its header, or None if the file is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(24)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                size = _jpeg_size(f)
+            elif head[:8] == _PNG_SIGNATURE and head[12:16] == b"IHDR":
+                size = struct.unpack(">II", head[16:24])
+            else:
+                size = None
+    except OSError:
+        return None
+    return tuple(size) if size else _decoded_size(path)
+
+
+def _relative_key(relative_path: str) -> str:
+    return relative_path.replace(os.sep, "/")
+
+
+def scan_directory(directory: str, workers: int = None) -> dict:
+    """`{relative_path: (width, height)}` of every image under `directory`, read by a pool of threads."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_SUFFIXES))
+    paths.sort()
+    # Header reads are mostly waiting on the disk, so threads overlap them well.
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        sizes = list(pool.map(image_size, paths))
+    return {_relative_key(os.path.relpath(path, directory)): size
+            for path, size in zip(paths, sizes) if size is not None}
+
+
+class ImageDimsIndex:
+    """
+    The sizes of the images under `directory`, by path relative to it. get() answers from the index and reads
+    the header of any image it does not list (remembering the answer), so a missing or partial index only
+    costs header reads.
+    """
+
+    def __init__(self, directory: str, dims: dict = None):
+        self.directory = str(directory)
+        self.dims = {_relative_key(path): tuple(size) for path, size in (dims or {}).items()}
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, DIMS_INDEX_NAME)
+
+    @classmethod
+    def load(cls, directory):
+        """The saved index of `directory`; empty (header reads only) if there is none."""
+        index = cls(directory)
+        try:
+            with open(index.index_path, "r", encoding="utf-8") as f:
+                index.dims = {path: tuple(size) for path, size in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable image size index {index.index_path}: {e}")
+        return index
+
+    @classmethod
+    def build(cls, directory, workers: int = None, save: bool = True):
+        index = cls(directory, scan_directory(str(directory), workers))
+        if save:
+            index.save()
+        return index
+
+    @classmethod
+    def open(cls, directory, workers: int = None):
+        """The saved index of `directory`, or a newly built (and saved) one if it has none yet."""
+        if os.path.exists(os.path.join(str(directory), DIMS_INDEX_NAME)):
+            return cls.load(directory)
+        return cls.build(directory, workers)
+
+    def get(self, relative_path: str):
+        """`(width, height)` of an image under the directory, or None if it cannot be read."""
+        key = _relative_key(relative_path)
+        size = self.dims.get(key)
+        if size is None:
+            size = image_size(os.path.join(self.directory, relative_path))
+            if size is not None:
+                self.dims[key] = size
+        return size
+
+    def add(self, relative_path: str, width: int, height: int):
+        self.dims[_relative_key(relative_path)] = (int(width), int(height))
+
+    def save(self):
+        try:
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump({path: list(size) for path, size in sorted(self.dims.items())}, f)
+        except OSError as e:
+            # A read-only frame folder still works; its sizes are just read again next time.
+            logger.warning(f"⚠️ Could not save image size index {self.index_path}: {e}")
+
+    def __len__(self):
+        return len(self.dims)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Index the image sizes of a folder from their headers.")
+    parser.add_argument("--directory", required=True, help="Folder of JPEG/PNG images (searched recursively).")
+    parser.add_argument("--workers", type=int, default=None, help="Reader threads.")
+    args = parser.parse_args()
+    index = ImageDimsIndex.build(args.directory, args.workers)
+    logger.info(f"💾 Indexed {len(index)} images to {index.index_path}")
@@ -0,0 +1,104 @@
+# tools/jpeg_zip.py
+
+# Writes keyframes and their ZIP in one pass. Frames are JPEG-encoded by a pool of threads (cv2.imencode
+# releases the GIL), each encoded file is saved to the keyframes folder by the thread that encoded it, and
+# the bytes are appended to the archive as ZIP_STORED members: JPEG data does not deflate, so compressing it
+# again only costs CPU. Members are appended in the order they were added, so the archive does not depend on
+# which thread finishes first, and it is complete as soon as close() returns, without reading the folder back.
+
+import os
+import logging
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JPEG_QUALITY = 95  # cv2.imwrite's default
+
+
+def _done(result=None) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class JpegZipWriter:
+    """
+    add_frame() queues a BGR frame for encoding, add_jpeg() an already encoded one. Both are saved as
+    `directory/arcname` (when a directory is given) and stored in the ZIP at `zip_path`. `on_written` callbacks
+    run on the caller's thread once the file and everything added before it are written. At most
+    `max_pending` frames wait for the archive; adding more blocks until the oldest one is in.
+    """
+
+    def __init__(self, zip_path, directory=None, quality: int = DEFAULT_JPEG_QUALITY, workers: int = None,
+                 max_pending: int = None):
+        self.zip_path = str(zip_path)
+        self.directory = Path(directory) if directory is not None else None
+        self.quality = int(quality)
+        workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * workers
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()  # (arcname or None, future of the JPEG bytes, on_written)
+        self._zip = zipfile.ZipFile(self.zip_path, "w")
+        self.num_written = 0
+
+    def _save(self, arcname: str, data: bytes) -> bytes:
+        if self.directory is not None:
+            with open(self.directory / arcname, "wb") as f:
+                f.write(data)
+        return data
+
+    def _encode(self, arcname: str, frame) -> bytes:
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError(f"Could not encode {arcname} as JPEG.")
+        return self._save(arcname, buffer.tobytes())
+
+    def _enqueue(self, arcname, future: Future, on_written):
+        self._pending.append((arcname, future, on_written))
+        self._drain()
+
+    def _drain(self, wait_all: bool = False):
+        # Archives finished files from the head of the queue, waiting for the head while the queue is too long.
+        while self._pending and (wait_all or self._pending[0][1].done() or len(self._pending) > self.max_pending):
+            arcname, future, on_written = self._pending.popleft()
+            data = future.result()
+            if arcname is not None:
+                self._zip.writestr(arcname, data, compress_type=zipfile.ZIP_STORED)
+                self.num_written += 1
+            if on_written is not None:
+                on_written()
+
+    def add_frame(self, arcname: str, frame, on_written=None):
+        self._enqueue(arcname, self._pool.submit(self._encode, arcname, frame), on_written)
+
+    def add_jpeg(self, arcname: str, data: bytes, on_written=None):
+        self._enqueue(arcname, self._pool.submit(self._save, arcname, data), on_written)
+
+    def call_when_written(self, callback):
+        """Runs `callback` once everything added so far is written."""
+        self._enqueue(None, _done(), callback)
+
+    def flush(self):
+        self._drain(wait_all=True)
+
+    def close(self):
+        """Writes the remaining frames and finalizes the archive; safe to call more than once."""
+        if self._zip.fp is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._zip.close()
+            self._pool.shutdown()
+        logger.info(f"📦 Stored {self.num_written} JPEGs in {self.zip_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
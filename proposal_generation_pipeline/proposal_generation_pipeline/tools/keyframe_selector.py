@@ -1,25 +1,92 @@
 import os
+import inspect
+import itertools
 
 import cv2
 import numpy as np
 import torch
 from rfdetr import RFDETRMedium
-from typing import List, Dict, Tuple, Optional
+from typing import Iterable, List, Dict, Tuple, Optional, Union
 import logging
 
+from .clip_video import ClipDescriptor
+from .frame_reader import clip_file_name, open_clip, read_clip_window
+from .feature_store import ClipFeatures, FeatureStore
+from .detector_backends import detector_id
+from .detector_registry import default_device, get_detector
+from .motion_estimators import MotionEstimator, build_motion_estimator
+
 logger = logging.getLogger(__name__)
 
 
+class _Scorecard:
+    """
+    Incrementally collected scores of one candidate window. With `keep_frames`, it holds on to the frames
+    of the candidates that can still be the argmax for non-negative weights: the Pareto frontier over
+    (motion, confidence, closeness to the middle frame). The z-normalized combined score is non-decreasing
+    in each of them, so a candidate that another one matches or beats on all three can never win.
+    """
+
+    def __init__(self, total_frames: int, keep_frames: bool = True):
+        self.total_frames = total_frames
+        self.keep_frames = keep_frames
+        self.indices: List[int] = []
+        self.confidence: List[float] = []
+        self.motion: List[float] = []
+        self.detections: List[List[Dict]] = []
+        self._frames: Dict[int, np.ndarray] = {}
+
+    def _key(self, pos: int) -> Tuple[float, float, int]:
+        return self.motion[pos], self.confidence[pos], -abs(self.indices[pos] - self.total_frames // 2)
+
+    def add(self, frame_idx: int, confidence: float, motion: float, detections: List[Dict],
+            frame: Optional[np.ndarray]):
+        pos = len(self.indices)
+        self.indices.append(int(frame_idx))
+        self.confidence.append(confidence)
+        self.motion.append(motion)
+        self.detections.append(detections)
+        if not self.keep_frames or frame is None:
+            return
+        key = self._key(pos)
+        # An earlier candidate that is at least as good everywhere also wins ties (np.argmax takes the first);
+        # an earlier one is only dropped when the new candidate beats it on all three scores.
+        if any(all(a >= b for a, b in zip(self._key(p), key)) for p in self._frames):
+            return
+        self._frames = {p: f for p, f in self._frames.items() if not all(a > b for a, b in zip(key, self._key(p)))}
+        self._frames[pos] = frame
+
+    def frame(self, pos: int) -> Optional[np.ndarray]:
+        return self._frames.get(pos)
+
+
 class KeyframeSelector:
     """
     Selects the best keyframe from a video clip based on a combined score of
     detector confidence and person-centric motion, with tie-breaker logic.
     """
 
-    def __init__(self, detection_model: RFDETRMedium, device: str, person_class_id: int = 1):
+    def __init__(self, detection_model: RFDETRMedium = None, device: str = None, person_class_id: int = 1,
+                 batch_size: int = 8, motion_estimator: Union[str, MotionEstimator] = "farneback",
+                 feature_store: FeatureStore = None, model_id: str = None, threshold: float = 0.5,
+                 detector_address: str = None):
+        self.device = device or default_device()
+        if detection_model is None:
+            # No model given: use the process-wide `model_id` instance from tools/detector_registry.py (a model
+            # name or an exported .onnx file), or a client of the detection server at `detector_address`.
+            model_id = model_id or "RFDETRMedium"
+            detection_model = get_detector(model_id, self.device, threshold, address=detector_address)
         self.model = detection_model
         self.person_class_id = person_class_id
-        self.device = device
+        # Number of candidate frames sent to the detector in a single forward pass.
+        self.batch_size = max(1, batch_size)
+        # One of tools.motion_estimators.MOTION_ESTIMATORS, or an estimator instance.
+        self.motion_estimator = build_motion_estimator(motion_estimator)
+        self.threshold = threshold
+        # Optional FeatureStore; detections are stored per (clip content, `model_id`, threshold).
+        self.feature_store = feature_store
+        self.model_id = (detector_id(model_id) if model_id else
+                         getattr(detection_model, "feature_store_id", None) or type(detection_model).__name__)
 
     def _z_normalize(self, scores: List[float]) -> np.ndarray:
         """Applies z-score normalization to a list of scores."""
@@ -30,79 +97,262 @@ class KeyframeSelector:
             return np.zeros_like(scores_arr)
         return (scores_arr - mean) / std
 
+    def _predict_batched(self, frames_rgb: List[np.ndarray], threshold: float = 0.5) -> List:
+        """
+        Runs the detector over the frames in micro-batches of `batch_size` and returns one
+        detections object per frame, in input order.
+        """
+        all_detections = []
+        for start in range(0, len(frames_rgb), self.batch_size):
+            batch = frames_rgb[start:start + self.batch_size]
+            if len(batch) == 1:
+                all_detections.append(self.model.predict(batch[0], threshold=threshold))
+                continue
+            dets = self.model.predict(batch, threshold=threshold)
+            all_detections.extend(dets if isinstance(dets, list) else [dets])
+        return all_detections
+
+    @staticmethod
+    def default_selection_params() -> Dict:
+        """Default window, stride and score weights of select_best_keyframe (used in stage-cache keys)."""
+        params = inspect.signature(KeyframeSelector.select_best_keyframe).parameters
+        return {name: p.default for name, p in params.items() if p.default is not inspect.Parameter.empty}
+
+    @staticmethod
+    def plan_candidates(
+            total_frames: int,
+            fps: float,
+            center_window_secs: Optional[float] = 4.0,
+            candidate_stride: int = 3
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Returns the candidate frame indices of the centre window and the middle frame index.
+        `center_window_secs=None` makes the whole clip the window.
+        """
+        middle_frame = total_frames // 2
+        if center_window_secs is None:
+            return np.array(range(0, total_frames, candidate_stride)), middle_frame
+        window_half_frames = int(center_window_secs / 2 * fps)
+        start_frame = max(0, middle_frame - window_half_frames)
+        end_frame = min(total_frames, middle_frame + window_half_frames)
+        return np.array(range(start_frame, end_frame, candidate_stride)), middle_frame
+
     def select_best_keyframe(
             self,
-            video_path: str,
+            video_path: Union[str, ClipDescriptor],
             center_window_secs: float = 4.0,
             candidate_stride: int = 3,
             w_motion: float = 0.7,
             w_confidence: float = 0.3
     ) -> Optional[Tuple[np.ndarray, int, List[Dict]]]:
         """
-        Analyzes a window of frames in a video and returns the best one.
+        Analyzes a window of frames in a video (a clip file or a ClipDescriptor) and returns the best one.
+        Frame indices are relative to the start of the clip.
+
+        With a feature store, a window whose detections and motion are all stored is ranked without
+        decoding it; only the winning frame is read back.
+        """
+        results = self._select_top(video_path, center_window_secs, candidate_stride, w_motion, w_confidence)
+        return results[0] if results else None
+
+    def select_keyframes(
+            self,
+            video_path: Union[str, ClipDescriptor],
+            k: int = 3,
+            min_gap_secs: float = 3.0,
+            candidate_stride: int = 3,
+            w_motion: float = 0.7,
+            w_confidence: float = 0.3
+    ) -> List[Tuple[np.ndarray, int, List[Dict]]]:
+        """
+        Scores every `candidate_stride`-th frame of the whole clip in one pass and returns up to `k` keyframes,
+        best first, no two closer than `min_gap_secs` (temporal non-maximum suppression on the combined score).
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
+        return self._select_top(video_path, None, candidate_stride, w_motion, w_confidence, k, min_gap_secs) or []
+
+    def select_clip_keyframes(self, video_path: Union[str, ClipDescriptor], keyframes_per_clip: int = 1,
+                              min_gap_secs: float = 3.0) -> List[Tuple[np.ndarray, int, List[Dict]]]:
+        """The single best keyframe of the centre window, or select_keyframes() when more are requested."""
+        if keyframes_per_clip > 1:
+            return self.select_keyframes(video_path, keyframes_per_clip, min_gap_secs)
+        result = self.select_best_keyframe(video_path)
+        return [result] if result is not None else []
+
+    def _select_top(self, video_path, center_window_secs, candidate_stride, w_motion, w_confidence, k=1,
+                    min_gap_secs=0.0) -> Optional[List[Tuple[np.ndarray, int, List[Dict]]]]:
+        cap, clip_start, total_frames, fps = open_clip(video_path)
+        if cap is None:
             logger.error(f"Cannot open video: {video_path}")
             return None
-
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
         if fps == 0: fps = 30
+        min_gap_frames = int(round(min_gap_secs * fps))
 
-        middle_frame = total_frames // 2
-        window_half_frames = int(center_window_secs / 2 * fps)
-        start_frame = max(0, middle_frame - window_half_frames)
-        end_frame = min(total_frames, middle_frame + window_half_frames)
-
-        candidate_indices = np.array(range(start_frame, end_frame, candidate_stride))
+        candidate_indices, _ = self.plan_candidates(total_frames, fps, center_window_secs, candidate_stride)
         if candidate_indices.size == 0:
             logger.warning(f"No candidate frames found for video {video_path}")
             cap.release()
             return None
 
-        candidate_frames_rgb, all_detections = [], []
-        for frame_idx in candidate_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                candidate_frames_rgb.append(frame_rgb)
-                dets = self.model.predict(frame_rgb, threshold=0.5)
-                all_detections.append(dets)
-        cap.release()
-
-        if not candidate_frames_rgb: return None
-
-        confidence_scores, motion_scores = [], []
-        prev_gray = None
-        for i, (frame_rgb, dets) in enumerate(zip(candidate_frames_rgb, all_detections)):
-            person_mask = np.zeros(0, dtype=bool)
-            if hasattr(dets, 'class_id') and dets.class_id is not None:
-                person_mask = (dets.class_id == self.person_class_id)
-                score = dets.confidence[person_mask].sum().item() if hasattr(dets,
-                                                                             'confidence') and person_mask.any() else 0
-            else:
-                score = 0
-            confidence_scores.append(score)
-
-            gray = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2GRAY)
-            motion_score = 0
-            if prev_gray is not None:
-                flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
-                mag, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-
-                if hasattr(dets, 'xyxy') and dets.xyxy is not None and person_mask.any():
-                    # --- FIX IS HERE ---
-                    # The .cpu() call is removed as dets.xyxy is already a numpy array
-                    person_boxes = dets.xyxy[person_mask].astype(int)
-                    for x1, y1, x2, y2 in person_boxes:
-                        box_mag = mag[y1:y2, x1:x2]
-                        if box_mag.size > 0: motion_score += box_mag.mean()
-
-            motion_scores.append(motion_score)
-            prev_gray = gray
+        features, clip_hash = None, None
+        try:
+            if self.feature_store is not None:
+                clip_hash = self.feature_store.clip_hash(video_path)
+                features = self.feature_store.load(clip_hash, self.model_id, self.threshold)
+                scorecard = _Scorecard(total_frames, keep_frames=False)
+                if self._score_stream(((int(idx), None) for idx in candidate_indices), scorecard, features):
+                    results = self._collect_winners(scorecard, cap, clip_start, clip_file_name(video_path), w_motion,
+                                                    w_confidence, k, min_gap_frames)
+                    if results:
+                        return results
+
+            # Frames are decoded lazily while they are scored, so only the current micro-batch, the previous
+            # grayscale frame and the frames that can still win are held in memory.
+            scorecard = _Scorecard(total_frames, keep_frames=k == 1 and w_motion >= 0 and w_confidence >= 0)
+            candidates = read_clip_window(cap, clip_start, int(candidate_indices[0]), int(candidate_indices[-1]) + 1,
+                                          candidate_stride)
+            self._score_stream(candidates, scorecard, features)
+            if features is not None:
+                self.feature_store.save(clip_hash, self.model_id, self.threshold, features)
+            return self._collect_winners(scorecard, cap, clip_start, clip_file_name(video_path), w_motion,
+                                         w_confidence, k, min_gap_frames)
+        finally:
+            cap.release()
+
+    def _collect_winners(self, scorecard, cap, clip_start, video_name, w_motion, w_confidence, k=1, min_gap_frames=0):
+        """Ranks a scorecard and returns the winning keyframes; frames it did not keep are read back from `cap`."""
+        if not scorecard.indices:
+            return None
+        winners = self._rank(np.array(scorecard.indices), scorecard.total_frames, scorecard.confidence,
+                             scorecard.motion, video_name, w_motion, w_confidence, k, min_gap_frames)
+        results = []
+        for pos in winners:
+            frame_idx = scorecard.indices[pos]
+            frame = scorecard.frame(pos)
+            if frame is None:
+                frames = list(read_clip_window(cap, clip_start, frame_idx, frame_idx + 1))
+                if not frames:
+                    logger.warning(f"Could not read back keyframe {frame_idx} of {video_name}")
+                    return None
+                frame = frames[0][1]
+            results.append((frame, frame_idx, scorecard.detections[pos]))
+        return results or None
+
+    def _person_scores(self, dets) -> Tuple[float, Optional[np.ndarray]]:
+        """Summed person confidence of one frame's detections and its person boxes (None without persons)."""
+        if not (hasattr(dets, 'class_id') and dets.class_id is not None):
+            return 0, None
+        person_mask = (dets.class_id == self.person_class_id)
+        score = dets.confidence[person_mask].sum().item() if hasattr(dets, 'confidence') and person_mask.any() else 0
+        person_boxes = None
+        if hasattr(dets, 'xyxy') and dets.xyxy is not None and person_mask.any():
+            # The .cpu() call is removed as dets.xyxy is already a numpy array
+            person_boxes = dets.xyxy[person_mask].astype(int)
+        return score, person_boxes
+
+    def _score_stream(self, candidates: Iterable[Tuple[int, Optional[np.ndarray]]], scorecard: "_Scorecard",
+                      features: Optional[ClipFeatures] = None) -> bool:
+        """
+        Scores `(frame_idx, frame_bgr)` candidates in micro-batches of `batch_size` and adds them to
+        `scorecard`; only the previous grayscale frame is carried from one candidate to the next. Stored
+        features are used where available and new ones are added to `features`. `frame_bgr` may be None
+        for candidates whose features are all stored; returns False as soon as a missing one is needed.
+        """
+        estimator_id = self.motion_estimator.cache_id
+        candidates = iter(candidates)
+        prev_idx, prev_gray = None, None
+        while True:
+            batch = list(itertools.islice(candidates, self.batch_size))
+            if not batch:
+                return True
+            detections = [features.detections(idx) if features is not None else None for idx, _ in batch]
+            missing = [i for i, dets in enumerate(detections) if dets is None]
+            if missing:
+                if any(batch[i][1] is None for i in missing):
+                    return False
+                frames_rgb = [cv2.cvtColor(batch[i][1], cv2.COLOR_BGR2RGB) for i in missing]
+                for i, dets in zip(missing, self._predict_batched(frames_rgb, threshold=self.threshold)):
+                    detections[i] = dets
+                    if features is not None:
+                        features.add_detections(batch[i][0], dets)
+
+            for (frame_idx, frame), dets in zip(batch, detections):
+                confidence, person_boxes = self._person_scores(dets)
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame is not None else None
+                motion_score = 0
+                if prev_idx is not None and person_boxes is not None:
+                    box_motion = None
+                    if features is not None:
+                        box_motion = features.box_motion(estimator_id, frame_idx, prev_idx)
+                    if box_motion is None:
+                        if gray is None or prev_gray is None:
+                            return False
+                        box_motion = self.motion_estimator.box_scores(prev_gray, gray, person_boxes)
+                        if features is not None:
+                            features.add_box_motion(estimator_id, frame_idx, prev_idx, box_motion)
+                    motion_score = float(np.sum(box_motion))
+                scorecard.add(frame_idx, confidence, motion_score, self._format_detections(dets), frame)
+                prev_idx, prev_gray = frame_idx, gray
+
+    def select_from_frames(
+            self,
+            candidates: List[Tuple[int, np.ndarray]],
+            total_frames: int,
+            video_name: str = "",
+            w_motion: float = 0.7,
+            w_confidence: float = 0.3,
+            features: Optional[ClipFeatures] = None
+    ) -> Optional[Tuple[np.ndarray, int, List[Dict]]]:
+        """
+        Scores already-decoded `(frame_idx, frame_bgr)` candidates and returns the best one.
+        Used directly by the streaming ingest, which never writes the clip to disk.
+        """
+        results = self._select_top_from_frames(candidates, total_frames, video_name, w_motion, w_confidence, features)
+        return results[0] if results else None
+
+    def select_keyframes_from_frames(
+            self,
+            candidates: List[Tuple[int, np.ndarray]],
+            total_frames: int,
+            k: int,
+            min_gap_frames: int,
+            video_name: str = "",
+            w_motion: float = 0.7,
+            w_confidence: float = 0.3
+    ) -> List[Tuple[np.ndarray, int, List[Dict]]]:
+        """select_keyframes() for already-decoded candidates (the whole clip, for the streaming ingest)."""
+        return self._select_top_from_frames(candidates, total_frames, video_name, w_motion, w_confidence, None, k,
+                                            min_gap_frames) or []
+
+    def _select_top_from_frames(self, candidates, total_frames, video_name, w_motion, w_confidence, features=None,
+                                k=1, min_gap_frames=0) -> Optional[List[Tuple[np.ndarray, int, List[Dict]]]]:
+        if not candidates: return None
+
+        # The candidates are already in memory, so the scorecard does not need to keep frames of its own.
+        scorecard = _Scorecard(total_frames, keep_frames=False)
+        self._score_stream(candidates, scorecard, features)
+        winners = self._rank(np.array(scorecard.indices), total_frames, scorecard.confidence, scorecard.motion,
+                             video_name, w_motion, w_confidence, k, min_gap_frames)
+        if not winners:
+            return None
+        return [(candidates[pos][1], scorecard.indices[pos], scorecard.detections[pos]) for pos in winners]
 
+    def _rank(
+            self,
+            candidate_indices: np.ndarray,
+            total_frames: int,
+            confidence_scores: List[float],
+            motion_scores: List[float],
+            video_name: str = "",
+            w_motion: float = 0.7,
+            w_confidence: float = 0.3,
+            k: int = 1,
+            min_gap_frames: int = 0
+    ) -> List[int]:
+        """
+        Combines the normalized scores and returns the positions of the winning candidates, best first:
+        the argmax, then greedily the best remaining candidates at least `min_gap_frames` from every winner.
+        """
+        middle_frame = total_frames // 2
         norm_conf = self._z_normalize(confidence_scores)
         norm_motion = self._z_normalize(motion_scores)
 
@@ -114,21 +364,25 @@ class KeyframeSelector:
         final_scores = combined_scores + (tie_breaker_scores * 1e-6)
 
         if len(final_scores) == 0:
-            logger.warning(f"Could not compute scores for {video_path}")
-            return None
+            logger.warning(f"Could not compute scores for {video_name}")
+            return []
 
-        logger.debug(f"Video: {os.path.basename(video_path)}")
+        logger.debug(f"Video: {video_name}")
         logger.debug(f"Candidate Indices: {candidate_indices}")
         logger.debug(f"Confidence Scores (Normalized): {np.round(norm_conf, 2)}")
         logger.debug(f"Motion Scores (Normalized): {np.round(norm_motion, 2)}")
         logger.debug(f"Final Scores: {np.round(final_scores, 2)}")
 
-        best_idx = np.argmax(final_scores)
-
-        best_frame_image_bgr = cv2.cvtColor(candidate_frames_rgb[best_idx], cv2.COLOR_RGB2BGR)
-        best_frame_original_idx = candidate_indices[best_idx]
-        best_dets = all_detections[best_idx]
+        # A stable sort keeps np.argmax's first-wins tie breaking for the top pick.
+        winners = []
+        for pos in np.argsort(-final_scores, kind="stable"):
+            if all(abs(int(candidate_indices[pos]) - int(candidate_indices[w])) >= min_gap_frames for w in winners):
+                winners.append(int(pos))
+                if len(winners) == k:
+                    break
+        return winners
 
+    def _format_detections(self, best_dets) -> List[Dict]:
         final_detections = []
         if hasattr(best_dets, 'xyxy') and best_dets.xyxy is not None:
             person_mask = (best_dets.class_id == self.person_class_id)
@@ -136,4 +390,4 @@ class KeyframeSelector:
                 for i, (box, conf) in enumerate(zip(best_dets.xyxy[person_mask], best_dets.confidence[person_mask])):
                     final_detections.append({"track_id": i + 1, "bbox": [c.item() for c in box]})
 
-        return best_frame_image_bgr, best_frame_original_idx, final_detections
\ No newline at end of file
+        return final_detections
@@ -0,0 +1,108 @@
+# tools/keyframe_workers.py
+
+# Process-pool keyframe selection for orchestrator Stage 4. Each worker loads RF-DETR once in its
+# initializer (through the per-process detector registry); results are streamed back in submission order so outputs are written deterministically.
+
+import os
+import logging
+import multiprocessing
+
+import cv2
+import torch
+
+from .clip_video import ClipDescriptor
+from .feature_store import FeatureStore
+from .keyframe_selector import KeyframeSelector
+from .stream_ingest import iter_video_keyframes
+
+logger = logging.getLogger(__name__)
+
+# Per-process selector, created by init_worker().
+_selector = None
+
+
+def threads_per_worker(workers):
+    """Splits the machine's cores evenly between workers so torch/OpenCV do not oversubscribe them."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def init_worker(device, num_threads, detect_batch_size=8, motion_estimator="farneback", feature_store_dir=None,
+                detector_address=None, detector_model="RFDETRMedium"):
+    global _selector
+    torch.set_num_threads(num_threads)
+    cv2.setNumThreads(num_threads)
+    feature_store = FeatureStore(feature_store_dir) if feature_store_dir else None
+    _selector = KeyframeSelector(device=device, person_class_id=1,
+                                 batch_size=detect_batch_size, motion_estimator=motion_estimator,
+                                 feature_store=feature_store, model_id=detector_model,
+                                 detector_address=detector_address)
+    logger.info(f"Keyframe worker {os.getpid()} ready ({num_threads} threads).")
+
+
+def _select_clip(job):
+    clip, keyframes_per_clip, min_gap_secs = job
+    return clip, _selector.select_clip_keyframes(clip, keyframes_per_clip, min_gap_secs)
+
+
+def _stream_video(job):
+    return list(iter_video_keyframes(_selector, *job))
+
+
+def _pool(workers, device, detect_batch_size, motion_estimator, feature_store_dir=None, detector_address=None,
+          detector_model="RFDETRMedium"):
+    # 'spawn' keeps CUDA and the parent's OpenCV/torch thread pools out of the children.
+    ctx = multiprocessing.get_context("spawn")
+    initargs = (device, threads_per_worker(workers), detect_batch_size, motion_estimator, feature_store_dir,
+                detector_address, detector_model)
+    return ctx.Pool(processes=workers, initializer=init_worker, initargs=initargs)
+
+
+def _run_pool(func, jobs, workers, device, detect_batch_size, motion_estimator, feature_store_dir=None,
+              detector_address=None, detector_model="RFDETRMedium"):
+    with _pool(workers, device, detect_batch_size, motion_estimator, feature_store_dir, detector_address,
+               detector_model) as pool:
+        # imap (not imap_unordered) yields in job order whatever order the workers finish in.
+        yield from pool.imap(func, jobs, chunksize=1)
+
+
+def select_keyframes_parallel(clips, workers, device, detect_batch_size=8, motion_estimator="farneback",
+                              feature_store_dir=None, keyframes_per_clip=1, min_gap_secs=3.0, detector_address=None,
+                              detector_model="RFDETRMedium"):
+    """
+    Yields `(clip, results)` for every clip, in the order of `clips`, where `results` is the list returned by
+    KeyframeSelector.select_clip_keyframes. A clip is a clip file path or a ClipDescriptor (both pickle cheaply).
+    With `detector_address`, the workers share the detection server there instead of loading RF-DETR each.
+    `detector_model` may be an exported .onnx file, run by each worker on its share of the CPU cores.
+    """
+    jobs = [(c if isinstance(c, ClipDescriptor) else str(c), keyframes_per_clip, min_gap_secs) for c in clips]
+    yield from _run_pool(_select_clip, jobs, workers, device, detect_batch_size, motion_estimator, feature_store_dir,
+                         detector_address, detector_model)
+
+
+class StreamingVideoPool:
+    """
+    Streaming-mode counterpart, fed one video at a time by the caller's thread: submit() takes a job
+    `(video_path, basename, clips_output_dir, keyframes_per_clip, min_gap_secs)` and returns a handle whose
+    `get()` is the list of `(clip_stem, results)` of that video. Jobs are plain tuples, so nothing of the
+    caller's state is touched by the pool's threads; the caller decides when to wait for which video.
+    """
+
+    def __init__(self, workers, device, detect_batch_size=8, motion_estimator="farneback", detector_address=None,
+                 detector_model="RFDETRMedium"):
+        self._pool = _pool(workers, device, detect_batch_size, motion_estimator, detector_address=detector_address,
+                           detector_model=detector_model)
+
+    def submit(self, job):
+        return self._pool.apply_async(_stream_video, (job,))
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self._pool.terminate()
+        self.close()
@@ -0,0 +1,147 @@
+# tools/motion_estimators.py
+
+# Person-centric motion scores used by KeyframeSelector. Every estimator returns the mean motion magnitude
+# inside each person box of the current frame (box_scores); a frame's score is their sum.
+
+import cv2
+import numpy as np
+
+# Part of every cache_id; bumped when box scores change for the same frames (v2: boxes clipped to the frame).
+BOX_SCORES_VERSION = "v2"
+
+
+class MotionEstimator:
+    """Base class: scores motion between two grayscale frames inside the given person boxes."""
+
+    name = "base"
+
+    @property
+    def cache_id(self) -> str:
+        """Identifies the estimator and its parameters in the feature store."""
+        return f"{self.name}_{BOX_SCORES_VERSION}"
+
+    def box_scores(self, prev_gray: np.ndarray, gray: np.ndarray, person_boxes: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def score(self, prev_gray: np.ndarray, gray: np.ndarray, person_boxes: np.ndarray) -> float:
+        return float(self.box_scores(prev_gray, gray, person_boxes).sum())
+
+    @staticmethod
+    def _box_means(magnitude: np.ndarray, person_boxes: np.ndarray) -> np.ndarray:
+        # Boxes may reach past the frame edges; clipping them keeps a negative corner from wrapping around
+        # as a slice index, so every estimator averages over the in-frame part of the box.
+        h, w = magnitude.shape[:2]
+        means = np.zeros(len(person_boxes), dtype=np.float64)
+        for i, (x1, y1, x2, y2) in enumerate(np.clip(person_boxes, 0, [w, h, w, h])):
+            box_mag = magnitude[y1:y2, x1:x2]
+            if box_mag.size > 0: means[i] = box_mag.mean()
+        return means
+
+
+class FarnebackMotion(MotionEstimator):
+    """
+    Dense Farneback flow. `pyr_level=0` is the original full-resolution estimator; each extra level
+    halves the frame with cv2.pyrDown before computing flow, and magnitudes are scaled back to pixels.
+    """
+
+    name = "farneback"
+
+    def __init__(self, pyr_level: int = 0):
+        self.pyr_level = pyr_level
+
+    @property
+    def cache_id(self):
+        return f"{self.name}_pyr{self.pyr_level}_{BOX_SCORES_VERSION}"
+
+    def _flow_magnitude(self, prev_gray, gray):
+        flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+        mag, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+        return mag
+
+    def box_scores(self, prev_gray, gray, person_boxes):
+        if len(person_boxes) == 0:
+            return np.zeros(0)
+        for _ in range(self.pyr_level):
+            prev_gray, gray = cv2.pyrDown(prev_gray), cv2.pyrDown(gray)
+        scale = 2 ** self.pyr_level
+        mag = self._flow_magnitude(prev_gray, gray) * scale
+        return self._box_means(mag, person_boxes // scale)
+
+
+class DISMotion(FarnebackMotion):
+    """OpenCV's DIS optical flow (ULTRAFAST preset by default), optionally on a pyramid level."""
+
+    name = "dis"
+
+    def __init__(self, pyr_level: int = 0, preset: int = cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST):
+        super().__init__(pyr_level)
+        self.preset = preset
+        self._dis = cv2.DISOpticalFlow_create(preset)
+
+    @property
+    def cache_id(self):
+        return f"{self.name}_pyr{self.pyr_level}_preset{self.preset}_{BOX_SCORES_VERSION}"
+
+    def _flow_magnitude(self, prev_gray, gray):
+        flow = self._dis.calc(prev_gray, gray, None)
+        mag, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+        return mag
+
+
+class ROIFarnebackMotion(FarnebackMotion):
+    """
+    Farneback flow computed only inside the bounding rectangle of all person boxes, grown by
+    `margin` pixels so the flow window still sees some context around the people.
+    """
+
+    name = "roi_farneback"
+
+    def __init__(self, margin: int = 16):
+        super().__init__(pyr_level=0)
+        self.margin = margin
+
+    @property
+    def cache_id(self):
+        return f"{self.name}_margin{self.margin}_{BOX_SCORES_VERSION}"
+
+    def box_scores(self, prev_gray, gray, person_boxes):
+        if len(person_boxes) == 0:
+            return np.zeros(0)
+        h, w = gray.shape[:2]
+        x1 = max(0, int(person_boxes[:, 0].min()) - self.margin)
+        y1 = max(0, int(person_boxes[:, 1].min()) - self.margin)
+        x2 = min(w, int(person_boxes[:, 2].max()) + self.margin)
+        y2 = min(h, int(person_boxes[:, 3].max()) + self.margin)
+        if x2 <= x1 or y2 <= y1:
+            return np.zeros(len(person_boxes))
+        mag = self._flow_magnitude(prev_gray[y1:y2, x1:x2], gray[y1:y2, x1:x2])
+        # Boxes are clipped to the frame first so the shift into ROI coordinates stays non-negative.
+        boxes = np.clip(person_boxes, 0, [w, h, w, h]) - np.array([x1, y1, x1, y1])
+        return self._box_means(mag, boxes)
+
+
+class FrameDiffMotion(MotionEstimator):
+    """Mean absolute grayscale difference inside each box; no optical flow at all."""
+
+    name = "frame_diff"
+
+    def box_scores(self, prev_gray, gray, person_boxes):
+        return self._box_means(cv2.absdiff(prev_gray, gray), person_boxes)
+
+
+MOTION_ESTIMATORS = {
+    "farneback": lambda: FarnebackMotion(pyr_level=0),
+    "farneback_pyr": lambda: FarnebackMotion(pyr_level=2),
+    "dis": lambda: DISMotion(),
+    "roi_farneback": lambda: ROIFarnebackMotion(),
+    "frame_diff": lambda: FrameDiffMotion(),
+}
+
+
+def build_motion_estimator(estimator="farneback") -> MotionEstimator:
+    """Returns `estimator` unchanged if it already is a MotionEstimator, otherwise builds it by name."""
+    if isinstance(estimator, MotionEstimator):
+        return estimator
+    if estimator not in MOTION_ESTIMATORS:
+        raise ValueError(f"Unknown motion estimator '{estimator}'. Choose from {sorted(MOTION_ESTIMATORS)}.")
+    return MOTION_ESTIMATORS[estimator]()
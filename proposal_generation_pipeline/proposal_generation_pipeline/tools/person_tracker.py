@@ -3,32 +3,71 @@ import cv2
 import json
 import torch
 import numpy as np
-from rfdetr import RFDETRMedium
 from tqdm import tqdm
 import logging
+import argparse
 from argparse import Namespace
+from pathlib import Path
 
 # Note: The original byte_tracker might be overkill if you only process one frame,
 # but we keep it for consistency in generating track IDs.
 from .byte_tracker import BYTETracker
+from .detector_registry import default_device, get_detector
+from .frame_reader import clip_name, clip_file_name, open_clip, read_clip_window
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+class JsonArrayWriter:
+    """
+    Writes a JSON array one element at a time, so a long clip's proposals never have to be held in
+    memory. The file is a valid JSON array (as json.load() expects) once the writer is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w")
+        self._file.write("[")
+
+    def write(self, entry):
+        self._file.write(",\n  " if self.count else "\n  ")
+        self._file.write(json.dumps(entry))
+        self.count += 1
+
+    def close(self):
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class PersonTracker:
-    def __init__(self, video_id: str, conf=0.5, person_class_id=0):  # COCO person_class_id is 0
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = RFDETRMedium(device=self.device)
-        self.model.optimize_for_inference()
+    def __init__(self, video_id: str, conf=0.5, person_class_id=0, model_name="RFDETRMedium",
+                 detector_address=None, detection_model=None):  # COCO person_class_id is 0
+        self.device = default_device()
+        # One optimized model per process, shared by every PersonTracker (see tools/detector_registry.py; a
+        # .onnx `model_name` runs on ONNX Runtime), a client of the detection server at `detector_address`
+        # (tools/detection_server.py), or any `detection_model` with RFDETRMedium's predict().
+        self.model = detection_model or get_detector(model_name, self.device, threshold=conf, optimize=True,
+                                                     address=detector_address)
         self.conf = conf
         self.person_class_id = person_class_id
         self.video_id = video_id
 
+        self.tracker = self._new_tracker()
+
+    @staticmethod
+    def _new_tracker(frame_rate=30):
         tracker_args = Namespace(
             track_thresh=0.5, track_buffer=30, match_thresh=0.8, mot20=False
         )
-        self.tracker = BYTETracker(tracker_args, frame_rate=30)
+        return BYTETracker(tracker_args, frame_rate=frame_rate)
 
     def _parse_detections(self, dets):
         # This helper function remains the same as your original
@@ -52,27 +91,26 @@ class PersonTracker:
 
         return np.hstack((person_boxes, person_scores[:, np.newaxis]))
 
-    def process_single_keyframe(self, video_path: str, output_json_dir: str, output_frame_dir: str) -> dict:
+    def process_single_keyframe(self, video_path, output_json_dir: str, output_frame_dir: str) -> dict:
         """
-        NEW: Extracts only the middle frame of a video, runs detection and tracking on it,
-        saves the frame, and returns its metadata for the manifest.
+        NEW: Extracts only the middle frame of a video (a clip path or a ClipDescriptor), runs detection
+        and tracking on it, saves the frame, and returns its metadata for the manifest.
         """
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
+        cap, clip_start, total_frames, _ = open_clip(video_path)
+        if cap is None:
             logger.error(f"Cannot open video: {video_path}")
             return None
 
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         middle_frame_idx = total_frames // 2
 
         # Seek to the middle frame
-        cap.set(cv2.CAP_PROP_POS_FRAMES, middle_frame_idx)
-        ret, frame = cap.read()
+        window = list(read_clip_window(cap, clip_start, middle_frame_idx, middle_frame_idx + 1))
         cap.release()
 
-        if not ret:
+        if not window:
             logger.error(f"Could not read middle frame from {video_path}")
             return None
+        _, frame = window[0]
 
         # --- Run detection and tracking on this single frame ---
         raw_detections = self.model.predict(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), threshold=self.conf)
@@ -105,6 +143,100 @@ class PersonTracker:
         # Return metadata for the manifest file
         return {
             "keyframe_name": keyframe_name,
-            "source_video": os.path.basename(video_path),
+            "source_video": clip_file_name(video_path),
             "source_frame": middle_frame_idx
-        }
\ No newline at end of file
+        }
+
+    def track_clip(self, video, detect_every: int = 1):
+        """
+        Streams person tracks over a whole clip (a clip path or a ClipDescriptor), decoding it once.
+
+        RF-DETR runs on every `detect_every`-th frame; on the frames in between the Kalman filter only
+        propagates the tracks. Starts a fresh tracker for the clip and yields `(frame_idx, frame, tracks)`
+        per frame, with tracks as `{"track_id", "bbox": [x1, y1, x2, y2], "score"}` dicts.
+        """
+        cap, clip_start, total_frames, fps = open_clip(video)
+        if cap is None:
+            logger.error(f"Cannot open video: {video}")
+            return
+
+        self.tracker = self._new_tracker(frame_rate=round(fps) or 30)
+        try:
+            for frame_idx, frame in read_clip_window(cap, clip_start, 0, total_frames):
+                if frame_idx % detect_every == 0:
+                    raw_detections = self.model.predict(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), threshold=self.conf)
+                    frame_shape = [frame.shape[0], frame.shape[1]]
+                    online_tracks = self.tracker.update(self._parse_detections(raw_detections), frame_shape, frame_shape)
+                else:
+                    online_tracks = self.tracker.predict()
+                yield frame_idx, frame, [{
+                    "track_id": int(track.track_id),
+                    "bbox": [float(c) for c in track.tlbr],
+                    "score": float(track.score)
+                } for track in online_tracks]
+        finally:
+            cap.release()
+
+    def process_clip_tracks(self, video, output_json_dir: str, output_frame_dir: str = None,
+                            detect_every: int = 5) -> dict:
+        """
+        Tracks people through a whole clip and writes the tracks of the first frame of every second to
+        `{video_id}.json` as they are produced, in the per-frame format dense_proposals_train.py's
+        generate_dense_proposals() reads (`{video_id}_frame_{idx:04d}.jpg` frame names, pixel boxes, scores)
+        plus the track ID. Memory use does not depend on the clip length. With `output_frame_dir`, the
+        per-second frames are saved there too. Choose `detect_every` as a divisor of the frame rate so that
+        these frames are detector frames rather than Kalman-propagated ones. Returns None if the clip cannot
+        be opened.
+        """
+        cap, _, total_frames, fps = open_clip(video)
+        if cap is None:
+            logger.error(f"Cannot open video: {video}")
+            return None
+        cap.release()
+        frames_per_second = max(1, round(fps))
+        json_output_path = os.path.join(output_json_dir, f"{self.video_id}.json")
+        num_seconds = 0
+
+        with JsonArrayWriter(json_output_path) as writer:
+            for frame_idx, frame, tracks in tqdm(self.track_clip(video, detect_every), total=total_frames,
+                                                 desc=f"Tracking {self.video_id}", leave=False):
+                if frame_idx % frames_per_second:
+                    continue
+                num_seconds += 1
+                frame_name = f"{self.video_id}_frame_{frame_idx:04d}.jpg"
+                if output_frame_dir:
+                    cv2.imwrite(os.path.join(output_frame_dir, frame_name), frame)
+                for track in tracks:
+                    writer.write({"video_id": self.video_id, "frame": frame_name, **track})
+
+        logger.info(f"✅ Tracked {self.video_id}: {num_seconds} seconds, {writer.count} proposals.")
+        return {
+            "source_video": clip_file_name(video),
+            "json_path": json_output_path,
+            "num_seconds": num_seconds,
+            "num_proposals": writer.count
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Track people through whole clips and write per-second proposals.")
+    parser.add_argument("--clips_dir", required=True, help="Folder with clipped .mp4 videos.")
+    parser.add_argument("--output_json_dir", required=True, help="Folder for the per-clip proposal JSON files.")
+    parser.add_argument("--output_frame_dir", default=None, help="Optional folder for the per-second frames.")
+    parser.add_argument("--detect_every", type=int, default=5, help="Run the detector on every N-th frame.")
+    parser.add_argument("--conf", type=float, default=0.5, help="Detection confidence threshold.")
+    parser.add_argument("--model", default="RFDETRMedium",
+                        help="Detection model: RFDETRMedium or an exported .onnx file (tools/detector_backends.py).")
+    parser.add_argument("--detector_address", default=None,
+                        help="Use the detection server at this address instead of loading RF-DETR.")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_json_dir, exist_ok=True)
+    if args.output_frame_dir:
+        os.makedirs(args.output_frame_dir, exist_ok=True)
+
+    for clip_path in sorted(str(p) for p in Path(args.clips_dir).glob("*.mp4")):
+        # Cheap per clip: every PersonTracker shares the registry's model.
+        person_tracker = PersonTracker(video_id=clip_name(clip_path), conf=args.conf, model_name=args.model,
+                                       detector_address=args.detector_address)
+        person_tracker.process_clip_tracks(clip_path, args.output_json_dir, args.output_frame_dir, args.detect_every)
@@ -1,11 +1,14 @@
+# Run from the pipeline root:  python -m tools.proposals_to_via --help
+
 import os
-import pickle
 import argparse
 from collections import defaultdict
 import cv2
 from tqdm import tqdm
 import re
-from via3_tool import Via3Json  # Make sure via3_tool.py is in the same directory
+
+from .via3_tool import Via3Json
+from .proposals_store import load_proposals
 
 
 def create_via_file_for_video(video_id, frames_data, video_frame_path, attributes_dict):
@@ -43,7 +46,7 @@ def create_via_file_for_video(video_id, frames_data, video_frame_path, attribute
         detections = frames_data.get(frame_filename, [])
 
         for detection_idx, bbox_data in enumerate(detections, 1):
-            # ✨ FIX: The pkl file now stores raw absolute coordinates [x1, y1, x2, y2, score, track_id]
+            # ✨ FIX: The proposals file stores raw absolute coordinates [x1, y1, x2, y2, score, track_id]
             abs_x1, abs_y1, abs_x2, abs_y2 = bbox_data[0], bbox_data[1], bbox_data[2], bbox_data[3]
             track_id = bbox_data[5]
 
@@ -85,17 +88,16 @@ def create_via_file_for_video(video_id, frames_data, video_frame_path, attribute
 def main():
     parser = argparse.ArgumentParser(
         description="Create VIA JSON files with person_id from a frame-based dense proposal file.")
-    parser.add_argument('--pickle_path', type=str, required=True,
-                        help="Path to the frame-based dense_proposals.pkl file.")
+    parser.add_argument('--proposals_path', '--pickle_path', type=str, required=True,
+                        help="Path to the frame-based .proposals file (or a legacy dense_proposals.pkl).")
     parser.add_argument('--frame_dir', type=str, required=True,
                         help="Root directory containing extracted frame subdirectories.")
     args = parser.parse_args()
 
     try:
-        with open(args.pickle_path, 'rb') as f:
-            proposals_data = pickle.load(f)
+        proposals_data = load_proposals(args.proposals_path)
     except FileNotFoundError:
-        print(f"❌ Error: Pickle file not found at {args.pickle_path}")
+        print(f"❌ Error: Proposals file not found at {args.proposals_path}")
         return
 
     # Your 8 action attributes
@@ -1,64 +1,207 @@
 # tools/rename_resize.py
 
 import os
+import time
+import queue
+import threading
+import multiprocessing
 import cv2
 import argparse
+import numpy as np
 from pathlib import Path
 
-def resize_with_padding(frame, target_size=(1280, 720)):
-    h, w = frame.shape[:2]
+def _padded_layout(frame_shape, target_size):
+    h, w = frame_shape[:2]
     scale = min(target_size[0] / w, target_size[1] / h)
     new_w, new_h = int(w * scale), int(h * scale)
+    return new_w, new_h, (target_size[1] - new_h) // 2, (target_size[0] - new_w) // 2
+
+def resize_with_padding(frame, target_size=(1280, 720), canvas=None):
+    """
+    Letterboxes `frame` into `target_size`. With `canvas` (a zeroed target-size frame that is reused for
+    frames of the same size), the resized image is written straight into its centre instead of allocating
+    a new padded frame.
+    """
+    new_w, new_h, top, left = _padded_layout(frame.shape, target_size)
+    if canvas is not None:
+        cv2.resize(frame, (new_w, new_h), dst=canvas[top:top + new_h, left:left + new_w],
+                   interpolation=cv2.INTER_AREA)
+        return canvas
 
     resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
     padded = cv2.copyMakeBorder(
         resized,
-        top=(target_size[1] - new_h) // 2,
+        top=top,
         bottom=(target_size[1] - new_h + 1) // 2,
-        left=(target_size[0] - new_w) // 2,
+        left=left,
         right=(target_size[0] - new_w + 1) // 2,
         borderType=cv2.BORDER_CONSTANT,
         value=(0, 0, 0)
     )
     return padded
 
-def process_videos(input_dir, output_dir, target_size=(1280, 720)):
-    os.makedirs(output_dir, exist_ok=True)
+def filter_videos(file_names):
+    """Returns the video file names in the order that decides their `{idx}.mp4` name."""
     # Added '.mkv' to the list of recognized video formats
-    video_files = sorted([f for f in os.listdir(input_dir) if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))])
-
-    for idx, video_file in enumerate(video_files, 1):
-        input_path = os.path.join(input_dir, video_file)
-        # The output file will have a simple numbered name with the .mp4 extension
-        output_path = os.path.join(output_dir, f"{idx}.mp4")
+    return sorted([f for f in file_names if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))])
 
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
-            print(f" Failed to open {video_file}")
-            continue
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, target_size)
-
-        print(f" Processing: {video_file} -> {idx}.mp4")
+def list_videos(input_dir):
+    return filter_videos(os.listdir(input_dir))
 
+def _decode_frames(cap, outbox, busy, errors):
+    try:
         while True:
+            start = time.perf_counter()
             ret, frame = cap.read()
+            busy["decode_secs"] += time.perf_counter() - start
             if not ret:
                 break
-            resized_frame = resize_with_padding(frame, target_size)
-            out.write(resized_frame)
+            outbox.put(frame)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        outbox.put(None)
+
+def _run_stage(work, inbox, outbox, busy, errors, key):
+    """Thread body: applies `work` to every item of `inbox` until the None sentinel, timing the work."""
+    try:
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            start = time.perf_counter()
+            item = work(item)
+            busy[key] += time.perf_counter() - start
+            outbox.put(item)
+    except Exception as e:
+        errors.append(e)
+        # Keep draining so the upstream thread is never left blocked on a full queue.
+        while inbox.get() is not None:
+            pass
+    finally:
+        outbox.put(None)
+
+def resize_video(input_path, output_path, target_size=(1280, 720), queue_size=8, stats=None):
+    """
+    Resizes (with padding) one video to `output_path` as mp4v. Returns False if it cannot be opened.
+
+    Decoding, resizing and encoding run as a pipeline of three threads joined by bounded queues of
+    `queue_size` frames (OpenCV releases the GIL in all three). Resized frames are written into a ring of
+    preallocated canvases that the encoder hands back once a frame is written. When `stats` is a dict it
+    receives the frame count and the busy seconds of each stage.
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        return False
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, target_size)
+
+    # Every frame in flight (both queues + one per stage) owns a canvas, so none is overwritten early.
+    free_canvases = queue.Queue()
+    for _ in range(2 * queue_size + 3):
+        free_canvases.put(np.zeros((target_size[1], target_size[0], 3), dtype=np.uint8))
+    canvas_shape = {}
+
+    def resize(frame):
+        canvas = free_canvases.get()
+        if canvas_shape.get(id(canvas)) != frame.shape[:2]:
+            # A frame of a new size may leave a different border; clear it once.
+            canvas[:] = 0
+            canvas_shape[id(canvas)] = frame.shape[:2]
+        return resize_with_padding(frame, target_size, canvas)
+
+    busy = {"decode_secs": 0.0, "resize_secs": 0.0, "encode_secs": 0.0}
+    errors = []
+    decoded = queue.Queue(maxsize=queue_size)
+    resized = queue.Queue(maxsize=queue_size)
+
+    wall_start = time.perf_counter()
+    decoder = threading.Thread(target=_decode_frames, args=(cap, decoded, busy, errors), daemon=True)
+    resizer = threading.Thread(target=_run_stage, args=(resize, decoded, resized, busy, errors, "resize_secs"),
+                               daemon=True)
+    decoder.start()
+    resizer.start()
+
+    num_frames = 0
+    while True:
+        canvas = resized.get()
+        if canvas is None:
+            break
+        start = time.perf_counter()
+        out.write(canvas)
+        busy["encode_secs"] += time.perf_counter() - start
+        free_canvases.put(canvas)
+        num_frames += 1
+
+    decoder.join()
+    resizer.join()
+    cap.release()
+    out.release()
+    if errors:
+        raise errors[0]
+    if stats is not None:
+        stats.update(busy, frames=num_frames, wall_secs=time.perf_counter() - wall_start)
+    return True
+
+def format_throughput(stats):
+    """One-line per-stage throughput (frames per busy second) of a resize_video() stats dict."""
+    def rate(secs):
+        return f"{stats['frames'] / secs:.0f} fps" if secs > 0 else "n/a"
+    return (f"{stats['frames']} frames in {stats['wall_secs']:.1f}s | decode {rate(stats['decode_secs'])}, "
+            f"resize {rate(stats['resize_secs'])}, encode {rate(stats['encode_secs'])}")
+
+def _resize_job(job):
+    idx, input_path, output_path, target_size = job
+    stats = {}
+    ok = resize_video(input_path, output_path, target_size, stats=stats)
+    return idx, ok, stats
+
+def process_videos(input_dir, output_dir, target_size=(1280, 720), workers=1):
+    """
+    Resizes every video of `input_dir` to `{idx}.mp4` (idx from the sorted file list, so names do not
+    depend on which worker finishes first). With `workers` > 1, videos are processed in a process pool.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    video_files = list_videos(input_dir)
+    # The output file will have a simple numbered name with the .mp4 extension
+    jobs = [(idx, os.path.join(input_dir, video_file), os.path.join(output_dir, f"{idx}.mp4"), target_size)
+            for idx, video_file in enumerate(video_files, 1)]
+
+    totals = {"frames": 0, "decode_secs": 0.0, "resize_secs": 0.0, "encode_secs": 0.0}
+    wall_start = time.perf_counter()
+    if workers > 1:
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(processes=workers)
+        results = pool.imap(_resize_job, jobs)
+    else:
+        pool = None
+        results = map(_resize_job, jobs)
 
-        cap.release()
-        out.release()
+    try:
+        for idx, ok, stats in results:
+            video_file = video_files[idx - 1]
+            if not ok:
+                print(f" Failed to open {video_file}")
+                continue
+            print(f" Processed: {video_file} -> {idx}.mp4 ({format_throughput(stats)})")
+            for key in totals:
+                totals[key] += stats[key]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
+    totals["wall_secs"] = time.perf_counter() - wall_start
     print(f" Completed processing {len(video_files)} videos. Output saved to: {output_dir}")
+    print(f" Throughput: {format_throughput(totals)}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Rename and resize raw CCTV clips.")
     parser.add_argument("--input_dir", required=True, help="Folder with raw videos")
     parser.add_argument("--output_dir", default="raw_videos", help="Destination for renamed and resized videos")
+    parser.add_argument("--workers", type=int, default=1, help="Videos resized in parallel (one process each)")
     args = parser.parse_args()
 
-    process_videos(args.input_dir, args.output_dir)
\ No newline at end of file
+    process_videos(args.input_dir, args.output_dir, workers=args.workers)
\ No newline at end of file
@@ -0,0 +1,147 @@
+# tools/stage_cache.py
+
+# Persistent, content-addressed cache for the proposal pipeline stages. An entry is a directory
+# <cache_dir>/<stage>/<key>/ whose key hashes the content of the input video plus the stage parameters,
+# so renamed or re-uploaded videos still hit and any parameter change misses.
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_COMPLETE_MARKER = ".complete"
+# A staging directory whose writer still runs is only swept once it is this old (its pid may have been reused).
+_STALE_TMP_SECONDS = 24 * 3600
+
+_digests = {}
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # Alive, but owned by another user.
+        pass
+    return True
+
+
+def _stale_tmp_entry(tmp_entry: Path) -> bool:
+    """Whether a `<key>.tmp<pid>` staging directory was left by a run that is gone, so it will never be published."""
+    pid = tmp_entry.name.rpartition(".tmp")[2]
+    try:
+        age = time.time() - tmp_entry.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return not pid.isdigit() or not _process_alive(int(pid)) or age > _STALE_TMP_SECONDS
+
+
+def file_digest(path) -> str:
+    """SHA-256 of a file's content, memoised per (path, size, mtime) for the lifetime of the process."""
+    stat = os.stat(path)
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digests:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        _digests[memo_key] = sha.hexdigest()
+    return _digests[memo_key]
+
+
+class StageCache:
+    def __init__(self, cache_dir: str, read: bool = True):
+        """
+        `read=False` still stores every result (so a later --resume run can use them) but never
+        returns hits.
+        """
+        self.root = Path(cache_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.read = read
+
+    @staticmethod
+    def file_digest(path) -> str:
+        return file_digest(path)
+
+    @staticmethod
+    def key(stage: str, input_digest: str, params: Dict) -> str:
+        payload = json.dumps({"stage": stage, "input": input_digest, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, stage: str, key: str) -> Path:
+        return self.root / stage / key
+
+    def lookup(self, stage: str, key: str) -> Optional[Path]:
+        """Returns the entry directory of a complete entry, or None on a miss (or when reading is disabled)."""
+        if not self.read:
+            return None
+        entry = self._entry_dir(stage, key)
+        marker = entry / _COMPLETE_MARKER
+        if not marker.exists():
+            return None
+        marker.touch()  # Recency for LRU eviction.
+        return entry
+
+    def store(self, stage: str, key: str, files: Dict[str, str] = None, metadata: Dict = None) -> Path:
+        """
+        Copies `files` ({name_in_entry: source_path}) and an optional `metadata.json` into a new entry.
+        The entry only becomes visible once everything has been written.
+        """
+        entry = self._entry_dir(stage, key)
+        tmp_entry = entry.with_name(f"{key}.tmp{os.getpid()}")
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        tmp_entry.mkdir(parents=True)
+        for name, src in (files or {}).items():
+            shutil.copyfile(src, tmp_entry / name)
+        if metadata is not None:
+            with open(tmp_entry / "metadata.json", "w") as f:
+                json.dump(metadata, f)
+        (tmp_entry / _COMPLETE_MARKER).touch()
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+        return entry
+
+    @staticmethod
+    def read_metadata(entry: Path) -> Dict:
+        with open(entry / "metadata.json") as f:
+            return json.load(f)
+
+    def entries(self) -> List[Path]:
+        return [p.parent for p in self.root.glob(f"*/*/{_COMPLETE_MARKER}")]
+
+    @staticmethod
+    def entry_size(entry: Path) -> int:
+        return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+    def evict(self, max_bytes: int) -> int:
+        """Deletes least-recently-used entries until the cache fits in `max_bytes`. Returns bytes freed."""
+        entries = [(e, (e / _COMPLETE_MARKER).stat().st_mtime, self.entry_size(e)) for e in self.entries()]
+        total = sum(size for _, _, size in entries)
+        freed = 0
+        for entry, _, size in sorted(entries, key=lambda e: e[1]):
+            if total - freed <= max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            freed += size
+        # Half-written entries from crashed runs are never valid; those of runs still storing are left alone.
+        for tmp_entry in self.root.glob("*/*.tmp*"):
+            if _stale_tmp_entry(tmp_entry):
+                shutil.rmtree(tmp_entry, ignore_errors=True)
+        logger.info(f"🧹 Evicted {freed / 1e6:.1f} MB from stage cache; {(total - freed) / 1e6:.1f} MB remain.")
+        return freed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Evict least-recently-used entries from the pipeline stage cache.")
+    parser.add_argument("--cache_dir", required=True, help="Stage cache directory (e.g. outputs/.stage_cache).")
+    parser.add_argument("--max_size_gb", type=float, required=True, help="Size cap to evict down to, in GB.")
+    args = parser.parse_args()
+    StageCache(args.cache_dir).evict(int(args.max_size_gb * 1e9))
@@ -0,0 +1,114 @@
+# tools/stream_ingest.py
+
+# Single-decode ingest: reads each raw video once and hands the resized keyframe candidates of every
+# 15-second clip to the KeyframeSelector in memory, instead of writing resized videos and clip files.
+
+import os
+import cv2
+import logging
+
+from .rename_resize import resize_with_padding
+from .clip_video import plan_clip_ranges
+from .keyframe_selector import KeyframeSelector
+
+logger = logging.getLogger(__name__)
+
+
+def stream_clip_candidates(video_path, basename, target_size=(1280, 720), clip_duration=15,
+                           center_window_secs=4.0, candidate_stride=3, clips_output_dir=None):
+    """
+    Decodes `video_path` once and yields `(clip_name, candidates, total_frames, fps)` for every clip that
+    rename_resize + clip_video would have produced from it. `candidates` is the list of
+    `(frame_idx, frame_bgr)` pairs, indexed within the clip and already resized with padding, that
+    KeyframeSelector.select_best_keyframe would have read from the clip file (with `center_window_secs=None`,
+    every `candidate_stride`-th frame of the clip, as select_keyframes reads).
+
+    Frames outside every candidate window are only grabbed, never retrieved or resized. When
+    `clips_output_dir` is set, every clip is also written as `{basename}_clip_{i:03d}.mp4`.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        logger.error(f"Cannot open video: {video_path}")
+        return
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if fps <= 0:
+        logger.error(f"Video reports no frame rate, skipping: {video_path}")
+        cap.release()
+        return
+
+    clip_ranges = plan_clip_ranges(total_frames, fps, clip_duration)
+    logger.info(f"Streaming {os.path.basename(video_path)} -> {len(clip_ranges)} clips of '{basename}'")
+
+    frame_idx = 0
+    stream_ended = False
+    try:
+        for clip_idx, (start_frame, num_frames) in enumerate(clip_ranges):
+            if stream_ended:
+                break
+            clip_name = f"{basename}_clip_{clip_idx:03d}"
+            candidate_indices, _ = KeyframeSelector.plan_candidates(
+                num_frames, fps, center_window_secs, candidate_stride)
+            wanted = set((start_frame + candidate_indices).tolist())
+
+            writer = None
+            if clips_output_dir:
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                writer = cv2.VideoWriter(os.path.join(clips_output_dir, f"{clip_name}.mp4"), fourcc, fps,
+                                         target_size)
+                last_frame = start_frame + num_frames
+            else:
+                last_frame = max(wanted) + 1 if wanted else start_frame
+
+            # Frames between two clips (fractional fps) belong to no clip.
+            while frame_idx < start_frame:
+                if not cap.grab():
+                    stream_ended = True
+                    break
+                frame_idx += 1
+
+            candidates = []
+            while not stream_ended and frame_idx < last_frame:
+                if not cap.grab():
+                    stream_ended = True
+                    break
+                if writer is not None or frame_idx in wanted:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        frame = resize_with_padding(frame, target_size)
+                        if writer is not None:
+                            writer.write(frame)
+                        if frame_idx in wanted:
+                            candidates.append((frame_idx - start_frame, frame))
+                frame_idx += 1
+
+            if writer is not None:
+                writer.release()
+
+            clip_frames = num_frames
+            if stream_ended:
+                clip_frames = frame_idx - start_frame
+                logger.warning(f"{os.path.basename(video_path)} ended early; '{clip_name}' has {clip_frames} frames.")
+                if clip_frames <= 0:
+                    break
+            yield clip_name, candidates, clip_frames, fps
+    finally:
+        cap.release()
+
+
+def iter_video_keyframes(keyframe_selector, video_path, basename, clips_output_dir=None, keyframes_per_clip=1,
+                         min_gap_secs=3.0):
+    """
+    Yields `(clip_stem, results)` for every clip of one raw video, where `results` is the list of keyframes
+    KeyframeSelector.select_clip_keyframes would return for the clip file.
+    """
+    multi = keyframes_per_clip > 1
+    for clip_stem, candidates, total_frames, fps in stream_clip_candidates(
+            video_path, basename, center_window_secs=None if multi else 4.0, clips_output_dir=clips_output_dir):
+        if multi:
+            yield clip_stem, keyframe_selector.select_keyframes_from_frames(
+                candidates, total_frames, keyframes_per_clip, int(round(min_gap_secs * fps)), f"{clip_stem}.mp4")
+            continue
+        result = keyframe_selector.select_from_frames(candidates, total_frames, f"{clip_stem}.mp4")
+        yield clip_stem, [result] if result is not None else []
@@ -0,0 +1,62 @@
+# tools/sync_shared_modules.py
+
+# The processing pipeline reads what this pipeline writes (.proposals files, CVAT XML, image size indexes),
+# but the two run from different roots and neither can import the other, so processing_pipeline/services
+# holds generated copies of the modules involved. The files in tools/ are the only ones to edit; this
+# regenerates the copies, or checks that they are current (exit status 1 if not):
+#   python -m tools.sync_shared_modules
+#   python -m tools.sync_shared_modules --check
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TOOLS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = TOOLS_DIR.parents[2]
+SERVICES_DIR = REPO_ROOT / "processing_pipeline" / "services"
+SHARED_MODULES = ("proposals_store", "cvat_xml", "image_dims")
+
+
+def generated_copy(name: str) -> str:
+    """The services copy of tools/<name>.py: a generated-file header, then the source with its module paths
+    pointing at the services package."""
+    source = (TOOLS_DIR / f"{name}.py").read_text(encoding="utf-8")
+    header, body = source.split("\n", 1)
+    if header != f"# tools/{name}.py":
+        raise ValueError(f"tools/{name}.py must start with '# tools/{name}.py'.")
+    origin = (TOOLS_DIR / f"{name}.py").relative_to(REPO_ROOT).as_posix()
+    return (f"# services/{name}.py\n"
+            f"# Generated by `python -m tools.sync_shared_modules` from\n# {origin}; edit that file instead.\n"
+            + body.replace("python -m tools.", "python -m processing_pipeline.services."))
+
+
+def sync(check: bool = False) -> list:
+    """Rewrites (or with `check`, only compares) every copy; returns the names of the copies that differed."""
+    stale = []
+    for name in SHARED_MODULES:
+        copy_path = SERVICES_DIR / f"{name}.py"
+        expected = generated_copy(name)
+        if copy_path.exists() and copy_path.read_text(encoding="utf-8") == expected:
+            continue
+        stale.append(name)
+        if check:
+            logger.error(f"❌ {copy_path} differs from tools/{name}.py; run python -m tools.sync_shared_modules")
+        else:
+            copy_path.write_text(expected, encoding="utf-8")
+            logger.info(f"💾 Regenerated {copy_path}")
+    return stale
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Regenerate (or check) the services copies of shared tools modules.")
+    parser.add_argument("--check", action="store_true", help="Only report copies that are out of date.")
+    args = parser.parse_args()
+    stale = sync(check=args.check)
+    if args.check and stale:
+        sys.exit(1)
+    logger.info(f"✅ {len(SHARED_MODULES) - (len(stale) if args.check else 0)}/{len(SHARED_MODULES)} shared modules "
+                f"in sync.")
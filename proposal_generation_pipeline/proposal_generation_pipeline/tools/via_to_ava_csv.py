@@ -1,10 +1,23 @@
+# Run from the pipeline root:  python -m tools.via_to_ava_csv --frame_dir <frames> --output_csv train.csv
+
 import os
 import json
 import csv
+import heapq
 import argparse
+import tempfile
+import multiprocessing
 from tqdm import tqdm
 import re
 
+from .image_dims import ImageDimsIndex
+
+CSV_HEADER = ['video_id', 'frame_timestamp', 'x1', 'y1', 'x2', 'y2', 'action_id', 'person_id']
+# Rows sorted in memory before they are spilled to a run file.
+RUN_ROWS = 500000
+# Below this many files per worker, starting a pool costs more than the conversion it saves.
+MIN_FILES_PER_WORKER = 64
+
 
 def calculate_action_mapping(attributes):
     """
@@ -25,9 +38,10 @@ def calculate_action_mapping(attributes):
     return attribute_nums
 
 
-def process_via_file(json_path, frame_dir, action_id_map, fps):
+def process_via_file(json_path, frame_dir, action_id_map, fps, image_dims=None):
     """
     Processes a single finished VIA JSON file and returns a list of CSV rows.
+    `image_dims` is the ImageDimsIndex of `frame_dir` (frame sizes are read from it, not decoded).
     """
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
@@ -36,14 +50,13 @@ def process_via_file(json_path, frame_dir, action_id_map, fps):
         print(f"⚠️ Warning: Skipping corrupted or empty file: {json_path} ({e})")
         return []
     files = {f_data['fid']: f_data['fname'] for f_key, f_data in via_json.get('file', {}).items()}
+    if image_dims is None:
+        image_dims = ImageDimsIndex.load(frame_dir)
     try:
         first_fname = next(iter(files.values()))
         video_id = '_'.join(first_fname.split('_')[:-2])
-        img_path = os.path.join(frame_dir, video_id, first_fname)
-        import cv2
-        img = cv2.imread(img_path)
-        img_H, img_W = img.shape[:2]
-    except (StopIteration, AttributeError, FileNotFoundError):
+        img_W, img_H = image_dims.get(os.path.join(video_id, first_fname))
+    except (StopIteration, TypeError):
         print(f"⚠️ Warning: Could not read frames for {video_id} to get dimensions. Using 1280x720 as default.")
         img_H, img_W = 720, 1280
 
@@ -90,6 +103,78 @@ def process_via_file(json_path, frame_dir, action_id_map, fps):
     return csv_rows
 
 
+def _row_key(row):
+    return row[0], int(row[1])
+
+
+_worker_args = None
+
+
+def _init_worker(frame_dir, action_id_map, fps, dims):
+    global _worker_args
+    _worker_args = (frame_dir, action_id_map, fps, ImageDimsIndex(frame_dir, dims))
+
+
+def _process_file(json_path):
+    frame_dir, action_id_map, fps, image_dims = _worker_args
+    return process_via_file(json_path, frame_dir, action_id_map, fps, image_dims)
+
+
+def _spill_run(rows, run_dir, runs):
+    """Sorts `rows` and writes them as the next run file."""
+    rows.sort(key=_row_key)
+    path = os.path.join(run_dir, f"run_{len(runs):05d}.csv")
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+    runs.append(path)
+
+
+def _read_run(path):
+    with open(path, newline='') as f:
+        yield from csv.reader(f)
+
+
+def convert_via_files(json_paths, frame_dir, output_csv, action_id_map, fps, workers=None, run_rows=RUN_ROWS):
+    """
+    Converts `json_paths` to an AVA train.csv sorted by (video_id, frame_timestamp) and returns its row count.
+    Files are converted in a pool of `workers` processes (default: one per core) that share one image size
+    lookup (frame_dir/image_dims.json, or frame headers). Their rows are collected in file order, every
+    `run_rows` rows are sorted and spilled to a run file next to the output, and the runs are k-way merged into
+    it, so at most `run_rows` rows are held in memory. Rows with the same key keep their file order.
+    """
+    image_dims = ImageDimsIndex.load(frame_dir)
+    workers = min(workers or os.cpu_count() or 1, len(json_paths) // MIN_FILES_PER_WORKER)
+
+    def per_file_rows():
+        if workers > 1:
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(frame_dir, action_id_map, fps, image_dims.dims)) as pool:
+                chunksize = max(1, len(json_paths) // (workers * 16))
+                yield from pool.imap(_process_file, json_paths, chunksize=chunksize)
+        else:
+            for json_path in json_paths:
+                yield process_via_file(json_path, frame_dir, action_id_map, fps, image_dims)
+
+    with tempfile.TemporaryDirectory(prefix="ava_runs_", dir=os.path.dirname(os.path.abspath(output_csv))) as run_dir:
+        runs, buffer = [], []
+        for rows in tqdm(per_file_rows(), total=len(json_paths), desc="Processing annotations"):
+            buffer.extend(rows)
+            if len(buffer) >= run_rows:
+                _spill_run(buffer, run_dir, runs)
+                buffer = []
+        buffer.sort(key=_row_key)
+
+        num_rows = 0
+        with open(output_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            # heapq.merge takes equal keys from earlier runs first, so the merge is as stable as one big sort.
+            for row in heapq.merge(*map(_read_run, runs), buffer, key=_row_key):
+                writer.writerow(row)
+                num_rows += 1
+    return num_rows
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert annotated VIA JSON files directly to the final AVA-format train.csv.",
@@ -100,50 +185,34 @@ def main():
     parser.add_argument('--output_csv', type=str, default='./train.csv', help="Path to save the final train.csv file.")
     parser.add_argument('--fps', type=int, default=25,
                         help="The frames-per-second of the source videos, for calculating the timestamp.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Converter processes (default: one per core).")
+    parser.add_argument('--run_rows', type=int, default=RUN_ROWS,
+                        help="Rows sorted in memory per run file; bounds memory on large datasets.")
     args = parser.parse_args()
-    action_id_map = {}
-    try:
-        first_json_path = ""
-        for root, _, files in os.walk(args.frame_dir):
-            for file in files:
-                if file.endswith("_finish.json"):
-                    first_json_path = os.path.join(root, file)
-                    break
-            if first_json_path:
-                break
-
-        with open(first_json_path, 'r', encoding='utf-8') as f:
-            sample_json = json.load(f)
-        action_id_map = calculate_action_mapping(sample_json.get('attribute', {}))
-    except (FileNotFoundError, IndexError):
-        print(
-            "❌ Error: Could not find a sample '_finish.json' file to build action map. Please ensure at least one annotated file exists.")
-        return
-    all_csv_rows = []
-    json_files_to_process = []
-    for root, _, files in os.walk(args.frame_dir):
-        for file in files:
-            if file.endswith("_finish.json"):
-                json_files_to_process.append(os.path.join(root, file))
 
+    json_files_to_process = sorted(
+        os.path.join(root, file)
+        for root, _, files in os.walk(args.frame_dir) for file in files if file.endswith("_finish.json"))
     if not json_files_to_process:
         print(
             "❌ Error: No '_finish.json' files found. Rename your annotated files (e.g., '4_clip_001_via.json' -> '4_clip_001_finish.json').")
         return
 
-    print(f"Found {len(json_files_to_process)} annotated files to process.")
-    for json_path in tqdm(json_files_to_process, desc="Processing annotations"):
-        rows = process_via_file(json_path, args.frame_dir, action_id_map, args.fps)
-        all_csv_rows.extend(rows)
-    header = ['video_id', 'frame_timestamp', 'x1', 'y1', 'x2', 'y2', 'action_id', 'person_id']
-    all_csv_rows.sort(key=lambda x: (x[0], int(x[1])))
+    try:
+        with open(json_files_to_process[0], 'r', encoding='utf-8') as f:
+            sample_json = json.load(f)
+        action_id_map = calculate_action_mapping(sample_json.get('attribute', {}))
+    except (json.JSONDecodeError, FileNotFoundError):
+        print(
+            "❌ Error: Could not read a sample '_finish.json' file to build action map. Please ensure at least one annotated file exists.")
+        return
 
+    print(f"Found {len(json_files_to_process)} annotated files to process.")
     try:
-        with open(args.output_csv, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-            writer.writerows(all_csv_rows)
-        print(f"\n🎉 Success! Generated {len(all_csv_rows)} rows. Final dataset saved to: {args.output_csv}")
+        num_rows = convert_via_files(json_files_to_process, args.frame_dir, args.output_csv, action_id_map, args.fps,
+                                     args.workers, args.run_rows)
+        print(f"\n🎉 Success! Generated {num_rows} rows. Final dataset saved to: {args.output_csv}")
     except IOError as e:
         print(f"\n❌ Error writing to CSV file: {e}")
 
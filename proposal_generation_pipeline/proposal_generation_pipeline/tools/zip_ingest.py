@@ -0,0 +1,113 @@
+# tools/zip_ingest.py
+
+# Reads the raw videos of an uploaded ZIP one member at a time instead of extractall(): each member is
+# extracted to a scratch file (hashed on the way), handed to the pipeline, and deleted once released.
+# A background thread extracts the next members while the current one is still being processed.
+
+import os
+import time
+import queue
+import hashlib
+import logging
+import zipfile
+import threading
+
+from .rename_resize import filter_videos
+
+logger = logging.getLogger(__name__)
+
+
+class ZipMember:
+    def __init__(self, idx: int, name: str, path: str, digest: str, size: int):
+        self.idx = idx  # 1-based position, the `{idx}.mp4` number rename_resize would give it.
+        self.name = name
+        self.path = path
+        self.digest = digest  # SHA-256 of the member content, as StageCache.file_digest() would compute it.
+        self.size = size
+
+
+class ZipVideoSource:
+    """
+    Iterates over the video members of a ZIP archive as extracted scratch files.
+
+    Members are selected and numbered exactly like extractall() + rename_resize.list_videos(): only
+    top-level video files, sorted by name. At most `max_pending` members exist on disk at any time;
+    call release() when a member is no longer needed.
+    """
+
+    def __init__(self, zip_path: str, scratch_dir: str, max_pending: int = 2):
+        self.zip_path = zip_path
+        self.scratch_dir = scratch_dir
+        self.max_pending = max(1, max_pending)
+        os.makedirs(scratch_dir, exist_ok=True)
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            top_level = [info.filename for info in zf.infolist() if not info.is_dir() and '/' not in info.filename]
+        self.video_names = filter_videos(top_level)
+
+        self._slots = threading.Semaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.disk_bytes = 0
+        self.peak_disk_bytes = 0
+        self.first_member_secs = None
+
+    def __len__(self):
+        return len(self.video_names)
+
+    def _extract(self, zf, idx, name):
+        path = os.path.join(self.scratch_dir, f"{idx}_{name}")
+        sha = hashlib.sha256()
+        size = 0
+        with zf.open(name) as src, open(path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                sha.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+                with self._lock:
+                    self.disk_bytes += len(chunk)
+                    self.peak_disk_bytes = max(self.peak_disk_bytes, self.disk_bytes)
+        return ZipMember(idx, name, path, sha.hexdigest(), size)
+
+    def _produce(self, members):
+        try:
+            with zipfile.ZipFile(self.zip_path, 'r') as zf:
+                for idx, name in enumerate(self.video_names, 1):
+                    self._slots.acquire()
+                    if self._closed:
+                        break
+                    members.put(self._extract(zf, idx, name))
+        except Exception as e:
+            members.put(e)
+        members.put(None)
+
+    def __iter__(self):
+        start = time.perf_counter()
+        members = queue.Queue()
+        threading.Thread(target=self._produce, args=(members,), daemon=True).start()
+        while True:
+            member = members.get()
+            if member is None:
+                return
+            if isinstance(member, Exception):
+                raise member
+            if self.first_member_secs is None:
+                self.first_member_secs = time.perf_counter() - start
+            yield member
+
+    def release(self, member: ZipMember):
+        """Deletes a member's scratch file and lets the extractor move on to the next one."""
+        if os.path.exists(member.path):
+            os.remove(member.path)
+        with self._lock:
+            self.disk_bytes -= member.size
+        self._slots.release()
+
+    def close(self):
+        self._closed = True
+        self._slots.release()
+
+    def report(self):
+        archive_mb = os.path.getsize(self.zip_path) / 1e6
+        first = f"{self.first_member_secs:.2f}s" if self.first_member_secs is not None else "n/a"
+        logger.info(f"📦 ZIP ingest: {len(self)} videos, first video ready after {first}, "
+                    f"peak scratch disk {self.peak_disk_bytes / 1e6:.1f} MB (archive {archive_mb:.1f} MB).")